@@ -35,6 +35,7 @@ provided by this library. If there's something not included in
 this library and think it should, speak up.
 
 .. automodule:: mom.builtins
+.. automodule:: mom.chunking
 .. automodule:: mom.collections
 .. automodule:: mom.decorators
 .. automodule:: mom.functional
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011 Yesudeep Mangalapilly <yesudeep@gmail.com>
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Alternative implementations of math routines."""
+
+from __future__ import absolute_import
+
+from mom.builtins import integer_bit_length
+from mom._compat import range
+
+
+def _inverse_mod(num_a, num_b):
+  """
+  Returns inverse of a mod b, zero if none. Extended Euclidean Algorithm.
+  """
+  num_c, num_d = num_a, num_b
+  num_uc, num_ud = 1, 0
+  while num_c:
+    quotient = num_d // num_c
+    num_c, num_d = num_d - (quotient * num_c), num_c
+    num_uc, num_ud = num_ud - (quotient * num_uc), num_uc
+  if num_d == 1:
+    return num_ud % num_b
+  return 0
+
+
+def pow_mod_fixed_window(base, power, modulus):
+  """
+  Calculates:
+      base**pow mod modulus
+
+  Uses multi bit scanning with nBitScan bits at a time.
+  From Bryan G. Olson's post to comp.lang.python
+
+  Does left-to-right instead of pow()'s right-to-left,
+  thus about 30% faster than the python built-in with small bases
+
+  :param base:
+      Base
+  :param power:
+      Power
+  :param modulus:
+      Modulus
+  :returns:
+      base**pow mod modulus
+  """
+  n_bit_scan = 5
+
+  #TREV - Added support for negative exponents
+  negative_result = False
+  if power < 0:
+    power *= -1
+    negative_result = True
+
+  #exp2 = 2**n_bit_scan
+  exp2 = 1 << n_bit_scan
+  mask = exp2 - 1
+
+  # Break power into a list of digits of nBitScan bits.
+  # The list is recursive so easy to read in reverse direction.
+  nibbles = None
+  while power:
+    nibbles = int(power & mask), nibbles
+    power >>= n_bit_scan
+
+  # Make a table of powers of base up to 2**nBitScan - 1
+  low_powers = [1]
+  for i in range(1, exp2):
+    low_powers.append((low_powers[i - 1] * base) % modulus)
+
+  # To exponentiate by the first nibble, look it up in the table
+  nib, nibbles = nibbles
+  prod = low_powers[nib]
+
+  # For the rest, square nBitScan times, then multiply by
+  # base^nibble
+  while nibbles:
+    nib, nibbles = nibbles
+    for i in range(n_bit_scan):
+      prod = (prod * prod) % modulus
+    if nib: prod = (prod * low_powers[nib]) % modulus
+
+  #TREV - Added support for negative exponents
+  if negative_result:
+    prod_inv = _inverse_mod(prod, modulus)
+    #Check to make sure the inverse is correct
+    assert (prod * prod_inv) % modulus == 1
+    return prod_inv
+  return prod
+
+
+def _sliding_window_size(n_bits):
+  """
+  Window size that minimizes the number of multiplications of a sliding
+  window exponentiation with an exponent of ``n_bits`` bits.
+  """
+  if n_bits > 671:
+    return 6
+  if n_bits > 239:
+    return 5
+  if n_bits > 79:
+    return 4
+  if n_bits > 23:
+    return 3
+  return 1
+
+
+def pow_mod_sliding_window_montgomery(base, power, modulus):
+  """
+  Calculates:
+      base**pow mod modulus
+
+  Left-to-right sliding window exponentiation with the window size chosen
+  by exponent length. Odd moduli use Montgomery multiplication so that
+  every reduction is a mask, a multiplication and a shift instead of a
+  division.
+
+  :param base:
+      Base
+  :param power:
+      Power. Negative powers use the modular inverse.
+  :param modulus:
+      Modulus
+  :returns:
+      base**pow mod modulus
+  """
+  if modulus == 1:
+    return 0
+  if power < 0:
+    inverse = _inverse_mod(base % modulus, modulus)
+    if not inverse:
+      raise ValueError("base is not invertible for the given modulus")
+    return pow_mod_sliding_window_montgomery(inverse, -power, modulus)
+  if not power:
+    return 1
+
+  window = _sliding_window_size(integer_bit_length(power))
+
+  if modulus & 1:
+    # Montgomery domain: x -> x * R mod modulus, with R = 2**r_bits.
+    r_bits = integer_bit_length(modulus)
+    r_mask = (1 << r_bits) - 1
+    m_prime = (-_inverse_mod(modulus, 1 << r_bits)) & r_mask
+
+    def mul(num_a, num_b):
+      """Montgomery product."""
+      product = num_a * num_b
+      product = (product +
+                 (((product & r_mask) * m_prime) & r_mask) * modulus) >> r_bits
+      if product >= modulus:
+        product -= modulus
+      return product
+
+    one = (1 << r_bits) % modulus
+    base = ((base % modulus) << r_bits) % modulus
+  else:
+    def mul(num_a, num_b):
+      """Plain modular product."""
+      return (num_a * num_b) % modulus
+
+    one = 1
+    base %= modulus
+
+  # Odd powers base**1, base**3, ..., base**(2**window - 1).
+  odd_powers = [base]
+  if window > 1:
+    base_squared = mul(base, base)
+    for _ in range((1 << (window - 1)) - 1):
+      odd_powers.append(mul(odd_powers[-1], base_squared))
+
+  result = one
+  i = integer_bit_length(power) - 1
+  while i >= 0:
+    if not (power >> i) & 1:
+      result = mul(result, result)
+      i -= 1
+      continue
+    # Longest window of at most `window` bits ending in a set bit.
+    j = max(i - window + 1, 0)
+    while not (power >> j) & 1:
+      j += 1
+    for _ in range(i - j + 1):
+      result = mul(result, result)
+    result = mul(result, odd_powers[((power >> j) & ((1 << (i - j + 1)) - 1))
+                                    >> 1])
+    i = j - 1
+
+  if modulus & 1:
+    # Convert back out of the Montgomery domain.
+    result = mul(result, 1)
+  return result
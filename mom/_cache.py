@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom._cache
+:synopsis: Small thread-safe least-recently-used caches.
+
+Used for module-level caches of precomputed values shared by all threads.
+Works on every supported Python version, so it does not use
+:class:`collections.OrderedDict` (Python 2.7+).
+
+.. autoclass:: LRUCache
+"""
+
+from __future__ import absolute_import
+
+try:
+  import threading
+except ImportError:
+  import dummy_threading as threading
+
+
+class LRUCache(object):
+  """
+  Maps at most ``size`` keys to values, discarding the least recently used
+  key when full. Meant for small sizes: recency is kept in a list.
+
+  Values are computed by callers outside the lock, so two threads missing
+  the same key may both compute it; the last one stored wins.
+
+  :param size:
+      Maximum number of keys.
+  """
+
+  def __init__(self, size):
+    self.size = size
+    self._values = {}
+    self._order = []
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._values)
+
+  def get(self, key, default=None):
+    """
+    Returns the value of a key and marks it as most recently used.
+
+    :param key:
+        Hashable key.
+    :param default:
+        Returned when the key is not cached.
+    """
+    self._lock.acquire()
+    try:
+      try:
+        value = self._values[key]
+      except KeyError:
+        return default
+      self._order.remove(key)
+      self._order.append(key)
+      return value
+    finally:
+      self._lock.release()
+
+  def set(self, key, value):
+    """
+    Stores the value of a key, discarding the least recently used key if
+    the cache is full.
+
+    :param key:
+        Hashable key.
+    :param value:
+        Value.
+    """
+    self._lock.acquire()
+    try:
+      if key in self._values:
+        self._order.remove(key)
+      elif len(self._order) >= self.size:
+        del self._values[self._order.pop(0)]
+      self._values[key] = value
+      self._order.append(key)
+    finally:
+      self._lock.release()
+
+  def clear(self):
+    """
+    Removes all keys.
+    """
+    self._lock.acquire()
+    try:
+      self._values.clear()
+      del self._order[:]
+    finally:
+      self._lock.release()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom._concurrent
+:synopsis: Bounded thread-pool mapping for I/O and GIL-releasing work.
+
+Used by the file hashing functions, which spend their time in system
+calls and in hashlib, both of which release the GIL. Falls back to
+mapping in the calling thread when :mod:`concurrent.futures` is not
+available (Python 2 without the ``futures`` backport).
+
+.. autofunction:: imap
+.. autofunction:: default_workers
+"""
+
+from __future__ import absolute_import
+
+from collections import deque
+from mom._compat import next
+
+try:
+  from concurrent import futures
+except ImportError:
+  futures = None
+
+try:
+  # Python 2.6+
+  from multiprocessing import cpu_count
+except ImportError:
+  cpu_count = None
+
+
+HAVE_FUTURES = futures is not None
+
+# Work items kept in flight per worker thread. Bounds memory use when the
+# input is a long generator and results are consumed slowly.
+_QUEUE_DEPTH = 4
+
+
+def default_workers():
+  """
+  Default number of worker threads for I/O-bound work.
+
+  :returns:
+      ``cpu_count + 4``, at most 32.
+  """
+  cpus = 1
+  if cpu_count is not None:
+    try:
+      cpus = cpu_count()
+    except NotImplementedError:
+      pass
+  return min(32, cpus + 4)
+
+
+def imap(func, items, workers=None, ordered=True):
+  """
+  Lazily maps a function over items in a pool of threads.
+
+  At most ``_QUEUE_DEPTH * workers`` items are read from ``items`` ahead
+  of the results, so this is safe to use on unbounded generators.
+  Exceptions raised by ``func`` are re-raised when the corresponding result
+  is reached.
+
+  :param func:
+      Function of one argument.
+  :param items:
+      Iterable of arguments.
+  :param workers:
+      Number of threads. Default ``None`` uses :func:`default_workers`;
+      1 or less maps in the calling thread.
+  :param ordered:
+      ``True`` to yield results in input order; ``False`` to yield them as
+      they complete.
+  :yields:
+      Tuples of ``(item, result)``.
+  """
+  if workers is None:
+    workers = default_workers()
+  if workers <= 1 or not HAVE_FUTURES:
+    for item in items:
+      yield item, func(item)
+    return
+
+  items = iter(items)
+  limit = _QUEUE_DEPTH * workers
+  executor = futures.ThreadPoolExecutor(workers)
+  pending = deque() if ordered else set()
+  try:
+    exhausted = False
+    while True:
+      while not exhausted and len(pending) < limit:
+        try:
+          item = next(items)
+        except StopIteration:
+          exhausted = True
+          break
+        future = executor.submit(func, item)
+        future.item = item
+        if ordered:
+          pending.append(future)
+        else:
+          pending.add(future)
+      if not pending:
+        break
+      if ordered:
+        future = pending.popleft()
+        yield future.item, future.result()
+      else:
+        done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+          pending.remove(future)
+          yield future.item, future.result()
+  finally:
+    for future in pending:
+      future.cancel()
+    executor.shutdown(wait=True)
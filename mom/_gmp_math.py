@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Public domain.
+
+"""
+libgmp-based (through ctypes) functions.
+
+Used by :mod:`mom.math` when libgmp is available but gmpy is not.
+"""
+
+from __future__ import absolute_import
+
+try:
+  from mom import gmp
+
+  HAVE_GMP = True
+except (ImportError, AttributeError, OSError):
+  gmp = None
+  HAVE_GMP = False
+
+if HAVE_GMP:
+  _Integer = gmp.Integer
+
+  def pow_mod(base, power, modulus):
+    """
+    Calculates:
+
+        base**pow mod modulus
+
+    :param base:
+        Base
+    :param power:
+        Non-negative power
+    :param modulus:
+        Modulus
+    :returns:
+        base**pow mod modulus
+    """
+    return int(_Integer(base).powm(power, modulus))
+
+  def is_prime(num, iterations=25):
+    """
+    Determines whether an integer is prime.
+
+    :param num:
+        Number
+    :param iterations:
+        Number of Miller-Rabin rounds after GMP's Baillie-PSW test.
+    :returns:
+        ``True`` if (probably) prime; ``False`` otherwise.
+    """
+    return bool(_Integer(num).probab_prime_p(iterations))
+
+  def inverse_mod(num_a, num_b):
+    """
+    Returns inverse of a mod b, zero if none.
+    """
+    try:
+      return int(_Integer(num_a).invert(num_b))
+    except ZeroDivisionError:
+      return 0
+
+  def gcd(num_a, num_b):
+    """
+    Calculates the greatest common divisor.
+    """
+    return int(_Integer(num_a).gcd(num_b))
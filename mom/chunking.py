@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom.chunking
+:synopsis: Content-defined chunking for deduplication.
+
+Fixed-size chunks (:func:`mom.functional.chunks`) do not survive edits:
+inserting a single byte shifts every later boundary, so no later chunk
+matches its previous version. Content-defined chunking places boundaries
+where a rolling hash of the last few bytes matches a pattern, so
+boundaries move with the content and chunks after an edit are found
+again.
+
+This module implements FastCDC: a Gear rolling hash, no cut points before
+the minimum chunk size, a stricter mask before the average size and a
+looser one after it (normalized chunking, level 2) to narrow the chunk
+size distribution, and a forced cut at the maximum size. The Gear table
+is fixed; changing it, or the sizes, moves every boundary.
+
+Chunks of buffers are hashed through :class:`memoryview` slices and are
+not copied. Searching for a cut point copies the bytes it examines, at
+most ``max_size`` at a time, into a :class:`bytearray` so that they can be
+iterated as integers.
+
+Functions
+---------
+.. autofunction:: chunk_boundaries
+.. autofunction:: chunk_digests
+.. autofunction:: chunk_file
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import mmap
+import os
+from mom import _concurrent
+from mom._compat import range, EMPTY_BYTE
+from mom.builtins import byte, integer_bit_length
+from mom.codec.integer import bytes_to_uint
+
+
+try:
+  from operator import length_hint as _length_hint
+except ImportError:
+  def _length_hint(iterator):
+    """Number of items left in a sized iterator."""
+    return iterator.__length_hint__()
+
+
+__all__ = [
+  "chunk_boundaries",
+  "chunk_digests",
+  "chunk_file",
+  ]
+
+
+DEFAULT_MIN_SIZE = 2 * 1024
+DEFAULT_AVG_SIZE = 8 * 1024
+DEFAULT_MAX_SIZE = 64 * 1024
+
+# Bytes read from a stream at a time.
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# Gear table: one pseudo-random 32-bit value per byte value.
+_GEAR = tuple(bytes_to_uint(hashlib.sha1(byte(i)).digest()[:4])
+              for i in range(256))
+
+_HASH_MASK = 0xFFFFFFFF
+
+
+def _top_bits_mask(count):
+  """
+  Mask of the ``count`` most significant bits of the 32-bit hash, which
+  depend on the most input bytes.
+  """
+  return ((1 << count) - 1) << (32 - count)
+
+
+def _masks(min_size, avg_size, max_size):
+  """
+  Validates chunk sizes and returns the (strict, loose) cut point masks.
+  """
+  if not 0 < min_size <= avg_size <= max_size:
+    raise ValueError("chunk sizes must satisfy 0 < min_size <= avg_size "
+                     "<= max_size: got %r, %r and %r" %
+                     (min_size, avg_size, max_size))
+  if avg_size < 64:
+    raise ValueError("avg_size must be at least 64: got %r" % avg_size)
+  bits = integer_bit_length(avg_size) - 1
+  return _top_bits_mask(min(bits + 2, 32)), _top_bits_mask(bits - 2)
+
+
+def _cut_point(data, start, end, min_size, avg_size, max_size,
+               strict_mask, loose_mask):
+  """
+  Returns the end offset of the chunk that starts at ``start``, using the
+  data up to ``end``. The examined bytes, at most ``max_size``, are copied.
+  """
+  if end - start <= min_size:
+    return end
+  if end - start > max_size:
+    end = start + max_size
+  normal = min(start + avg_size, end)
+  gear = _GEAR
+  value = 0
+  # Iterating a bytearray yields integers on every Python version, unlike
+  # iterating a memoryview, whose iterator also has no length hint. The
+  # position of a cut is recovered from the iterator's remaining length,
+  # which keeps the per-byte loop free of counters.
+  remaining = iter(bytearray(data[start + min_size:normal]))
+  for item in remaining:
+    value = (value + value + gear[item]) & _HASH_MASK
+    if not value & strict_mask:
+      return normal - _length_hint(remaining)
+  remaining = iter(bytearray(data[normal:end]))
+  for item in remaining:
+    value = (value + value + gear[item]) & _HASH_MASK
+    if not value & loose_mask:
+      return end - _length_hint(remaining)
+  return end
+
+
+def _buffer_boundaries(data, min_size, avg_size, max_size):
+  """
+  Chunk boundaries of a buffer.
+  """
+  strict_mask, loose_mask = _masks(min_size, avg_size, max_size)
+  try:
+    view = memoryview(data)
+  except TypeError:
+    # Python 2 mmap objects do not export a memoryview; slicing them
+    # copies one chunk at a time instead.
+    view = data
+  size = len(view)
+  start = 0
+  while start < size:
+    end = _cut_point(view, start, size, min_size, avg_size, max_size,
+                     strict_mask, loose_mask)
+    yield view, 0, start, end
+    start = end
+
+
+def _stream_boundaries(stream, min_size, avg_size, max_size, block_size):
+  """
+  Chunk boundaries of a stream, read ``block_size`` bytes at a time.
+  Every view is of an immutable buffer, so it stays valid after later
+  reads.
+  """
+  strict_mask, loose_mask = _masks(min_size, avg_size, max_size)
+  block_size = max(block_size, max_size)
+  base = 0
+  pending = EMPTY_BYTE
+  eof = False
+  while not eof:
+    block = stream.read(block_size)
+    eof = not block
+    pending += block
+    view = memoryview(pending)
+    size = len(view)
+    start = 0
+    # A cut point is final once a maximum-size chunk fits in the buffer.
+    while start < size and (eof or size - start >= max_size):
+      end = _cut_point(view, start, size, min_size, avg_size, max_size,
+                       strict_mask, loose_mask)
+      yield view, base, base + start, base + end
+      start = end
+    base += start
+    pending = pending[start:]
+
+
+def _boundaries(data, min_size, avg_size, max_size, block_size):
+  """
+  Yields tuples of ``(view, base, start, end)``: the chunk spans offsets
+  ``start`` to ``end`` of the input and ``view[start - base:end - base]``
+  of the view.
+  """
+  # Memory maps also have a read method but are chunked in place, from
+  # offset 0 whatever their current position.
+  if hasattr(data, "read") and not isinstance(data, mmap.mmap):
+    return _stream_boundaries(data, min_size, avg_size, max_size,
+                              block_size)
+  return _buffer_boundaries(data, min_size, avg_size, max_size)
+
+
+def chunk_boundaries(data, min_size=DEFAULT_MIN_SIZE,
+                     avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE,
+                     block_size=DEFAULT_BLOCK_SIZE):
+  """
+  Splits data into content-defined chunks.
+
+  :param data:
+      Bytes or another buffer (e.g. a :class:`mmap.mmap`), or a binary
+      file-like object to read until EOF.
+  :param min_size:
+      Minimum chunk size in bytes; only the last chunk may be shorter.
+  :param avg_size:
+      Target average chunk size in bytes; at least 64. The masks are
+      derived from the largest power of two not above it.
+  :param max_size:
+      Maximum chunk size in bytes.
+  :param block_size:
+      Bytes to read from a stream at a time; at least ``max_size``.
+  :yields:
+      Tuples of ``(offset, length)``.
+  """
+  for _, _, start, end in _boundaries(data, min_size, avg_size, max_size,
+                                      block_size):
+    yield start, end - start
+
+
+def chunk_digests(data, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE,
+                  max_size=DEFAULT_MAX_SIZE, algorithm="sha1", workers=1,
+                  block_size=DEFAULT_BLOCK_SIZE):
+  """
+  Splits data into content-defined chunks and hashes every chunk, e.g. to
+  look the chunks up in a deduplicating store::
+
+      for offset, length, digest in chunk_digests(backup_file):
+        if digest not in store:
+          ...
+
+  :param data:
+      Bytes or another buffer, or a binary file-like object to read until
+      EOF.
+  :param min_size:
+      Minimum chunk size in bytes.
+  :param avg_size:
+      Target average chunk size in bytes.
+  :param max_size:
+      Maximum chunk size in bytes.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha1".
+  :param workers:
+      Number of threads hashing chunks while boundaries are searched.
+      Default 1 hashes in the calling thread; ``None`` picks a number
+      based on the number of CPUs.
+  :param block_size:
+      Bytes to read from a stream at a time.
+  :yields:
+      Tuples of ``(offset, length, digest)`` in order.
+  """
+  hashlib.new(algorithm)
+
+  def _digest(chunk):
+    """Hashes one chunk."""
+    view, base, start, end = chunk
+    return hashlib.new(algorithm, view[start - base:end - base]).digest()
+
+  chunks = _boundaries(data, min_size, avg_size, max_size, block_size)
+  for (_, _, start, end), digest in _concurrent.imap(_digest, chunks,
+                                                     workers):
+    yield start, end - start, digest
+
+
+def chunk_file(path, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE,
+               max_size=DEFAULT_MAX_SIZE, algorithm="sha1", workers=1):
+  """
+  Splits a file into content-defined chunks and hashes every chunk. The
+  file is memory-mapped, so on Python 3 chunks are hashed without being
+  copied.
+
+  :param path:
+      Path of the file.
+  :param min_size:
+      Minimum chunk size in bytes.
+  :param avg_size:
+      Target average chunk size in bytes.
+  :param max_size:
+      Maximum chunk size in bytes.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha1".
+  :param workers:
+      Number of threads hashing chunks; see :func:`chunk_digests`.
+  :returns:
+      List of ``(offset, length, digest)`` tuples in order.
+  """
+  file_obj = open(path, "rb", 0)
+  try:
+    if not os.fstat(file_obj.fileno()).st_size:
+      # Empty files cannot be memory-mapped.
+      _masks(min_size, avg_size, max_size)
+      return []
+    mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      return list(chunk_digests(mapped, min_size, avg_size, max_size,
+                                algorithm, workers))
+    finally:
+      mapped.close()
+  finally:
+    file_obj.close()
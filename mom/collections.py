@@ -26,10 +26,23 @@ Queues
 .. autoclass:: AttributeDict
 .. autoclass:: attrdict
 
+Probabilistic sets
+------------------
+.. autoclass:: BloomFilter
+   :members:
+.. autoclass:: CountingBloomFilter
+   :members:
+
 """
 
 from __future__ import absolute_import
 
+import math
+import struct
+from mom._compat import range
+from mom.codec.text import utf8_encode
+from mom.security.hash import sha1_digest
+
 try:
   import queue
 except ImportError:
@@ -144,3 +157,278 @@ class AttributeDict(dict):
 
 # Alias
 attrdict = AttributeDict
+
+
+# Serialized header: format kind, number of hash functions, number of bits.
+_BLOOM_HEADER = struct.Struct(">BBQ")
+
+
+def _bloom_parameters(capacity, error_rate):
+  """
+  Number of bits and of hash functions that keep the false positive rate
+  of a filter holding ``capacity`` items at ``error_rate``.
+  """
+  if capacity < 1:
+    raise ValueError("capacity must be positive: got %r" % capacity)
+  if not 0 < error_rate < 1:
+    raise ValueError("error_rate must be between 0 and 1: got %r" %
+                     error_rate)
+  num_bits = int(math.ceil(-capacity * math.log(error_rate) /
+                           math.log(2) ** 2))
+  num_hashes = max(1, int(round(num_bits / float(capacity) * math.log(2))))
+  return num_bits, num_hashes
+
+
+def _prime_factors(number):
+  """
+  Distinct prime factors of a positive integer, by trial division.
+  """
+  factors = []
+  divisor = 2
+  while divisor * divisor <= number:
+    if not number % divisor:
+      factors.append(divisor)
+      while not number % divisor:
+        number //= divisor
+    divisor += 1
+  if number > 1:
+    factors.append(number)
+  return tuple(factors)
+
+
+class BloomFilter(object):
+  """
+  Approximate set of byte or Unicode strings in a fixed amount of memory.
+
+  Membership tests never miss an added item but report an item that was
+  not added with a probability of about ``error_rate`` once ``capacity``
+  items have been added, rising beyond that. Items cannot be removed or
+  listed; see :class:`CountingBloomFilter` for removal.
+
+  The filter can replace the ``seen`` set of :func:`mom.itertools.unique`
+  to drop repeated items of an unbounded stream in bounded memory, at the
+  cost of also dropping a fraction ``error_rate`` of unique items::
+
+      seen = BloomFilter(10 ** 9, 0.001)   # About 1.7 GiB.
+      for event in unique(events, seen):
+        ...
+
+  Every item is hashed once with SHA-1; the filter's bit positions are
+  derived from two 64-bit halves of the digest by double hashing.
+  Unicode strings are UTF-8 encoded first.
+
+  :param capacity:
+      Expected number of items.
+  :param error_rate:
+      Target false positive rate at ``capacity`` items. Default 0.01.
+  """
+
+  _KIND = 1
+
+  def __init__(self, capacity, error_rate=0.01):
+    num_bits, num_hashes = _bloom_parameters(capacity, error_rate)
+    self._init(num_bits, num_hashes, bytearray(self._storage_size(num_bits)))
+
+  def _init(self, num_bits, num_hashes, data):
+    self.num_bits = num_bits
+    self.num_hashes = num_hashes
+    self._data = data
+    self._num_bits_factors = _prime_factors(num_bits)
+
+  @staticmethod
+  def _storage_size(num_bits):
+    """Bytes needed to store ``num_bits`` positions."""
+    return (num_bits + 7) // 8
+
+  def _positions(self, item):
+    """Positions of an item's bits."""
+    first, second = struct.unpack(">QQ", sha1_digest(utf8_encode(item))[:16])
+    num_bits = self.num_bits
+    # Double hashing: position i is first + i * step. A step between 1 and
+    # num_bits - 1 that is coprime with num_bits visits num_bits distinct
+    # positions before repeating one; a step sharing a factor with
+    # num_bits, or worse a multiple of it, would revisit a few positions.
+    # The search ends at num_bits - 1, which is always coprime, at worst.
+    step = 1 + second % max(num_bits - 1, 1)
+    factors = self._num_bits_factors
+    while True:
+      for factor in factors:
+        if not step % factor:
+          step += 1
+          break
+      else:
+        break
+    return [(first + i * step) % num_bits for i in range(self.num_hashes)]
+
+  def add(self, item):
+    """
+    Adds an item.
+
+    :param item:
+        Byte or Unicode string.
+    :returns:
+        ``True`` if the item was not in the filter; ``False`` if it was,
+        or is a false positive.
+    """
+    data = self._data
+    added = False
+    for position in self._positions(item):
+      index, mask = position >> 3, 1 << (position & 7)
+      if not data[index] & mask:
+        data[index] |= mask
+        added = True
+    return added
+
+  def add_many(self, items):
+    """
+    Adds several items.
+
+    :param items:
+        Iterable of byte or Unicode strings.
+    """
+    for item in items:
+      self.add(item)
+
+  def __contains__(self, item):
+    data = self._data
+    for position in self._positions(item):
+      if not data[position >> 3] & (1 << (position & 7)):
+        return False
+    return True
+
+  def _check_compatible(self, other):
+    if (type(other) is not type(self) or other.num_bits != self.num_bits or
+        other.num_hashes != self.num_hashes):
+      raise ValueError("filters must be of the same type and size")
+
+  def union(self, other):
+    """
+    Combines two filters of the same size, e.g. built by different
+    workers.
+
+    :param other:
+        Filter created with the same ``capacity`` and ``error_rate``.
+    :returns:
+        New filter containing the items of both.
+    """
+    self._check_compatible(other)
+    data = bytearray(a | b for a, b in zip(self._data, other._data))
+    return self._from_parts(self.num_bits, self.num_hashes, data)
+
+  @classmethod
+  def _from_parts(cls, num_bits, num_hashes, data):
+    """Creates a filter around existing storage."""
+    bloom_filter = cls.__new__(cls)
+    bloom_filter._init(num_bits, num_hashes, data)
+    return bloom_filter
+
+  def to_bytes(self):
+    """
+    Serializes the filter.
+
+    :returns:
+        Bytes accepted by :meth:`from_bytes`.
+    """
+    return (_BLOOM_HEADER.pack(self._KIND, self.num_hashes, self.num_bits) +
+            bytes(self._data))
+
+  @classmethod
+  def from_bytes(cls, data):
+    """
+    Deserializes a filter.
+
+    :param data:
+        Bytes returned by :meth:`to_bytes` of a filter of this class.
+    :returns:
+        The filter.
+    """
+    header_size = _BLOOM_HEADER.size
+    if len(data) < header_size:
+      raise ValueError("serialized filter is truncated")
+    kind, num_hashes, num_bits = _BLOOM_HEADER.unpack(data[:header_size])
+    if kind != cls._KIND or not num_hashes or not num_bits:
+      raise ValueError("not a serialized %s" % cls.__name__)
+    if len(data) - header_size != cls._storage_size(num_bits):
+      raise ValueError("serialized filter has the wrong size")
+    return cls._from_parts(num_bits, num_hashes,
+                           bytearray(data[header_size:]))
+
+
+class CountingBloomFilter(BloomFilter):
+  """
+  Bloom filter that also supports removing items, e.g. to track pending
+  items of a queue. Uses a byte per position instead of a bit, so eight
+  times the memory of a :class:`BloomFilter` of the same capacity.
+
+  Counters saturate at 255 and are never decremented after that, so
+  removal can at worst leave an item reported as present.
+
+  :param capacity:
+      Expected number of items.
+  :param error_rate:
+      Target false positive rate at ``capacity`` items. Default 0.01.
+  """
+
+  _KIND = 2
+
+  @staticmethod
+  def _storage_size(num_bits):
+    """Bytes needed to store ``num_bits`` counters."""
+    return num_bits
+
+  def add(self, item):
+    """
+    Adds an item. Adding an item twice requires removing it twice.
+
+    :param item:
+        Byte or Unicode string.
+    :returns:
+        ``True`` if the item was not in the filter; ``False`` if it was,
+        or is a false positive.
+    """
+    data = self._data
+    added = False
+    for position in self._positions(item):
+      count = data[position]
+      if not count:
+        added = True
+      if count < 255:
+        data[position] = count + 1
+    return added
+
+  def remove(self, item):
+    """
+    Removes an item that was added before.
+
+    :param item:
+        Byte or Unicode string.
+    :raises ValueError:
+        If the item is not in the filter.
+    """
+    positions = self._positions(item)
+    data = self._data
+    if not all(data[position] for position in positions):
+      raise ValueError("item not in filter: %r" % (item,))
+    for position in positions:
+      if data[position] < 255:
+        data[position] -= 1
+
+  def __contains__(self, item):
+    data = self._data
+    for position in self._positions(item):
+      if not data[position]:
+        return False
+    return True
+
+  def union(self, other):
+    """
+    Combines two filters of the same size; counters are added.
+
+    :param other:
+        Filter created with the same ``capacity`` and ``error_rate``.
+    :returns:
+        New filter containing the items of both.
+    """
+    self._check_compatible(other)
+    data = bytearray(min(a + b, 255) for a, b in zip(self._data, other._data))
+    return self._from_parts(self.num_bits, self.num_hashes, data)
@@ -42,7 +42,8 @@
 from __future__ import absolute_import
 
 from ctypes import CDLL, Structure, POINTER, byref,\
-  c_int, c_ulonglong, c_voidp, c_long, c_char_p
+  c_int, c_ulonglong, c_voidp, c_long, c_char_p, c_size_t,\
+  create_string_buffer
 #    c_byte, \
 #    cast,\
 #    c_ulong
@@ -60,6 +61,12 @@ if HAVE_PYTHON3:
     """
     return str(num).encode("latin1")
 
+  def number_to_pybytes_hex(num):
+    """
+    Converts number to hexadecimal bytes.
+    """
+    return ("%x" % num).encode("latin1")
+
   def to_str(raw_bytes_num):
     """
     Converts bytes to the appropriate string representation for the Python
@@ -74,6 +81,12 @@ else:
     """
     return str(num)
 
+  def number_to_pybytes_hex(num):
+    """
+    Converts number to hexadecimal bytes.
+    """
+    return "%x" % num
+
   def to_str(raw_bytes_num):
     """
     Converts bytes to the appropriate string representation for the Python
@@ -153,6 +166,11 @@ _MPZ_get_str = _libgmp.__gmpz_get_str
 _MPZ_urandomb = _libgmp.__gmpz_urandomb
 _MPZ_urandomm = _libgmp.__gmpz_urandomm
 _MPZ_rrandomb = _libgmp.__gmpz_rrandomb
+_MPZ_sizeinbase = _libgmp.__gmpz_sizeinbase
+_MPZ_powm = _libgmp.__gmpz_powm
+_MPZ_invert = _libgmp.__gmpz_invert
+_MPZ_gcd = _libgmp.__gmpz_gcd
+_MPZ_probab_prime_p = _libgmp.__gmpz_probab_prime_p
 
 # Gnu MP floating point routines
 _MPF_set_default_prec = _libgmp.__gmpf_set_default_prec
@@ -261,16 +279,84 @@ class Integer(object):
   def set(self, value):
     """Set integer."""
     if isinstance(value, Integer):
-      _MPZ_set_str(self, value._tobytes(), 10)
+      _MPZ_set_str(self, value._tobytes(16), 16)
     else:
       try:
-        _MPZ_set_str(self, number_to_pybytes(int(value)), 10)
+        # Hexadecimal conversion takes linear time; decimal does not.
+        _MPZ_set_str(self, number_to_pybytes_hex(int(value)), 16)
       except Exception:
         raise TypeError("non an integer")
 
-  def _tobytes(self):
+  def _tobytes(self, base=10):
     """To Python byte string."""
-    return _MPZ_get_str(None, 10, self)
+    # Size the buffer ourselves so GMP doesn't allocate one we'd leak.
+    buf = create_string_buffer(_MPZ_sizeinbase(self, base) + 2)
+    _MPZ_get_str(buf, base, self)
+    return buf.value
+
+  def __int__(self):
+    return int(to_str(self._tobytes(16)), 16)
+
+  __long__ = __int__
+
+  def powm(self, power, modulus):
+    """
+    Calculates ``self**power mod modulus``.
+
+    :param power:
+        Non-negative power.
+    :param modulus:
+        Non-zero modulus.
+    :returns:
+        Integer.
+    """
+    if modulus == 0:
+      raise ZeroDivisionError("integer division or modulo by zero")
+    if power < 0:
+      raise ValueError("power must be non-negative")
+    if not isinstance(power, Integer):
+      power = Integer(power)
+    if not isinstance(modulus, Integer):
+      modulus = Integer(modulus)
+    ret = Integer()
+    _MPZ_powm(ret, self, power, modulus)
+    return ret
+
+  def invert(self, modulus):
+    """
+    Calculates the inverse of this integer modulo ``modulus``.
+
+    :param modulus:
+        Non-zero modulus.
+    :returns:
+        Integer.
+    :raises ZeroDivisionError:
+        If the inverse does not exist.
+    """
+    if not isinstance(modulus, Integer):
+      modulus = Integer(modulus)
+    ret = Integer()
+    if modulus == 0 or not _MPZ_invert(ret, self, modulus):
+      raise ZeroDivisionError("not invertible")
+    return ret
+
+  def gcd(self, other):
+    """
+    Calculates the greatest common divisor with another integer.
+    """
+    return self._apply_ret(_MPZ_gcd, Integer(), self, other)
+
+  def probab_prime_p(self, reps=25):
+    """
+    GMP probabilistic primality test.
+
+    :param reps:
+        Number of Miller-Rabin rounds after GMP's own trial division and
+        Baillie-PSW tests.
+    :returns:
+        2 if definitely prime, 1 if probably prime, 0 if composite.
+    """
+    return _MPZ_probab_prime_p(self, reps)
 
   def __str__(self):
     return to_str(self._tobytes())
@@ -695,8 +781,14 @@ _MPZ_neg.argtypes = (Integer, Integer)
 _MPZ_cmp.argtypes = (Integer, Integer)
 _MPZ_set_str.argtypes = (Integer, c_char_p, c_int)
 _MPZ_get_str.argtypes = (c_char_p, c_int, Integer,)
+_MPZ_sizeinbase.argtypes = (Integer, c_int)
+_MPZ_powm.argtypes = (Integer, Integer, Integer, Integer)
+_MPZ_invert.argtypes = (Integer, Integer, Integer)
+_MPZ_gcd.argtypes = (Integer, Integer, Integer)
+_MPZ_probab_prime_p.argtypes = (Integer, c_int)
 # non-default (int) return types
 _MPZ_get_str.restype = c_char_p
+_MPZ_sizeinbase.restype = c_size_t
 
 # Gnu MP rational number routines
 #_MPQ_init.argtypes = (Rational,)
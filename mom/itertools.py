@@ -241,14 +241,24 @@ def unique(iterable, seen=None):
 
   :param seen:
      An iterable specifying already 'seen' items which will be excluded
-     from the result.
+     from the result. An object with an ``add`` method that is not
+     iterable, such as :class:`mom.collections.BloomFilter`, is used
+     as-is and updated in place; this bounds the memory used for long
+     streams of strings. Items it rejects with :class:`TypeError` are not
+     tracked in a list as unhashable items otherwise are; the error is
+     raised instead.
 
      .. versionadded:: 0.5
 
   .. versionchanged:: 0.5
      Items don't have to be hashable any more.
   """
-  seen = set() if seen is None else set(seen)
+  in_place = (seen is not None and hasattr(seen, "add") and
+              not hasattr(seen, "__iter__"))
+  if seen is None:
+    seen = set()
+  elif not in_place:
+    seen = set(seen)
   seen_unhashable = []
   for item in iterable:
     try:
@@ -256,6 +266,9 @@ def unique(iterable, seen=None):
         seen.add(item)
         yield item
     except TypeError:
+      if in_place:
+        # A list would grow without bound, defeating the bounded seen.
+        raise
       if item not in seen_unhashable:
         seen_unhashable.append(item)
         yield item
@@ -23,68 +23,308 @@
 Math
 ----
 .. autofunction:: gcd
+.. autofunction:: gcd_many
+.. autofunction:: batch_gcd
 .. autofunction:: inverse_mod
+.. autofunction:: inverse_mod_many
+.. autofunction:: crt
 .. autofunction:: lcm
+.. autofunction:: lcm_many
 .. autofunction:: pow_mod
+.. autoclass:: FixedBasePowMod
+   :members:
+
+Backend
+-------
+.. autofunction:: backend
 
 Primes
 ------
 .. autofunction:: generate_random_prime
 .. autofunction:: generate_random_safe_prime
-.. autofunction:: is_prime(num, iterations=5, sieve=sieve)
+.. autofunction:: is_prime(num, iterations=None)
+.. autofunction:: is_prime_many
+
+Factorization
+-------------
+.. autofunction:: make_spf_table
+.. autofunction:: factorize
+.. autofunction:: factorize_many
 """
 
 from __future__ import absolute_import, division
+
+import os
+from array import array
+from functools import partial
+from itertools import count, islice
+from operator import mul
+from mom.builtins import integer_bit_length
+from mom._gmpy_math import HAVE_GMPY, gmpy as _gmpy
+from mom import _gmp_math
+from mom._cache import LRUCache
 from mom.security.random import generate_random_uint_between
 from mom.prime_sieve import SIEVE
-from mom._compat import range
+from mom._prime_sieve import make_prime_sieve
+from mom._compat import range, reduce
+
+try:
+  # Python 3.5+ has a C implementation.
+  from math import gcd as _gcd2
+except ImportError:
+  _gcd2 = None
 
 
 __all__ = [
   "gcd",
+  "gcd_many",
   "lcm",
+  "lcm_many",
+  "batch_gcd",
   "pow_mod",
+  "FixedBasePowMod",
   "inverse_mod",
+  "inverse_mod_many",
+  "crt",
   "is_prime",
+  "is_prime_many",
+  "make_spf_table",
+  "factorize",
+  "factorize_many",
   "generate_random_prime",
   "generate_random_safe_prime",
+  "backend",
   ]
 
 
-def gcd(num_a, num_b):
+# Backends in order of preference.
+_BACKENDS = ("gmpy", "gmp", "python")
+_AVAILABLE_BACKENDS = {
+  "gmpy": HAVE_GMPY,
+  "gmp": _gmp_math.HAVE_GMP,
+  "python": True,
+  }
+
+
+def _select_backend(requested=None):
+  """
+  Selects the requested backend if it is available; otherwise the most
+  preferred available backend.
+  """
+  requested = (requested or "").strip().lower()
+  if _AVAILABLE_BACKENDS.get(requested):
+    return requested
+  for name in _BACKENDS:
+    if _AVAILABLE_BACKENDS[name]:
+      return name
+
+
+_BACKEND = _select_backend(os.environ.get("MOM_MATH_BACKEND"))
+if _BACKEND != "gmpy":
+  _gmpy = None
+
+# Smallest operands for which libgmp through ctypes beats Python ints.
+# Below these, the ctypes call and conversion overhead dominates.
+_GMP_POW_MOD_MIN_MODULUS = 1 << 128
+_GMP_INVERSE_MOD_MIN_MODULUS = 1 << 128
+_GMP_GCD_MIN_OPERAND = 1 << 8192
+
+
+def backend():
   """
-  Calculates the greatest common divisor.
+  Returns the name of the arbitrary-precision backend used by this module.
 
-  Non-recursive fast implementation.
+  One of:
+
+  * ``"gmpy"`` -- gmpy2 or gmpy is installed.
+  * ``"gmp"`` -- libgmp is loaded through ctypes by :mod:`mom.gmp`.
+    :func:`pow_mod`, :func:`is_prime`, :func:`inverse_mod` and :func:`gcd`
+    dispatch to it for operands large enough to amortize the call overhead.
+  * ``"python"`` -- Python integers only.
+
+  The most preferred available backend is chosen at import time. Set the
+  ``MOM_MATH_BACKEND`` environment variable to one of these names to pick
+  another one; unavailable choices are ignored.
 
-  :param num_a:
-      Long value.
-  :param num_b:
-      Long value.
   :returns:
-      Greatest common divisor.
+      Backend name.
+  """
+  return _BACKEND
+
+
+def _pure_gcd(num_a, num_b):
+  """
+  Euclid's algorithm for two non-negative integers.
   """
-  num_a, num_b = max(num_a, num_b), min(num_a, num_b)
   while num_b:
-    num_a, num_b = num_b, (num_a % num_b)
+    num_a, num_b = num_b, num_a % num_b
   return num_a
 
 
-def lcm(num_a, num_b):
+if _gcd2 is None:
+  _gcd2 = _pure_gcd
+
+if _BACKEND == "gmp":
+  _python_gcd2 = _gcd2
+
+  def _gcd2(num_a, num_b):
+    """
+    Greatest common divisor of two non-negative integers, using libgmp for
+    very large operands.
+    """
+    if num_a >= _GMP_GCD_MIN_OPERAND and num_b >= _GMP_GCD_MIN_OPERAND:
+      return _gmp_math.gcd(num_a, num_b)
+    return _python_gcd2(num_a, num_b)
+
+
+def gcd(*nums):
   """
-  Least common multiple.
+  Calculates the greatest common divisor of any number of integers.
 
-  :param num_a:
-      Integer value.
-  :param num_b:
-      Integer value.
+  Uses :func:`math.gcd` when available; CPython implements it in C with
+  Lehmer's algorithm for large operands. Stops early once the result is 1.
+
+  :param nums:
+      Long values.
+  :returns:
+      Greatest common divisor (non-negative). ``gcd()`` is 0.
+  """
+  return gcd_many(nums)
+
+
+def gcd_many(nums):
+  """
+  Calculates the greatest common divisor of an iterable of integers.
+
+  :param nums:
+      An iterable of long values.
   :returns:
-      Least common multiple.
+      Greatest common divisor (non-negative). 0 for an empty iterable.
   """
-  return (num_a * num_b) // gcd(num_a, num_b)
+  result = 0
+  for num in nums:
+    result = _gcd2(result, abs(num))
+    if result == 1:
+      break
+  return result
 
 
-def inverse_mod(num_a, num_b):
+def _lcm2(num_a, num_b):
+  """
+  Least common multiple of two non-negative integers. Divides before
+  multiplying to keep the intermediate small.
+  """
+  if not num_a or not num_b:
+    return 0
+  return (num_a // _gcd2(num_a, num_b)) * num_b
+
+
+def lcm(*nums):
+  """
+  Least common multiple of any number of integers.
+
+  :param nums:
+      Integer values.
+  :returns:
+      Least common multiple (non-negative). ``lcm()`` is 1.
+  """
+  return lcm_many(nums)
+
+
+def lcm_many(nums):
+  """
+  Least common multiple of an iterable of integers.
+
+  The values are combined pairwise in a balanced tree so that both operands
+  of every multiplication have similar sizes, which is much cheaper than a
+  running left-to-right product for many large values.
+
+  :param nums:
+      An iterable of integer values.
+  :returns:
+      Least common multiple (non-negative). 1 for an empty iterable.
+  """
+  level = [abs(num) for num in nums]
+  if not level:
+    return 1
+  while len(level) > 1:
+    pairs = [_lcm2(level[i], level[i + 1])
+             for i in range(0, len(level) - 1, 2)]
+    if len(level) & 1:
+      pairs.append(level[-1])
+    level = pairs
+  return level[0]
+
+
+def _product_tree(nums):
+  """
+  Builds a product tree.
+
+  :param nums:
+      A non-empty list of integers.
+  :returns:
+      A list of levels. The first level is ``nums``; each following level
+      holds the products of adjacent pairs of the previous one, and the last
+      level holds the product of all the numbers.
+  """
+  tree = [nums]
+  while len(nums) > 1:
+    nums = [nums[i] * nums[i + 1] for i in range(0, len(nums) - 1, 2)] +\
+           nums[len(nums) & ~1:]
+    tree.append(nums)
+  return tree
+
+
+def batch_gcd(moduli):
+  """
+  Computes, for every modulus, the gcd with the product of all the others
+  using Bernstein's product and remainder trees.
+
+  This finds RSA moduli that share a prime factor with any other modulus in
+  quasi-linear time instead of the quadratic cost of pairwise gcds. A result
+  greater than 1 flags the modulus as sharing a factor; a result equal to
+  the modulus means it shares all of its factors (for example, a duplicate
+  key).
+
+  The quasi-linear bound needs the ``gmpy`` or ``gmp`` backend (see
+  :func:`backend`): division of Python integers takes quadratic time, so
+  with the ``python`` backend this is no faster than pairwise gcds.
+
+  :param moduli:
+      An iterable of positive integers.
+  :returns:
+      A list with ``gcd(moduli[i], product of moduli[j] for j != i)``.
+  """
+  if _gmpy:
+    mpz, gcd2 = _gmpy.mpz, _gcd2
+  elif _BACKEND == "gmp":
+    mpz, gcd2 = _gmp_math.gmp.Integer, _gmp_math.gmp.Integer.gcd
+  else:
+    mpz, gcd2 = int, _gcd2
+  moduli = [mpz(modulus) for modulus in moduli]
+  if not moduli:
+    return []
+  if min(moduli) < 1:
+    raise ValueError("moduli must be positive integers")
+  tree = _product_tree(moduli)
+  # Walk down the tree reducing the total product modulo each node squared.
+  remainders = tree[-1]
+  for level in reversed(tree[:-1]):
+    remainders = [remainders[i >> 1] % (node * node)
+                  for i, node in enumerate(level)]
+  return [int(gcd2(remainder // modulus, modulus))
+          for remainder, modulus in zip(remainders, moduli)]
+
+
+# Sorted small primes and their product. Reducing the product modulo a
+# candidate and taking a single gcd replaces trial division by every one of
+# these primes.
+_SMALL_PRIMES = tuple(sorted(SIEVE))
+_SMALL_PRIMES_MAX = _SMALL_PRIMES[-1]
+_SMALL_PRIMES_PRODUCT = reduce(mul, _SMALL_PRIMES)
+
+
+def _pure_inverse_mod(num_a, num_b):
   """
   Returns inverse of a mod b, zero if none
 
@@ -97,6 +337,7 @@ def inverse_mod(num_a, num_b):
   :returns:
       Inverse of a mod b, zero if none.
   """
+  num_a %= num_b
   num_c, num_d = num_a, num_b
   num_uc, num_ud = 1, 0
   while num_c:
@@ -108,6 +349,146 @@ def inverse_mod(num_a, num_b):
   return 0
 
 
+if _BACKEND == "gmpy":
+  def inverse_mod(num_a, num_b):
+    """
+    Returns inverse of a mod b, zero if none. Uses gmpy.
+
+    :param num_a:
+        Long value
+    :param num_b:
+        Long value
+    :returns:
+        Inverse of a mod b, zero if none.
+    """
+    try:
+      return int(_gmpy.invert(num_a % num_b, num_b))
+    except ZeroDivisionError:
+      return 0
+elif _BACKEND == "gmp":
+  def inverse_mod(num_a, num_b):
+    """
+    Returns inverse of a mod b, zero if none. Uses libgmp for large moduli
+    and the Extended Euclidean Algorithm otherwise.
+
+    :param num_a:
+        Long value
+    :param num_b:
+        Long value
+    :returns:
+        Inverse of a mod b, zero if none.
+    """
+    # Reduce first so that negative values give the same result on every
+    # backend and on both sides of the threshold.
+    num_a %= num_b
+    if num_b < _GMP_INVERSE_MOD_MIN_MODULUS:
+      return _pure_inverse_mod(num_a, num_b)
+    return _gmp_math.inverse_mod(num_a, num_b)
+else:
+  inverse_mod = _pure_inverse_mod
+
+
+def inverse_mod_many(values, modulus):
+  """
+  Returns the inverses of many values modulo the same modulus.
+
+  Uses Montgomery's trick: a single modular inversion of the product of all
+  the values plus 3(n-1) modular multiplications, instead of one extended
+  Euclid per value. If any value has no inverse, falls back to
+  :func:`inverse_mod` for every value.
+
+  :param values:
+      An iterable of long values.
+  :param modulus:
+      Modulus.
+  :returns:
+      A list of inverses; zero wherever none exists.
+  """
+  mpz = _gmpy.mpz if _gmpy else int
+  values = [mpz(value) for value in values]
+  if not values:
+    return []
+  modulus = mpz(modulus)
+
+  # prefixes[i] == values[0] * ... * values[i] mod modulus
+  prefixes = [values[0] % modulus]
+  for value in values[1:]:
+    prefixes.append((prefixes[-1] * value) % modulus)
+
+  inverse = inverse_mod(prefixes[-1], modulus)
+  if not inverse:
+    return [inverse_mod(value % modulus, modulus) for value in values]
+
+  inverses = [0] * len(values)
+  for i in range(len(values) - 1, 0, -1):
+    inverses[i] = int((inverse * prefixes[i - 1]) % modulus)
+    inverse = (inverse * values[i]) % modulus
+  inverses[0] = int(inverse)
+  return inverses
+
+
+# Most recently used CRT coefficients keyed by the tuple of moduli.
+_CRT_CACHE = LRUCache(64)
+
+
+def _crt_coefficients(moduli):
+  """
+  Precomputes the Chinese Remainder Theorem coefficients for the given
+  pairwise coprime moduli.
+
+  :param moduli:
+      A tuple of moduli.
+  :returns:
+      Tuple of (product of moduli, list of coefficients).
+  """
+  coefficients = _CRT_CACHE.get(moduli)
+  if coefficients is None:
+    mpz = _gmpy.mpz if _gmpy else int
+    product = reduce(mul, (mpz(modulus) for modulus in moduli), mpz(1))
+    coefficients = []
+    for modulus in moduli:
+      partial_product = product // modulus
+      inverse = inverse_mod(partial_product % modulus, modulus)
+      if not inverse and modulus != 1:
+        raise ValueError("moduli must be pairwise coprime: got %r" %
+                         (moduli,))
+      coefficients.append((partial_product * inverse) % product)
+    coefficients = product, coefficients
+    _CRT_CACHE.set(moduli, coefficients)
+  return coefficients
+
+
+def crt(residues, moduli):
+  """
+  Solves a system of congruences with the Chinese Remainder Theorem::
+
+      x = residues[i] mod moduli[i]
+
+  The coefficients for a set of moduli are computed once and cached, so
+  repeatedly solving for the same moduli (as with RSA-CRT or multi-modulus
+  arithmetic) costs only a few multiplications.
+
+  :param residues:
+      A sequence of residues.
+  :param moduli:
+      A sequence of pairwise coprime positive moduli of the same length.
+  :returns:
+      The unique ``x`` such that ``0 <= x < product(moduli)``.
+  """
+  moduli = tuple(moduli)
+  residues = tuple(residues)
+  if len(residues) != len(moduli):
+    raise ValueError("number of residues and moduli must match: got %d "
+                     "and %d" % (len(residues), len(moduli)))
+  if not moduli:
+    raise ValueError("at least one modulus is required")
+  product, coefficients = _crt_coefficients(moduli)
+  total = 0
+  for residue, coefficient in zip(residues, coefficients):
+    total += residue * coefficient
+  return int(total % product)
+
+
 def exact_log2(number):
   """
   Find and return an unsigned integer i >= 0 such that ``number == 2**i``.
@@ -145,11 +526,10 @@ def _pure_pow_mod(base, power, modulus):
   Calculates:
       base**pow mod modulus
 
-  Uses multi bit scanning with nBitScan bits at a time.
-  From Bryan G. Olson's post to comp.lang.python
-
-  Does left-to-right instead of pow()'s right-to-left,
-  thus about 30% faster than the python built-in with small bases
+  Delegates to the built-in three-argument :func:`pow`, adding support for
+  negative exponents. Python-level windowed and Montgomery exponentiation
+  (see :mod:`mom._alt_math`) are slower than the built-in at every operand
+  size on CPython and PyPy.
 
   :param base:
       Base
@@ -160,101 +540,487 @@ def _pure_pow_mod(base, power, modulus):
   :returns:
       base**pow mod modulus
   """
-  n_bit_scan = 5
-
-  #TREV - Added support for negative exponents
-  negative_result = False
   if power < 0:
-    power *= -1
-    negative_result = True
-
-  #exp2 = 2**n_bit_scan
-  exp2 = 1 << n_bit_scan
-  mask = exp2 - 1
-
-  # Break power into a list of digits of nBitScan bits.
-  # The list is recursive so easy to read in reverse direction.
-  nibbles = None
-  while power:
-    nibbles = int(power & mask), nibbles
-    power >>= n_bit_scan
-
-  # Make a table of powers of base up to 2**nBitScan - 1
-  low_powers = [1]
-  for i in range(1, exp2):
-    low_powers.append((low_powers[i - 1] * base) % modulus)
-
-  # To exponentiate by the first nibble, look it up in the table
-  nib, nibbles = nibbles
-  prod = low_powers[nib]
-
-  # For the rest, square nBitScan times, then multiply by
-  # base^nibble
-  while nibbles:
-    nib, nibbles = nibbles
-    for i in range(n_bit_scan):
-      prod = (prod * prod) % modulus
-    if nib: prod = (prod * low_powers[nib]) % modulus
-
-  #TREV - Added support for negative exponents
-  if negative_result:
-    prod_inv = inverse_mod(prod, modulus)
-    #Check to make sure the inverse is correct
-    assert (prod * prod_inv) % modulus == 1
-    return prod_inv
-  return prod
-
-
-def _pure_is_prime(num, iterations=5, _sieve=SIEVE):
+    inverse = inverse_mod(base % modulus, modulus)
+    if not inverse and modulus != 1:
+      raise ValueError("base is not invertible for the given modulus")
+    return pow(inverse, -power, modulus)
+  return pow(base, power, modulus)
+
+
+def _pure_is_prime(num, iterations=None, _sieve=_SMALL_PRIMES):
   """
   Determines whether a number is prime.
 
+  The cheapest correct strategy is picked by size:
+
+  1. Trial division by the sieve primes (a table lookup for small numbers).
+  2. Numbers below 2**64 are settled by Miller-Rabin with a fixed set of
+     witness bases, which is deterministic and needs no randomness.
+  3. Larger numbers get the Baillie-PSW test (a strong base-2 Miller-Rabin
+     round followed by a strong Lucas test) plus ``iterations`` optional
+     random-base Miller-Rabin rounds.
+
   :param num:
       Number
   :param iterations:
-      Number of iterations.
+      Number of extra random-base Rabin-Miller iterations for numbers
+      of 64 bits or more. Default ``None`` relies on Baillie-PSW alone.
+      ``0`` only performs trial division.
   :returns:
       ``True`` if prime; ``False`` otherwise.
   """
-
-  # Trial division with sieve
+  if num < 2:
+    return False
+  # Trial division with sieve. The sieve must be iterated in ascending order.
   for prime_number in _sieve:
     if prime_number >= num:
       return True
     if not num % prime_number:
       return False
-    # Passed trial division, proceed to Rabin-Miller
-  # Rabin-Miller implemented per Ferguson & Schneier
-  # Compute s, t for Rabin-Miller
-  num_s, num_t = num - 1, 0
-  while not num_s % 2:
-    num_s, num_t = num_s // 2, num_t + 1
-    # Repeat Rabin-Miller x times
-  base = 2 # Use 2 as a base for first iteration speedup, per HAC
-  for _ in range(iterations):
-    num_v = _pure_pow_mod(base, num_s, num)
-    if num_v == 1:
+    # Passed trial division, proceed to the probable prime tests.
+  if iterations == 0:
+    return True
+  return _probable_prime(num, iterations)
+
+
+# Miller-Rabin with these bases gives the correct answer for every
+# n < 2**64 (Jim Sinclair, 2011).
+_DETERMINISTIC_LIMIT = 1 << 64
+_DETERMINISTIC_BASES = (2, 325, 9375, 28178, 450775, 9780504, 1795265022)
+
+
+def _probable_prime(num, iterations=None):
+  """
+  Probable prime test for an odd number that has passed trial division.
+
+  :param num:
+      Number
+  :param iterations:
+      Number of extra random-base Rabin-Miller iterations for numbers
+      of 64 bits or more.
+  :returns:
+      ``True`` if (probably) prime; ``False`` otherwise.
+  """
+  if num < _DETERMINISTIC_LIMIT:
+    return _miller_rabin(num, _DETERMINISTIC_BASES)
+  if not (_miller_rabin(num, (2,)) and _strong_lucas_probable_prime(num)):
+    return False
+  return not iterations or _rabin_miller(num, iterations)
+
+
+def _miller_rabin(num, bases):
+  """
+  Strong probable prime test of an odd number to each of the given bases.
+
+  :param num:
+      Odd number greater than 2.
+  :param bases:
+      Witness bases. Bases that are multiples of ``num`` are skipped.
+  :returns:
+      ``True`` if ``num`` is a strong probable prime to every base;
+      ``False`` otherwise.
+  """
+  num_minus_1 = num - 1
+  num_d, num_s = num_minus_1, 0
+  while not num_d & 1:
+    num_d, num_s = num_d >> 1, num_s + 1
+  for base in bases:
+    base %= num
+    if not base:
       continue
-    i = 0
-    while num_v != num - 1:
-      if i == num_t - 1:
-        return False
-      else:
-        num_v, i = _pure_pow_mod(num_v, 2, num), i + 1
-    base = generate_random_uint_between(2, num)
+    num_v = pow(base, num_d, num)
+    if num_v == 1 or num_v == num_minus_1:
+      continue
+    for _ in range(num_s - 1):
+      num_v = (num_v * num_v) % num
+      if num_v == num_minus_1:
+        break
+    else:
+      return False
   return True
 
 
-try:
+def _rabin_miller(num, iterations=5):
+  """
+  Rabin-Miller probable prime test with random bases. Expects an odd number
+  that has already passed trial division.
+
+  :param num:
+      Number
+  :param iterations:
+      Number of iterations.
+  :returns:
+      ``True`` if probably prime; ``False`` otherwise.
+  """
+  return _miller_rabin(num, [generate_random_uint_between(2, num - 1)
+                             for _ in range(iterations)])
+
+
+def _jacobi(num_a, num_n):
+  """
+  Calculates the Jacobi symbol (a/n).
+
+  :param num_a:
+      Integer.
+  :param num_n:
+      Odd positive integer.
+  :returns:
+      1, -1 or 0.
+  """
+  num_a %= num_n
+  result = 1
+  while num_a:
+    while not num_a & 1:
+      num_a >>= 1
+      if num_n & 7 in (3, 5):
+        result = -result
+    num_a, num_n = num_n, num_a
+    if num_a & 3 == 3 and num_n & 3 == 3:
+      result = -result
+    num_a %= num_n
+  return result if num_n == 1 else 0
+
+
+def _integer_sqrt(num):
+  """
+  Calculates the integer square root of a non-negative number.
+
+  :param num:
+      Non-negative integer.
+  :returns:
+      The largest integer whose square does not exceed ``num``.
+  """
+  if num < 2:
+    return num
+  root = 1 << ((integer_bit_length(num) + 1) >> 1)
+  while 1:
+    new_root = (root + num // root) >> 1
+    if new_root >= root:
+      return root
+    root = new_root
+
+
+def _strong_lucas_probable_prime(num):
+  """
+  Strong Lucas probable prime test with Selfridge's parameters
+  (method A), as used by Baillie-PSW.
+
+  :param num:
+      Odd number greater than 2.
+  :returns:
+      ``True`` if ``num`` is a strong Lucas probable prime;
+      ``False`` otherwise.
+  """
+  # A perfect square has no D with (D/n) == -1.
+  root = _integer_sqrt(num)
+  if root * root == num:
+    return False
+
+  num_d = 5
+  while 1:
+    jacobi = _jacobi(num_d, num)
+    if jacobi == -1:
+      break
+    if jacobi == 0 and abs(num_d) != num:
+      return False
+    num_d = -num_d - 2 if num_d > 0 else -num_d + 2
+  num_q = (1 - num_d) // 4
+
+  # n + 1 = k * 2**s, with k odd.
+  num_k, num_s = num + 1, 0
+  while not num_k & 1:
+    num_k, num_s = num_k >> 1, num_s + 1
+
+  # Left-to-right binary Lucas chain with P = 1.
+  num_u, num_v, q_k = 1, 1, num_q % num
+  for bit in bin(num_k)[3:]:
+    num_u = (num_u * num_v) % num
+    num_v = (num_v * num_v - 2 * q_k) % num
+    q_k = (q_k * q_k) % num
+    if bit == "1":
+      num_u, num_v = num_u + num_v, num_d * num_u + num_v
+      if num_u & 1:
+        num_u += num
+      if num_v & 1:
+        num_v += num
+      num_u, num_v = (num_u >> 1) % num, (num_v >> 1) % num
+      q_k = (q_k * num_q) % num
+
+  if not num_u or not num_v:
+    return True
+  for _ in range(num_s - 1):
+    num_v = (num_v * num_v - 2 * q_k) % num
+    if not num_v:
+      return True
+    q_k = (q_k * q_k) % num
+  return False
+
+
+if _BACKEND == "gmpy":
   from mom._gmpy_math import is_prime as _is_prime, pow_mod as _pow_mod
-except ImportError:
+  _is_probable_prime = _is_prime
+elif _BACKEND == "gmp":
+  def _pow_mod(base, power, modulus):
+    """
+    Calculates:
+
+        base**pow mod modulus
+
+    Uses libgmp for moduli of 128 bits or more.
+
+    :param base:
+        Base
+    :param power:
+        Power
+    :param modulus:
+        Modulus
+    :returns:
+        base**pow mod modulus
+    """
+    if power < 0 or modulus < _GMP_POW_MOD_MIN_MODULUS:
+      return _pure_pow_mod(base, power, modulus)
+    return _gmp_math.pow_mod(base, power, modulus)
+
+  def _is_prime(num, iterations=None):
+    """
+    Determines whether a number is prime.
+
+    Small numbers are looked up in the sieve; larger ones are tested by
+    libgmp (trial division, Baillie-PSW and Miller-Rabin rounds).
+
+    :param num:
+        Number
+    :param iterations:
+        Number of extra Miller-Rabin rounds. ``0`` only performs trial
+        division.
+    :returns:
+        ``True`` if prime; ``False`` otherwise.
+    """
+    if num <= _SMALL_PRIMES_MAX or iterations == 0:
+      return _pure_is_prime(num, iterations)
+    return _is_probable_prime(num, iterations)
+
+  def _is_probable_prime(num, iterations=None):
+    """
+    libgmp probable prime test.
+    """
+    return _gmp_math.is_prime(num, 25 + (iterations or 0))
+else:
   _pow_mod = _pure_pow_mod
   _is_prime = _pure_is_prime
+  _is_probable_prime = _probable_prime
 
 pow_mod = _pow_mod
 is_prime = _is_prime
 
 
+class FixedBasePowMod(object):
+  """
+  Raises a fixed base to many exponents modulo a fixed modulus.
+
+  Tables of ``base**(d * 2**(window * i)) mod modulus`` are computed once
+  for every window digit ``d`` and every digit position ``i`` of an exponent
+  up to ``max_bits`` long. Each call to :meth:`pow` then needs one modular
+  multiplication per non-zero window digit of the exponent and no squarings.
+  gmpy integers are used for the table when gmpy is available.
+
+  The table holds ``ceil(max_bits / window) * (2**window - 1)`` residues.
+  Larger windows mean fewer multiplications per exponent but exponentially
+  more memory and setup time. By default the largest window whose table fits
+  in ``memory_limit`` bytes is used; see :meth:`select_window`.
+
+  Usage::
+
+      ctx = FixedBasePowMod(generator, prime, 256)
+      public_values = [ctx.pow(secret) for secret in secrets]
+
+  :param base:
+      Base.
+  :param modulus:
+      Modulus.
+  :param max_bits:
+      Largest exponent bit length to precompute for. Defaults to the bit
+      length of the modulus. Larger exponents fall back to :func:`pow_mod`.
+  :param window:
+      Window size in bits. Overrides ``memory_limit``.
+  :param memory_limit:
+      Approximate upper bound on the table size in bytes used to select
+      the window. Default 4 MiB.
+  """
+
+  MAX_WINDOW = 8
+
+  def __init__(self, base, modulus, max_bits=None, window=None,
+               memory_limit=4 << 20):
+    if modulus < 1:
+      raise ValueError("modulus must be a positive integer: got %r" %
+                       modulus)
+    max_bits = max_bits or integer_bit_length(modulus)
+    if window is None:
+      window = self.select_window(max_bits, integer_bit_length(modulus),
+                                  memory_limit)
+    if not 0 < window <= self.MAX_WINDOW:
+      raise ValueError("window must be between 1 and %d: got %r" %
+                       (self.MAX_WINDOW, window))
+    self._base = base
+    self._modulus = modulus
+    self._max_bits = max_bits
+    self._window = window
+
+    mpz = _gmpy.mpz if _gmpy else int
+    modulus = mpz(modulus)
+    row_base = mpz(base) % modulus
+    table = []
+    for _ in range(-(-max_bits // window)):
+      # row[d] == row_base**d; row[0] is never used.
+      row = [1, row_base]
+      for _ in range(2, 1 << window):
+        row.append((row[-1] * row_base) % modulus)
+      table.append(row)
+      row_base = (row[-1] * row_base) % modulus
+    self._table = table
+    self._mpz_modulus = modulus
+
+  @staticmethod
+  def select_window(max_bits, modulus_bits, memory_limit=4 << 20):
+    """
+    Selects the largest window whose table fits in the memory limit.
+
+    :param max_bits:
+        Largest exponent bit length.
+    :param modulus_bits:
+        Bit length of the modulus.
+    :param memory_limit:
+        Approximate upper bound on the table size in bytes.
+    :returns:
+        Window size in bits, at least 1.
+    """
+    residue_size = (modulus_bits >> 3) + 32
+    window = 1
+    while window < FixedBasePowMod.MAX_WINDOW:
+      rows = -(-max_bits // (window + 1))
+      if rows * ((1 << (window + 1)) - 1) * residue_size > memory_limit:
+        break
+      window += 1
+    return window
+
+  @property
+  def window(self):
+    """
+    Window size in bits.
+    """
+    return self._window
+
+  @property
+  def max_bits(self):
+    """
+    Largest exponent bit length covered by the precomputed table.
+    """
+    return self._max_bits
+
+  def pow(self, exponent):
+    """
+    Calculates:
+
+        base**exponent mod modulus
+
+    :param exponent:
+        Exponent. Negative exponents use the modular inverse.
+    :returns:
+        base**exponent mod modulus
+    :raises:
+        ``ValueError`` when the exponent is negative and the base is not
+        invertible modulo the modulus.
+    """
+    if exponent < 0:
+      inverse = inverse_mod(self.pow(-exponent), self._modulus)
+      if not inverse and self._modulus != 1:
+        raise ValueError("base is not invertible for the given modulus")
+      return inverse
+    if integer_bit_length(exponent) > self._max_bits:
+      return pow_mod(self._base, exponent, self._modulus)
+
+    modulus = self._mpz_modulus
+    window = self._window
+    mask = (1 << window) - 1
+    result = 1
+    for row in self._table:
+      if not exponent:
+        break
+      digit = exponent & mask
+      if digit:
+        result = (result * row[digit]) % modulus
+      exponent >>= window
+    return int(result % modulus)
+
+  __call__ = pow
+
+
+
+def is_prime_many(numbers, iterations=None, processes=None):
+  """
+  Determines which numbers in a batch are prime.
+
+  The product of all the small sieve primes is computed once. Each candidate
+  is then screened with one modular reduction of that product and one gcd
+  instead of hundreds of trial divisions, and only the survivors go through
+  the probable prime tests of :func:`is_prime`. Combine with
+  :func:`itertools.compress` to iterate over the primes alone::
+
+      primes = compress(numbers, is_prime_many(numbers))
+
+  :param numbers:
+      An iterable of integers.
+  :param iterations:
+      Number of extra Rabin-Miller iterations for the survivors.
+      See :func:`is_prime`.
+  :param processes:
+      If greater than 1, the batch is split across this many worker
+      processes. Default ``None`` tests the batch in this process.
+  :returns:
+      A list of booleans, ``True`` for every prime in ``numbers``.
+  """
+  numbers = list(numbers)
+  if not processes or processes < 2 or len(numbers) < 2:
+    return _is_prime_many(numbers, iterations)
+
+  import multiprocessing
+
+  size = -(-len(numbers) // processes)
+  batches = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+  pool = multiprocessing.Pool(processes)
+  try:
+    results = pool.map(partial(_is_prime_many, iterations=iterations),
+                       batches)
+  finally:
+    pool.close()
+    pool.join()
+  return [result for batch in results for result in batch]
+
+
+def _is_prime_many(numbers, iterations=None):
+  """
+  Single-process implementation of :func:`is_prime_many`.
+
+  :param numbers:
+      A sequence of integers.
+  :param iterations:
+      Number of extra Rabin-Miller iterations for the survivors.
+  :returns:
+      A list of booleans.
+  """
+  results = []
+  for num in numbers:
+    if num <= _SMALL_PRIMES_MAX:
+      results.append(num in SIEVE)
+    elif _gcd2(num, _SMALL_PRIMES_PRODUCT % num) != 1:
+      results.append(False)
+    else:
+      results.append(_is_probable_prime(num, iterations))
+  return results
+
+
 def generate_random_prime(bits):
   """
   Generates a random prime number.
@@ -286,39 +1052,278 @@ def generate_random_prime(bits):
       return random_uint
 
 
-def generate_random_safe_prime(bits):
+def generate_random_safe_prime(bits, processes=None):
   """
-  Unused at the moment.
+  Generates a random safe prime ``p = 2q + 1`` where ``q`` is also prime,
+  as used for Diffie-Hellman and SRP groups.
 
-  Generates a random prime number.
+  Candidates are drawn in intervals and sieved jointly: every candidate
+  ``q`` for which either ``q`` or ``2q + 1`` is divisible by a small prime
+  is discarded by slice assignment before any exponentiation happens. The
+  survivors get a cheap base-2 Fermat test on ``2q + 1`` before the full
+  primality tests of ``q`` and ``2q + 1``.
 
   :param bits:
       Number of bits.
+  :param processes:
+      If greater than 1, the search runs in this many worker processes
+      and the first safe prime found is returned.
   :return:
       Prime number long value.
   """
   assert not bits < 10
 
+  if not processes or processes < 2:
+    while 1:
+      safe_prime = _search_safe_prime_interval(bits)
+      if safe_prime:
+        return safe_prime
+
+  import multiprocessing
+
+  pool = multiprocessing.Pool(processes)
+  try:
+    pending = [pool.apply_async(_search_safe_prime_interval, (bits,))
+               for _ in range(processes)]
+    while 1:
+      for i, result in enumerate(pending):
+        if result.ready():
+          safe_prime = result.get()
+          if safe_prime:
+            return safe_prime
+          pending[i] = pool.apply_async(_search_safe_prime_interval, (bits,))
+      pending[0].wait(0.01)
+  finally:
+    pool.terminate()
+    pool.join()
+
+
+# Number of candidates sieved at once by generate_random_safe_prime.
+_SAFE_PRIME_INTERVAL = 1 << 14
+
+# Candidates step by 30 = lcm(2, 3, 5). The inverse of 30 modulo each of the
+# remaining small primes maps a residue class onto candidate offsets.
+_SAFE_PRIME_SIEVE = tuple((prime, inverse_mod(30, prime))
+                          for prime in _SMALL_PRIMES[3:])
+
+
+def _search_safe_prime_interval(bits, _interval=_SAFE_PRIME_INTERVAL):
+  """
+  Searches one randomly placed interval of candidates for a safe prime.
+
+  :param bits:
+      Number of bits.
+  :returns:
+      A safe prime, or ``None`` if the interval has none.
+  """
   #The 1.5 ensures the 2 MSBs are set
   #Thus, when used for p,q in RSA, n will have its MSB set
   #
   #Since 30 is lcm(2,3,5), we'll set our test numbers to
-  #29 % 30 and keep them there
+  #29 % 30 and keep them there. Then neither q nor 2q + 1 is
+  #divisible by 2, 3 or 5.
   #low = (2 ** (bits-2)) * 3 // 2
   #high = (2 ** (bits-1)) - 30
   low = (1 << (bits - 2)) * 3 // 2
   high = (1 << (bits - 1)) - 30
-  random_uint = generate_random_uint_between(low, high)
-  random_uint += 29 - (random_uint % 30)
-  while 1:
-    random_uint += 30
-    if random_uint >= high:
-      random_uint = generate_random_uint_between(low, high)
-      random_uint += 29 - (random_uint % 30)
-      #Ideas from Tom Wu's SRP code
-    #Do trial division on p and q before Rabin-Miller
-    if is_prime(random_uint, 0):
-      possible_prime = (2 * random_uint) + 1
-      if is_prime(possible_prime):
-        if is_prime(random_uint):
-          return possible_prime
+  start = generate_random_uint_between(low, high)
+  start += 29 - (start % 30)
+  length = min(_interval, (high - start) // 30 + 1)
+  if length < 1:
+    return None
+
+  # sieve[k] is zeroed if q = start + 30k or 2q + 1 has a small factor.
+  sieve = bytearray([1]) * length
+  for prime, inverse in _SAFE_PRIME_SIEVE:
+    if prime >= low:
+      # Don't discard q == prime itself when bits is tiny.
+      break
+    residue = start % prime
+    # q == 0 (mod prime)
+    offset = (-residue * inverse) % prime
+    sieve[offset::prime] = bytearray(len(range(offset, length, prime)))
+    # 2q + 1 == 0 (mod prime), that is, q == (prime - 1) / 2 (mod prime)
+    offset = ((((prime - 1) >> 1) - residue) * inverse) % prime
+    sieve[offset::prime] = bytearray(len(range(offset, length, prime)))
+
+  for k in range(length):
+    if not sieve[k]:
+      continue
+    random_uint = start + 30 * k
+    possible_prime = (2 * random_uint) + 1
+    #Ideas from Tom Wu's SRP code
+    if pow(2, possible_prime - 1, possible_prime) != 1:
+      continue
+    if is_prime(random_uint) and is_prime(possible_prime):
+      return possible_prime
+  return None
+
+
+# Entries written at a time by make_spf_table.
+_SPF_BLOCK = 1 << 16
+
+
+def make_spf_table(bound, shared=False):
+  """
+  Builds a smallest-prime-factor table for all integers below ``bound``.
+
+  ``table[n]`` is the smallest prime factor of ``n`` for ``2 <= n < bound``,
+  which lets :func:`factorize` factor any such ``n`` in O(log n) lookups.
+  The table is filled by slice assignment, visiting the primes up to
+  ``sqrt(bound)`` in descending order so the smallest factor is written
+  last. This keeps the sieve inside C loops, which outperforms a
+  Python-level linear sieve.
+
+  A table of 32-bit entries takes ``4 * bound`` bytes. With ``shared=True``
+  the table is allocated in shared memory so worker processes created
+  afterwards by :mod:`multiprocessing` read the same table without
+  copying it. Either table is filled in blocks of 65536 entries, so
+  building it takes little memory beyond the table itself.
+
+  :param bound:
+      Exclusive upper bound, at most 2**32.
+  :param shared:
+      ``True`` to allocate the table with
+      :func:`multiprocessing.sharedctypes.RawArray`. Default ``False``
+      returns an :class:`array.array` of type code ``"I"``.
+  :returns:
+      The table.
+  """
+  if not 2 <= bound <= (1 << 32):
+    raise ValueError("bound must be between 2 and 2**32: got %r" % bound)
+  if not shared:
+    table = result = array("I")
+    for low in range(0, bound, _SPF_BLOCK):
+      table.extend(range(low, min(low + _SPF_BLOCK, bound)))
+  else:
+    import ctypes
+    from multiprocessing.sharedctypes import RawArray
+
+    result = RawArray(ctypes.c_uint32, bound)
+    try:
+      table = memoryview(result).cast("B").cast("I")
+    except (NameError, AttributeError):
+      # Python 2 memoryviews cannot be cast; the ctypes array accepts the
+      # same slice assignments, converting one entry at a time.
+      table = result
+    for low in range(0, bound, _SPF_BLOCK):
+      high = min(low + _SPF_BLOCK, bound)
+      table[low:high] = array("I", range(low, high))
+
+  for prime in reversed(make_prime_sieve(_integer_sqrt(bound - 1) + 1)):
+    start = prime * prime
+    if start >= bound:
+      continue
+    fill = array("I", [prime]) * min(len(range(start, bound, prime)),
+                                     _SPF_BLOCK)
+    step = prime * _SPF_BLOCK
+    for low in range(start, bound, step):
+      high = min(low + step, bound)
+      table[low:high:prime] = fill[:len(range(low, high, prime))]
+  return result
+
+
+# Polynomial constants tried by _pollard_brent before giving up.
+_POLLARD_ATTEMPTS = 64
+
+
+def _pollard_brent(num):
+  """
+  Finds a non-trivial factor of an odd composite number using Brent's
+  variant of Pollard's rho algorithm.
+
+  :param num:
+      Odd composite number.
+  :returns:
+      A factor ``f`` with ``1 < f < num``.
+  """
+  batch = 128
+  # Every constant fails only with vanishing probability, so a few dozen
+  # are plenty. xrange(1, num) would overflow on Python 2 above
+  # sys.maxsize.
+  for num_c in islice(count(1), min(num - 1, _POLLARD_ATTEMPTS)):
+    num_y, num_r, num_q, factor = 2, 1, 1, 1
+    while factor == 1:
+      num_x = num_y
+      for _ in range(num_r):
+        num_y = (num_y * num_y + num_c) % num
+      k = 0
+      while k < num_r and factor == 1:
+        saved_y = num_y
+        for _ in range(min(batch, num_r - k)):
+          num_y = (num_y * num_y + num_c) % num
+          num_q = (num_q * abs(num_x - num_y)) % num
+        factor = _gcd2(num_q, num)
+        k += batch
+      num_r <<= 1
+    if factor == num:
+      # The batched product overshot; retrace one step at a time.
+      factor = 1
+      while factor == 1:
+        saved_y = (saved_y * saved_y + num_c) % num
+        factor = _gcd2(abs(num_x - saved_y), num)
+    if factor != num:
+      return factor
+  raise ValueError("no factor found for %r" % num)
+
+
+def factorize(num, spf_table=None):
+  """
+  Factors a positive integer into primes.
+
+  Numbers covered by ``spf_table`` are factored by repeated lookups. Larger
+  numbers are trial divided by the small sieve primes; whatever remains is
+  split with Pollard's rho (Brent's variant) and :func:`is_prime`.
+
+  :param num:
+      Positive integer.
+  :param spf_table:
+      Optional table built by :func:`make_spf_table`.
+  :returns:
+      A list of the prime factors of ``num`` in ascending order, repeated
+      according to multiplicity. ``factorize(1)`` returns ``[]``.
+  """
+  if num < 1:
+    raise ValueError("number must be a positive integer: got %r" % num)
+  bound = len(spf_table) if spf_table is not None else 0
+  factors = []
+  if num >= bound:
+    for prime in _SMALL_PRIMES:
+      if prime * prime > num or num < bound:
+        break
+      while not num % prime:
+        factors.append(prime)
+        num //= prime
+  if num < bound:
+    while num > 1:
+      prime = spf_table[num]
+      factors.append(prime)
+      num //= prime
+  elif num > 1:
+    pending = [num]
+    while pending:
+      num = pending.pop()
+      if num <= _SMALL_PRIMES_MAX ** 2 or is_prime(num):
+        # Trial division left no factor up to the largest small prime.
+        factors.append(num)
+      else:
+        factor = _pollard_brent(num)
+        pending.extend((factor, num // factor))
+  factors.sort()
+  return factors
+
+
+def factorize_many(numbers, spf_table=None):
+  """
+  Factors a stream of positive integers.
+
+  :param numbers:
+      An iterable of positive integers.
+  :param spf_table:
+      Optional table built by :func:`make_spf_table`. Build it once and
+      share it between calls and worker processes.
+  :yields:
+      For each number, the list returned by :func:`factorize`.
+  """
+  for num in numbers:
+    yield factorize(num, spf_table)
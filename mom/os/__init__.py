@@ -22,11 +22,15 @@
 
 .. automodule:: mom.os.path
 .. automodule:: mom.os.patterns
+.. automodule:: mom.os.duplicates
+.. automodule:: mom.os.manifest
 """
 
-from mom.os import path, patterns
+from mom.os import path, patterns, duplicates, manifest
 
 __all__ = [
   "path",
   "patterns",
+  "duplicates",
+  "manifest",
   ]
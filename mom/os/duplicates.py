@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom.os.duplicates
+:synopsis: Finds files with identical contents in directory trees.
+
+Hashing every file in full wastes most of the I/O, because most files have
+a unique size or differ within their first or last few kilobytes. The
+search is therefore a pipeline of increasingly expensive stages:
+
+1. Group files by size using only directory walks and ``stat`` calls.
+2. Among files of equal size, hash the first and last ``probe_size``
+   bytes. Files no larger than twice that are read completely here.
+3. Among files whose probes collide, hash the full contents.
+
+Hashing runs in a pool of threads. Groups of duplicates are yielded as
+soon as the last of their candidates has been hashed.
+
+Functions
+---------
+.. autofunction:: find_duplicates
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import stat
+import sys
+from itertools import groupby
+from mom import _concurrent
+from mom.os.path import walk, absolute_path
+from mom.os.patterns import filter_paths
+from mom.security.hash import hash_file
+
+
+__all__ = [
+  "find_duplicates",
+  ]
+
+
+DEFAULT_PROBE_SIZE = 4096
+
+
+def _report(onerror):
+  """
+  Passes the exception being handled to the error callback, if any.
+  """
+  if onerror is not None:
+    onerror(sys.exc_info()[1])
+
+
+def _regular_files(roots, included_patterns, excluded_patterns,
+                   case_sensitive, followlinks, onerror):
+  """
+  Yields ``(path, stat_result)`` for every regular file under the roots
+  that passes the pattern filters. Symbolic links are not followed.
+  """
+  for root in roots:
+    for dir_name, _, file_names in walk(root, followlinks=followlinks):
+      paths = filter_paths((absolute_path(os.path.join(dir_name, name))
+                            for name in file_names),
+                           included_patterns, excluded_patterns,
+                           case_sensitive)
+      for path in paths:
+        try:
+          stat_result = os.lstat(path)
+        except OSError:
+          _report(onerror)
+          continue
+        if stat.S_ISREG(stat_result.st_mode):
+          yield path, stat_result
+
+
+def _size_groups(files, min_size):
+  """
+  Yields ``(size, paths)`` for every size shared by at least two files.
+  Further paths to an already seen file are dropped.
+
+  ``files`` is a callable returning a fresh iterable of files. Sizes are
+  counted in a first walk. During the second walk, the paths of a repeated
+  size are kept only until the last file of that size is reached, when
+  the group is yielded and forgotten; unique files, usually the majority,
+  never use memory beyond a counter. Groups are yielded in the order in
+  which they are completed; groups left incomplete because files changed
+  between the walks are yielded after the walk.
+  """
+  counts = {}
+  for _, stat_result in files():
+    size = stat_result.st_size
+    if size >= min_size:
+      counts[size] = counts.get(size, 0) + 1
+  remaining = dict((size, count) for size, count in counts.items()
+                   if count > 1)
+  del counts
+
+  # Maps sizes to the paths and inodes of their files seen so far. Paths
+  # to one file always share its size, so inodes are tracked per size.
+  groups = {}
+  for path, stat_result in files():
+    size = stat_result.st_size
+    if size not in remaining:
+      continue
+    paths, inodes = groups.setdefault(size, ([], set()))
+    # Hard links, directory symbolic links and overlapping roots all reach
+    # one file through several paths; st_nlink only covers the first.
+    inode = (stat_result.st_dev, stat_result.st_ino)
+    if inode not in inodes:
+      inodes.add(inode)
+      paths.append(path)
+    remaining[size] -= 1
+    if not remaining[size]:
+      del remaining[size]
+      del groups[size]
+      if len(paths) > 1:
+        yield size, paths
+
+  for size in sorted(groups, reverse=True):
+    paths = groups.pop(size)[0]
+    if len(paths) > 1:
+      yield size, paths
+
+
+def _probe(path, size, probe_size, algorithm):
+  """
+  Hashes the first and last ``probe_size`` bytes of a file, or all of it
+  if it is not larger than both together.
+  """
+  hash_func = hashlib.new(algorithm)
+  file_obj = open(path, "rb")
+  try:
+    if size <= 2 * probe_size:
+      hash_func.update(file_obj.read())
+    else:
+      hash_func.update(file_obj.read(probe_size))
+      file_obj.seek(-probe_size, os.SEEK_END)
+      hash_func.update(file_obj.read(probe_size))
+  finally:
+    file_obj.close()
+  return hash_func.digest()
+
+
+def _hashed_groups(groups, hash_func, workers, onerror):
+  """
+  Hashes every path of every ``(key, paths)`` group in a thread pool and
+  yields ``(key, digest, paths)`` for digests shared by two or more paths,
+  as soon as all paths of a group are hashed.
+  """
+  def _hash(item):
+    """Hashes one path of a group; returns None on errors."""
+    key, path = item
+    try:
+      return hash_func(key, path)
+    except (IOError, OSError):
+      _report(onerror)
+      return None
+
+  items = ((key, path) for key, paths in groups for path in paths)
+  results = _concurrent.imap(_hash, items, workers)
+  for key, hashed in groupby(results, lambda result: result[0][0]):
+    by_digest = {}
+    for (_, path), digest in hashed:
+      if digest is not None:
+        by_digest.setdefault(digest, []).append(path)
+    for digest in sorted(by_digest):
+      paths = by_digest[digest]
+      if len(paths) > 1:
+        yield key, digest, sorted(paths)
+
+
+def find_duplicates(roots,
+                    included_patterns=None,
+                    excluded_patterns=None,
+                    case_sensitive=True,
+                    followlinks=False,
+                    min_size=1,
+                    algorithm="sha1",
+                    workers=None,
+                    probe_size=DEFAULT_PROBE_SIZE,
+                    onerror=None):
+  """
+  Finds groups of files with identical contents::
+
+      for size, digest, paths in find_duplicates(["/srv/a", "/srv/b"],
+                                                 ["*.jpg", "*.png"]):
+        print(size * (len(paths) - 1), "bytes wasted by", paths)
+
+  Every tree is walked twice: once to count file sizes and once to
+  collect the paths of files whose size is not unique. The files of each
+  such size are hashed as soon as the second walk has found all of them,
+  so hashing overlaps the walk and only the paths of sizes still being
+  collected are kept in memory; the hashing stages have a bounded number
+  of files in flight. Paths to the same file, through hard links,
+  symbolic links to directories or overlapping roots, count as one file.
+
+  :param roots:
+      Iterable of directory paths to search.
+  :param included_patterns:
+      Only consider files whose absolute paths match one of these
+      wildcard patterns; see :func:`mom.os.patterns.filter_paths`.
+  :param excluded_patterns:
+      Ignore files whose absolute paths match one of these patterns.
+  :param case_sensitive:
+      ``True`` if pattern matching is case-sensitive; ``False`` otherwise.
+  :param followlinks:
+      ``True`` to descend into symbolic links to directories. Symbolic
+      links to files are never reported.
+  :param min_size:
+      Ignore files smaller than this many bytes. Default 1 skips empty
+      files.
+  :param algorithm:
+      Name of the :mod:`hashlib` algorithm used for probes and full
+      hashes. Default "sha1".
+  :param workers:
+      Number of hashing threads. Default ``None`` picks one based on the
+      number of CPUs; 1 hashes in the calling thread.
+  :param probe_size:
+      Bytes hashed from each end of a file before hashing all of it.
+  :param onerror:
+      Optional callable receiving the :class:`OSError` or
+      :class:`IOError` for files that cannot be read; such files are
+      skipped.
+  :yields:
+      Tuples of ``(size, digest, paths)`` with the sorted absolute paths
+      of two or more files with identical contents, in no particular
+      order.
+  """
+  hashlib.new(algorithm)
+  if probe_size < 1:
+    raise ValueError("probe_size must be positive: got %r" % probe_size)
+  roots = list(roots)
+
+  def _files():
+    """Walks the trees."""
+    return _regular_files(roots, included_patterns, excluded_patterns,
+                          case_sensitive, followlinks, onerror)
+
+  def _probe_key(size, path):
+    """Probe digest of a file of the given size."""
+    return _probe(path, size, probe_size, algorithm)
+
+  def _full_key(key, path):
+    """Full digest of a file whose probe collided."""
+    size, probe = key
+    if size <= 2 * probe_size:
+      # The probe already covered the whole file.
+      return probe
+    return hash_file(path, algorithm)
+
+  probed = _hashed_groups(_size_groups(_files, min_size), _probe_key,
+                          workers, onerror)
+  collisions = (((size, probe), paths) for size, probe, paths in probed)
+  confirmed = _hashed_groups(collisions, _full_key, workers, onerror)
+  return ((size, digest, paths) for (size, _), digest, paths in confirmed)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom.os.manifest
+:synopsis: Incremental checksum manifests of directory trees.
+
+A manifest maps the relative path of every file in a tree to its size,
+modification time in nanoseconds, inode number and content digest, and
+is stored in an SQLite database. When a manifest is updated, only files
+whose ``(size, mtime_ns, inode)`` signature changed are hashed again, so
+verifying a large tree with few changes costs little more than a walk.
+
+Files modified within two seconds of the start of an update are stored
+with an invalid signature and hashed again on the next update, because a
+later write within the file system's timestamp resolution could leave the
+signature unchanged.
+
+Functions
+---------
+.. autofunction:: update_manifest
+.. autofunction:: read_manifest
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import sqlite3
+import stat
+import sys
+import time
+from collections import namedtuple
+from mom import _concurrent
+from mom._compat import EMPTY_BYTE
+from mom.os.path import list_files
+from mom.os.patterns import filter_paths
+from mom.security.hash import hash_file
+
+
+__all__ = [
+  "ManifestChanges",
+  "ManifestEntry",
+  "read_manifest",
+  "update_manifest",
+  ]
+
+
+ManifestEntry = namedtuple("ManifestEntry", "size mtime_ns inode digest")
+ManifestChanges = namedtuple("ManifestChanges", "added removed modified")
+
+# Modification times this close to the start of an update are not trusted.
+_RACY_INTERVAL_NS = 2 * 10 ** 9
+
+# Stored instead of the modification time of entries that must be hashed
+# again on the next update.
+_RACY_MTIME_NS = -1
+
+# Stored instead of the digest of entries whose digest is not known, e.g.
+# unreadable files after a change of algorithm.
+_UNKNOWN_DIGEST = EMPTY_BYTE
+
+_SCHEMA = (
+  "CREATE TABLE IF NOT EXISTS entries ("
+  "path TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+  "mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, "
+  "digest BLOB NOT NULL)",
+  "CREATE TABLE IF NOT EXISTS settings ("
+  "name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+  )
+
+
+def _mtime_ns(stat_result):
+  """
+  Modification time in nanoseconds; exact where the platform provides it.
+  """
+  try:
+    return stat_result.st_mtime_ns
+  except AttributeError:
+    return int(stat_result.st_mtime * 10 ** 9)
+
+
+def _connect(manifest_path):
+  """
+  Opens a manifest database, creating its tables if needed.
+  """
+  connection = sqlite3.connect(manifest_path)
+  for statement in _SCHEMA:
+    connection.execute(statement)
+  return connection
+
+
+def _stored_algorithm(connection):
+  """
+  Name of the digest algorithm of a manifest, or ``None`` if it is empty.
+  """
+  row = connection.execute(
+    "SELECT value FROM settings WHERE name = 'algorithm'").fetchone()
+  return row and row[0]
+
+
+def _entries(connection):
+  """
+  Reads all entries of a manifest database.
+  """
+  return dict((path, ManifestEntry(size, mtime_ns, inode, bytes(digest)))
+              for path, size, mtime_ns, inode, digest in connection.execute(
+                "SELECT path, size, mtime_ns, inode, digest FROM entries"))
+
+
+def read_manifest(manifest_path):
+  """
+  Reads a manifest.
+
+  :param manifest_path:
+      Path of the manifest database.
+  :returns:
+      Dictionary mapping relative paths, with "/" separators, to
+      :class:`ManifestEntry` tuples of ``(size, mtime_ns, inode, digest)``.
+      The digest is empty for files that could not be hashed since the
+      algorithm was last changed.
+  """
+  connection = _connect(manifest_path)
+  try:
+    return _entries(connection)
+  finally:
+    connection.close()
+
+
+def update_manifest(root,
+                    manifest_path,
+                    algorithm="sha1",
+                    workers=None,
+                    included_patterns=None,
+                    excluded_patterns=None,
+                    case_sensitive=True,
+                    followlinks=False,
+                    save=True,
+                    onerror=None):
+  """
+  Brings the manifest of a directory tree up to date and reports what
+  changed since the previous update::
+
+      changes = update_manifest("/srv/release", "/var/lib/release.manifest")
+      if changes.modified or changes.removed:
+        ...
+
+  Files whose size, modification time and inode are unchanged keep their
+  stored digest; all others are hashed in a pool of threads. A file whose
+  signature changed but whose digest did not, e.g. one that was only
+  touched, is not reported as modified.
+
+  :param root:
+      Directory whose files are listed with :func:`mom.os.path.list_files`.
+  :param manifest_path:
+      Path of the manifest database; created if it does not exist.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha1". Changing the
+      algorithm of an existing manifest hashes every file again.
+  :param workers:
+      Number of hashing threads. Default ``None`` picks one based on the
+      number of CPUs; 1 hashes in the calling thread.
+  :param included_patterns:
+      Only include files whose relative paths match one of these wildcard
+      patterns; see :func:`mom.os.patterns.filter_paths`.
+  :param excluded_patterns:
+      Exclude files whose relative paths match one of these patterns.
+  :param case_sensitive:
+      ``True`` if pattern matching is case-sensitive; ``False`` otherwise.
+  :param followlinks:
+      Please see the documentation for :func:`os.walk`
+  :param save:
+      ``False`` to only compare the tree with the manifest without
+      storing the result, e.g. to verify a deployment.
+  :param onerror:
+      Optional callable receiving the :class:`OSError` or
+      :class:`IOError` for files that cannot be read; such files keep
+      their previous entry, are not reported and are hashed again on the
+      next update. By default these errors are raised.
+  :returns:
+      :class:`ManifestChanges` tuple of ``(added, removed, modified)``
+      sets of relative paths.
+  """
+  hashlib.new(algorithm)
+  root = os.path.abspath(root)
+  start_ns = int(time.time() * 10 ** 9)
+  connection = _connect(manifest_path)
+  try:
+    stored = _entries(connection)
+    if _stored_algorithm(connection) not in (None, algorithm):
+      # Digests of another algorithm cannot be compared: hash every file
+      # again and report only added and removed files.
+      stored = dict((path, entry._replace(mtime_ns=_RACY_MTIME_NS,
+                                          digest=_UNKNOWN_DIGEST))
+                    for path, entry in stored.items())
+
+    current = {}
+    to_hash = []
+    updates = []
+
+    def _skip(relpath):
+      """Keeps the entry of an unreadable file, to be hashed next time."""
+      entry = stored.get(relpath)
+      if entry is not None:
+        current[relpath] = entry[:3]
+        updates.append((relpath, entry.size, _RACY_MTIME_NS, entry.inode,
+                        entry.digest))
+
+    for relpath, stat_result in _tree_files(root, included_patterns,
+                                            excluded_patterns,
+                                            case_sensitive, followlinks,
+                                            onerror):
+      if stat_result is None:
+        _skip(relpath)
+        continue
+      size, mtime_ns, inode = (stat_result.st_size, _mtime_ns(stat_result),
+                               stat_result.st_ino)
+      if mtime_ns >= start_ns - _RACY_INTERVAL_NS:
+        mtime_ns = _RACY_MTIME_NS
+      current[relpath] = (size, mtime_ns, inode)
+      entry = stored.get(relpath)
+      if (entry is not None and mtime_ns != _RACY_MTIME_NS and
+          (entry.size, entry.mtime_ns, entry.inode) == (size, mtime_ns,
+                                                        inode)):
+        continue
+      to_hash.append(relpath)
+
+    def _hash(relpath):
+      """Hashes one file; returns None if it cannot be read."""
+      try:
+        return hash_file(os.path.join(root, *relpath.split("/")), algorithm)
+      except (IOError, OSError):
+        if onerror is None:
+          raise
+        onerror(sys.exc_info()[1])
+        return None
+
+    added, modified = set(), set()
+    for relpath, digest in _concurrent.imap(_hash, to_hash, workers,
+                                            ordered=False):
+      if digest is None:
+        _skip(relpath)
+        continue
+      entry = stored.get(relpath)
+      if entry is None:
+        added.add(relpath)
+      elif entry.digest != _UNKNOWN_DIGEST and entry.digest != digest:
+        modified.add(relpath)
+      updates.append((relpath,) + current[relpath] + (digest,))
+    removed = set(stored) - set(current)
+
+    if save:
+      _save(connection, algorithm, updates, removed)
+    return ManifestChanges(added, removed, modified)
+  finally:
+    connection.close()
+
+
+def _tree_files(root, included_patterns, excluded_patterns, case_sensitive,
+                followlinks, onerror):
+  """
+  Yields ``(relative path, stat_result)`` for the regular files of a tree,
+  with ``None`` for files that cannot be examined. Relative paths use "/"
+  as the separator on every platform.
+  """
+  prefix = len(root.rstrip(os.sep)) + 1
+  relpaths = (path[prefix:].replace(os.sep, "/")
+              for path in list_files(root, followlinks=followlinks))
+  for relpath in filter_paths(relpaths, included_patterns,
+                              excluded_patterns, case_sensitive):
+    try:
+      stat_result = os.lstat(os.path.join(root, *relpath.split("/")))
+    except OSError:
+      if onerror is None:
+        raise
+      onerror(sys.exc_info()[1])
+      yield relpath, None
+      continue
+    if stat.S_ISREG(stat_result.st_mode):
+      yield relpath, stat_result
+
+
+def _save(connection, algorithm, updates, removed):
+  """
+  Stores changed and new entries and deletes removed ones in one
+  transaction.
+  """
+  connection.execute("INSERT OR REPLACE INTO settings VALUES "
+                     "('algorithm', ?)", (algorithm,))
+  connection.executemany("DELETE FROM entries WHERE path = ?",
+                         [(relpath,) for relpath in removed])
+  connection.executemany("INSERT OR REPLACE INTO entries VALUES "
+                         "(?, ?, ?, ?, ?)",
+                         [(relpath, size, mtime_ns, inode,
+                           sqlite3.Binary(digest))
+                          for relpath, size, mtime_ns, inode, digest
+                          in updates])
+  connection.commit()
@@ -25,6 +25,10 @@ PEM key decoders
 .. autofunction:: public_key_pem_decode
 .. autofunction:: private_key_pem_decode
 
+PEM key encoders
+----------------
+.. autofunction:: private_key_pem_encode
+
 """
 
 from __future__ import absolute_import
@@ -75,3 +79,19 @@ def private_key_pem_decode(pem_key):
   else:
     raise NotImplementedError("Only PEM private RSA keys can be read.")
   return key
+
+
+def private_key_pem_encode(key_info, pkcs8=False):
+  """
+  Encodes RSA private key information into a PEM-encoded private key string.
+
+  :param key_info:
+      A dictionary of key information as returned by
+      :func:`private_key_pem_decode`.
+  :param pkcs8:
+      ``True`` to produce a PKCS#8 ``PRIVATE KEY``; default ``False``
+      produces a PKCS#1 ``RSA PRIVATE KEY``.
+  :returns:
+      The PEM-encoded RSA private key.
+  """
+  return RSAPrivateKey.encode_key_info(key_info, pkcs8)
@@ -34,6 +34,12 @@ ASN.1 Syntax::
      coefficient INTEGER -- (inverse of q) mod p }
 
    Version ::= INTEGER
+
+   PrivateKeyInfo ::= SEQUENCE {
+     version Version,
+     privateKeyAlgorithm AlgorithmIdentifier,
+     privateKey OCTET STRING,
+     attributes [0] IMPLICIT Attributes OPTIONAL }
 """
 
 # Read unencrypted PKCS#1/PKIX-compliant, PEM & DER encoded private keys.
@@ -41,6 +47,7 @@ ASN.1 Syntax::
 
 from __future__ import absolute_import
 from pyasn1.type import univ, namedtype, namedval, constraint
+from mom.security.codec.asn1.x509 import AlgorithmIdentifier
 
 
 class DSAPrivateKey(univ.Sequence):
@@ -86,3 +93,12 @@ class RSAPrivateKey(univ.Sequence):
     namedtype.NamedType('coefficient', univ.Integer()),
     namedtype.OptionalNamedType('otherPrimeInfos', OtherPrimeInfos())
   )
+
+
+class PrivateKeyInfo(univ.Sequence):
+  """PKCS#8 private key information structure (without attributes)"""
+  componentType = namedtype.NamedTypes(
+    namedtype.NamedType('version', univ.Integer()),
+    namedtype.NamedType('privateKeyAlgorithm', AlgorithmIdentifier()),
+    namedtype.NamedType('privateKey', univ.OctetString())
+  )
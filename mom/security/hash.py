@@ -37,24 +37,58 @@ HMAC-SHA-1 digests
 .. autofunction:: hmac_sha1_base64_digest
 .. autofunction:: hmac_sha1_digest
 
+HMAC signers
+------------
+.. autoclass:: HmacSigner
+   :members:
+
+File digests
+------------
+.. autofunction:: hash_file
+.. autofunction:: hash_files
+.. autofunction:: multi_digest
+
+Tree hashes
+-----------
+.. autofunction:: tree_hash
+.. autofunction:: tree_hash_file
+.. autofunction:: tree_hash_leaf
+.. autofunction:: tree_hash_root
+
 """
 
 from __future__ import absolute_import
 
 import hashlib
-from mom.builtins import is_bytes
+import hmac
+import mmap
+import os
+import threading
+from functools import partial
+from mom import _concurrent
+from mom._cache import LRUCache
+from mom._compat import ZERO_BYTE, EMPTY_BYTE, byte_ord
+from mom.builtins import is_bytes, bytes, byte
 from mom.codec import base64_encode, hex_encode
 
 
 __all__ = [
+  "HmacSigner",
+  "hash_file",
+  "hash_files",
   "hmac_sha1_base64",
   "hmac_sha1_digest",
   "md5_base64_digest",
   "md5_digest",
   "md5_hex_digest",
+  "multi_digest",
   "sha1_base64_digest",
   "sha1_digest",
   "sha1_hex_digest",
+  "tree_hash",
+  "tree_hash_file",
+  "tree_hash_leaf",
+  "tree_hash_root",
   ]
 
 
@@ -150,6 +184,9 @@ def hmac_sha1_digest(key, data):
   """
   Calculates a HMAC SHA-1 digest.
 
+  Signers for recently used keys are cached, so signing many messages with
+  the same key does not derive the keyed hash states every time.
+
   :param key:
       The key for the digest.
   :param data:
@@ -157,13 +194,11 @@ def hmac_sha1_digest(key, data):
   :returns:
       HMAC SHA-1 Digest.
   """
-  import hmac
-
   if not is_bytes(data):
     raise TypeError(
       "data type must be bytes: got %r" % type(data).__name__)
 
-  return hmac.new(key, data, hashlib.sha1).digest()
+  return _cached_signer(key, hashlib.sha1).sign(data)
 
 
 def hmac_sha1_base64_digest(key, data):
@@ -179,3 +214,509 @@ def hmac_sha1_base64_digest(key, data):
   """
   return base64_encode(hmac_sha1_digest(key, data))
 
+
+
+try:
+  _compare_digest = hmac.compare_digest
+except AttributeError:
+  def _compare_digest(a, b):
+    """
+    Compares two byte strings in time that depends only on their length.
+    """
+    if len(a) != len(b):
+      return False
+    result = 0
+    for x, y in zip(a, b):
+      result |= byte_ord(x) ^ byte_ord(y)
+    return result == 0
+
+
+# Translation tables that XOR every byte with the HMAC pad values.
+_INNER_PAD = EMPTY_BYTE.join([byte(x ^ 0x36) for x in range(256)])
+_OUTER_PAD = EMPTY_BYTE.join([byte(x ^ 0x5c) for x in range(256)])
+
+
+class HmacSigner(object):
+  """
+  HMAC calculator for a fixed key.
+
+  :func:`hmac.new` hashes the key and both pads for every message, which
+  dominates the cost of signing small payloads such as OAuth base strings.
+  A signer derives the keyed inner and outer hash states once; every
+  digest then costs two ``copy()`` calls and the hashing of the message
+  itself::
+
+      signer = HmacSigner(consumer_secret)
+      signature = signer.sign_base64(base_string)
+
+  Signers are immutable and can be shared between threads.
+
+  :param key:
+      The key bytes.
+  :param digestmod:
+      A :mod:`hashlib` constructor such as :func:`hashlib.sha256`, or the
+      name of an algorithm. Default SHA-1.
+  """
+
+  def __init__(self, key, digestmod=hashlib.sha1):
+    if not is_bytes(key):
+      raise TypeError(
+        "key type must be bytes: got %r" % type(key).__name__)
+    if isinstance(digestmod, str):
+      digestmod = partial(hashlib.new, digestmod)
+    inner = digestmod()
+    block_size = inner.block_size
+    if len(key) > block_size:
+      key = digestmod(key).digest()
+    key += ZERO_BYTE * (block_size - len(key))
+    inner.update(key.translate(_INNER_PAD))
+    outer = digestmod()
+    outer.update(key.translate(_OUTER_PAD))
+    self._inner = inner
+    self._outer = outer
+    self.digest_size = inner.digest_size
+
+  def sign(self, data):
+    """
+    Calculates the HMAC digest of a message.
+
+    :param data:
+        The raw bytes data to sign.
+    :returns:
+        HMAC digest.
+    """
+    if not is_bytes(data):
+      raise TypeError(
+        "data type must be bytes: got %r" % type(data).__name__)
+    inner = self._inner.copy()
+    inner.update(data)
+    outer = self._outer.copy()
+    outer.update(inner.digest())
+    return outer.digest()
+
+  def sign_base64(self, data):
+    """
+    Calculates the Base-64-encoded HMAC digest of a message.
+
+    :param data:
+        The raw bytes data to sign.
+    :returns:
+        Base-64-encoded HMAC digest.
+    """
+    return base64_encode(self.sign(data))
+
+  def sign_many(self, messages):
+    """
+    Calculates the HMAC digests of many messages.
+
+    :param messages:
+        Iterable of raw bytes messages.
+    :returns:
+        List of HMAC digests in the same order.
+    """
+    return [self.sign(data) for data in messages]
+
+  def verify(self, data, signature):
+    """
+    Checks the HMAC digest of a message in constant time.
+
+    :param data:
+        The raw bytes data that was signed.
+    :param signature:
+        The HMAC digest to check.
+    :returns:
+        ``True`` if the signature matches; ``False`` otherwise.
+    """
+    if not is_bytes(signature):
+      raise TypeError(
+        "signature type must be bytes: got %r" % type(signature).__name__)
+    return _compare_digest(self.sign(data), signature)
+
+
+# Most recently used signers keyed by (SHA-256 of the key, digestmod), so
+# that the cache does not keep raw secrets alive.
+_SIGNERS = LRUCache(128)
+
+
+def _cached_signer(key, digestmod):
+  """
+  Returns a signer for the key from the LRU cache, creating it if needed.
+  """
+  if not is_bytes(key):
+    raise TypeError(
+      "key type must be bytes: got %r" % type(key).__name__)
+  cache_key = (hashlib.sha256(key).digest(), digestmod)
+  signer = _SIGNERS.get(cache_key)
+  if signer is None:
+    signer = HmacSigner(key, digestmod)
+    _SIGNERS.set(cache_key, signer)
+  return signer
+
+
+# Size of the read buffer reused by every thread.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Files at least this large are memory-mapped and hashed in one call.
+DEFAULT_MMAP_THRESHOLD = 1 << 26
+
+_BUFFERS = threading.local()
+
+
+def _read_buffer(chunk_size):
+  """
+  Returns this thread's read buffer of the given size as a memoryview.
+  """
+  view = getattr(_BUFFERS, "view", None)
+  if view is None or len(view) != chunk_size:
+    view = _BUFFERS.view = memoryview(bytearray(chunk_size))
+  return view
+
+
+def _hash_open_file(hash_func, file_obj, chunk_size, mmap_threshold):
+  """
+  Feeds the contents of a binary file opened without buffering to a hash.
+  """
+  size = os.fstat(file_obj.fileno()).st_size
+  if mmap_threshold is not None and size >= max(mmap_threshold, 1):
+    mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      hash_func.update(mapped)
+    finally:
+      mapped.close()
+    return hash_func
+  view = _read_buffer(chunk_size)
+  while True:
+    count = file_obj.readinto(view)
+    if not count:
+      return hash_func
+    hash_func.update(view[:count])
+
+
+def hash_file(path, algorithm="sha1", chunk_size=DEFAULT_CHUNK_SIZE,
+              mmap_threshold=DEFAULT_MMAP_THRESHOLD):
+  """
+  Calculates the digest of a file's contents.
+
+  The file is read with ``readinto`` into a buffer that is reused by all
+  calls in the same thread, so no new bytes objects are created per chunk.
+  Files of at least ``mmap_threshold`` bytes are memory-mapped and hashed
+  with a single call instead.
+
+  :param path:
+      Path of the file.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha1".
+  :param chunk_size:
+      Size of the read buffer in bytes.
+  :param mmap_threshold:
+      Minimum file size to memory-map; ``None`` never memory-maps.
+  :returns:
+      A byte string containing the message digest.
+  """
+  hash_func = hashlib.new(algorithm)
+  file_obj = open(path, "rb", 0)
+  try:
+    _hash_open_file(hash_func, file_obj, chunk_size, mmap_threshold)
+  finally:
+    file_obj.close()
+  return hash_func.digest()
+
+
+def hash_files(paths, algorithm="sha1", workers=None,
+               chunk_size=DEFAULT_CHUNK_SIZE,
+               mmap_threshold=DEFAULT_MMAP_THRESHOLD,
+               ordered=True):
+  """
+  Calculates the digests of many files concurrently.
+
+  hashlib and file reads release the GIL on large buffers, so a pool of
+  threads hashing different files scales with cores and disks. Paths are
+  consumed lazily and only a few per worker are in flight at a time, so
+  this composes with :func:`mom.os.path.list_files` on large trees::
+
+      for path, digest in hash_files(list_files("/srv/app"), "sha256"):
+        ...
+
+  :param paths:
+      Iterable of file paths.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha1".
+  :param workers:
+      Number of threads. Default ``None`` picks one based on the number of
+      CPUs; 1 hashes in the calling thread.
+  :param chunk_size:
+      Size of each thread's read buffer in bytes.
+  :param mmap_threshold:
+      Minimum file size to memory-map; ``None`` never memory-maps.
+  :param ordered:
+      ``True`` to yield results in the order of ``paths``; ``False`` to
+      yield them as they complete.
+  :yields:
+      Tuples of ``(path, digest)``. Errors reading a file, e.g.
+      :class:`IOError`, are raised when its result is reached.
+  """
+  # Raises ValueError for unknown algorithms before any work is queued.
+  hashlib.new(algorithm)
+  if chunk_size < 1:
+    raise ValueError("chunk_size must be positive: got %r" % chunk_size)
+
+  def _hash(path):
+    """Hashes one file."""
+    return hash_file(path, algorithm, chunk_size, mmap_threshold)
+
+  return _concurrent.imap(_hash, paths, workers, ordered)
+
+
+# Encoders for the ``encoding`` argument of multi_digest.
+_DIGEST_ENCODERS = {
+  None: lambda digest: digest,
+  "hex": hex_encode,
+  "base64": base64_encode,
+  }
+
+# Smallest chunk for which multi_digest updates hashes in parallel.
+_PARALLEL_MIN_CHUNK = 1 << 16
+
+
+def multi_digest(data, algorithms=("md5", "sha1", "sha256"),
+                 chunk_size=DEFAULT_CHUNK_SIZE, parallel=False,
+                 encoding=None):
+  """
+  Calculates several digests of the same data in a single pass.
+
+  Each chunk of a stream is read once and fed to every hash, so a large
+  upload is not read and scanned once per algorithm.
+
+  :param data:
+      Bytes, or a binary file-like object to read until EOF.
+  :param algorithms:
+      Names of :mod:`hashlib` algorithms.
+  :param chunk_size:
+      Read buffer size in bytes for streams.
+  :param parallel:
+      ``True`` to update the hashes in separate threads for chunks of at
+      least 64 KiB. hashlib releases the GIL while hashing, so this helps
+      on multi-core machines.
+  :param encoding:
+      ``None`` for raw digests, "hex" or "base64".
+  :returns:
+      Dictionary mapping algorithm names to digests.
+  """
+  try:
+    encoder = _DIGEST_ENCODERS[encoding]
+  except KeyError:
+    raise ValueError("unsupported encoding: %r" % (encoding,))
+  if chunk_size < 1:
+    raise ValueError("chunk_size must be positive: got %r" % chunk_size)
+  algorithms = list(algorithms)
+  hashers = [hashlib.new(algorithm) for algorithm in algorithms]
+
+  executor = None
+  if parallel and len(hashers) > 1 and _concurrent.HAVE_FUTURES:
+    executor = _concurrent.futures.ThreadPoolExecutor(len(hashers) - 1)
+  try:
+    if is_bytes(data):
+      _update_all(hashers, data, executor)
+    else:
+      readinto = getattr(data, "readinto", None)
+      view = _read_buffer(chunk_size)
+      while True:
+        if readinto is None:
+          chunk = data.read(chunk_size)
+        else:
+          count = readinto(view)
+          chunk = view[:count or 0]
+        if not len(chunk):
+          break
+        _update_all(hashers, chunk, executor)
+  finally:
+    if executor is not None:
+      executor.shutdown(wait=True)
+
+  return dict((algorithm, encoder(hash_func.digest()))
+              for algorithm, hash_func in zip(algorithms, hashers))
+
+
+def _update_all(hashers, chunk, executor):
+  """
+  Updates every hash with the chunk; the first in the calling thread and
+  the rest in the executor when one is given and the chunk is large.
+  """
+  if executor is None or len(chunk) < _PARALLEL_MIN_CHUNK:
+    for hash_func in hashers:
+      hash_func.update(chunk)
+    return
+  pending = [executor.submit(hash_func.update, chunk)
+             for hash_func in hashers[1:]]
+  hashers[0].update(chunk)
+  for future in pending:
+    future.result()
+
+
+# Domain separation prefixes, so that a leaf can never be mistaken for an
+# internal node.
+_TREE_LEAF_PREFIX = ZERO_BYTE
+_TREE_NODE_PREFIX = byte(1)
+
+DEFAULT_TREE_LEAF_SIZE = 1 << 20
+
+
+def tree_hash_leaf(data, algorithm="sha256"):
+  """
+  Calculates the digest of one leaf of a tree hash, e.g. to re-verify a
+  single range of a file against a stored leaf list.
+
+  :param data:
+      The bytes of the leaf.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm.
+  :returns:
+      Leaf digest.
+  """
+  hash_func = hashlib.new(algorithm, _TREE_LEAF_PREFIX)
+  hash_func.update(data)
+  return hash_func.digest()
+
+
+def tree_hash_root(leaves, algorithm="sha256", fanout=2):
+  """
+  Calculates the root digest of a tree hash from its leaf digests.
+
+  Every internal node hashes up to ``fanout`` consecutive child digests;
+  a trailing node without siblings is promoted to the next level as is.
+  The root of a single leaf is the leaf digest.
+
+  :param leaves:
+      Non-empty sequence of leaf digests.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm.
+  :param fanout:
+      Number of children per internal node; at least 2.
+  :returns:
+      Root digest.
+  """
+  if fanout < 2:
+    raise ValueError("fanout must be at least 2: got %r" % fanout)
+  level = list(leaves)
+  if not level:
+    raise ValueError("at least one leaf digest is required.")
+  while len(level) > 1:
+    parents = []
+    for start in range(0, len(level), fanout):
+      children = level[start:start + fanout]
+      if len(children) == 1:
+        parents.append(children[0])
+      else:
+        hash_func = hashlib.new(algorithm, _TREE_NODE_PREFIX)
+        for child in children:
+          hash_func.update(child)
+        parents.append(hash_func.digest())
+    level = parents
+  return level[0]
+
+
+def _tree_hash_view(view, algorithm, leaf_size, fanout, workers,
+                    return_leaves):
+  """
+  Tree hash of a buffer whose leaves are hashed in a thread pool.
+  """
+  hashlib.new(algorithm)
+  if leaf_size < 1:
+    raise ValueError("leaf_size must be positive: got %r" % leaf_size)
+  if fanout < 2:
+    raise ValueError("fanout must be at least 2: got %r" % fanout)
+
+  def _leaf(start):
+    """Hashes the leaf at the offset."""
+    return tree_hash_leaf(view[start:start + leaf_size], algorithm)
+
+  starts = range(0, max(len(view), 1), leaf_size)
+  leaves = [digest for _, digest in _concurrent.imap(_leaf, starts, workers)]
+  root = tree_hash_root(leaves, algorithm, fanout)
+  if return_leaves:
+    return root, leaves
+  return root
+
+
+def tree_hash(data, algorithm="sha256", leaf_size=DEFAULT_TREE_LEAF_SIZE,
+              fanout=2, workers=None, return_leaves=False):
+  """
+  Calculates a Merkle tree hash of in-memory data, hashing the leaves
+  concurrently.
+
+  The data is split into leaves of ``leaf_size`` bytes (the last one may
+  be shorter). A leaf digest is ``H(0x00 || leaf)`` and an internal node
+  digest is ``H(0x01 || child digests)``; see :func:`tree_hash_root`.
+  Unlike a plain digest, which is bound to one core, the leaves are hashed
+  in a pool of threads since hashlib releases the GIL. The root depends
+  on ``algorithm``, ``leaf_size`` and ``fanout``, so store them with it.
+
+  :param data:
+      Bytes or any object supporting the buffer protocol.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha256".
+  :param leaf_size:
+      Leaf size in bytes.
+  :param fanout:
+      Number of children per internal node; at least 2.
+  :param workers:
+      Number of threads. Default ``None`` picks one based on the number of
+      CPUs; 1 hashes in the calling thread.
+  :param return_leaves:
+      ``True`` to also return the list of leaf digests, which allows
+      re-verifying single leaves later.
+  :returns:
+      Root digest, or a tuple of ``(root digest, leaf digests)``.
+  """
+  return _tree_hash_view(memoryview(data), algorithm, leaf_size, fanout,
+                         workers, return_leaves)
+
+
+def tree_hash_file(path, algorithm="sha256",
+                   leaf_size=DEFAULT_TREE_LEAF_SIZE, fanout=2, workers=None,
+                   return_leaves=False):
+  """
+  Calculates the Merkle tree hash of a file, hashing memory-mapped leaves
+  concurrently. Gives the same result as :func:`tree_hash` of the file's
+  contents.
+
+  :param path:
+      Path of the file.
+  :param algorithm:
+      Name of a :mod:`hashlib` algorithm. Default "sha256".
+  :param leaf_size:
+      Leaf size in bytes.
+  :param fanout:
+      Number of children per internal node; at least 2.
+  :param workers:
+      Number of threads. Default ``None`` picks one based on the number of
+      CPUs; 1 hashes in the calling thread.
+  :param return_leaves:
+      ``True`` to also return the list of leaf digests.
+  :returns:
+      Root digest, or a tuple of ``(root digest, leaf digests)``.
+  """
+  file_obj = open(path, "rb", 0)
+  try:
+    if not os.fstat(file_obj.fileno()).st_size:
+      # Empty files cannot be memory-mapped.
+      return tree_hash(bytes(), algorithm, leaf_size, fanout, workers,
+                       return_leaves)
+    mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      try:
+        view = memoryview(mapped)
+      except TypeError:
+        # Python 2 mmap objects do not export a memoryview; slicing them
+        # copies one leaf at a time instead.
+        view = mapped
+      try:
+        return _tree_hash_view(view, algorithm, leaf_size, fanout, workers,
+                               return_leaves)
+      finally:
+        if view is not mapped and hasattr(view, "release"):
+          view.release()
+    finally:
+      mapped.close()
+  finally:
+    file_obj.close()
@@ -25,22 +25,40 @@ Bits and bytes
 .. autofunction:: generate_random_bits
 .. autofunction:: generate_random_bytes
 
+Buffered randomness
+-------------------
+.. autoclass:: RandomPool
+   :members:
+
+Deterministic generators
+------------------------
+.. autoclass:: HmacDRBG
+   :members:
+.. autoclass:: ShakeDRBG
+   :members:
+
 Numbers
 -------
 .. autofunction:: generate_random_uint_atmost
 .. autofunction:: generate_random_uint_exactly
 .. autofunction:: generate_random_uint_between
+.. autofunction:: generate_random_uints_between
 
 Sequences and choices
 ---------------------
 .. autofunction:: random_choice
 .. autofunction:: random_shuffle
+.. autofunction:: random_sample
+.. autofunction:: random_sample_range
+.. autoclass:: WeightedChooser
+   :members:
 .. autofunction:: generate_random_sequence
 .. autofunction:: generate_random_sequence_strong
 
 Strings
 -------
 .. autofunction:: generate_random_string
+.. autofunction:: generate_random_strings
 .. autofunction:: generate_random_password
 .. autofunction:: generate_random_hex_string
 
@@ -52,11 +70,21 @@ Utility
 
 from __future__ import absolute_import, division
 
+import hashlib
+import hmac
+import os
+import threading
+import weakref
+from array import array
+
 from mom import string
-from mom._compat import range, generate_random_bytes as _generate_random_bytes
-from mom.builtins import is_integer, byte, integer_bit_size
+from mom._cache import LRUCache
+from mom._compat import range, generate_random_bytes as _generate_random_bytes,\
+  ZERO_BYTE, EMPTY_BYTE, HAVE_PYTHON3
+from mom.builtins import is_integer, is_bytes, byte, integer_bit_size, bytes,\
+  b
 from mom.codec import hex_encode
-from mom.codec.integer import bytes_to_uint
+from mom.codec.integer import bytes_to_uint, uint_to_bytes
 
 
 __all__ = [
@@ -66,13 +94,21 @@ __all__ = [
   "generate_random_uint_atmost",
   "generate_random_uint_exactly",
   "generate_random_uint_between",
+  "generate_random_uints_between",
   "generate_random_string",
+  "generate_random_strings",
   "generate_random_password",
   "generate_random_sequence",
   "generate_random_sequence_strong",
   "random_choice",
   "random_shuffle",
+  "random_sample",
+  "random_sample_range",
+  "WeightedChooser",
   "calculate_entropy",
+  "RandomPool",
+  "HmacDRBG",
+  "ShakeDRBG",
   "HEXADECIMAL_DIGITS",
   "DIGITS",
   "LOWERCASE_ALPHA",
@@ -88,6 +124,131 @@ __all__ = [
 
 generate_random_bytes = _generate_random_bytes
 
+# Pools to reset in a child process after fork().
+_POOLS = weakref.WeakKeyDictionary()
+_HAVE_REGISTER_AT_FORK = hasattr(os, "register_at_fork")
+
+
+def _reset_pools_after_fork():
+  """
+  Discards the buffered bytes of every pool in a forked child so that
+  parent and child never serve the same random bytes.
+  """
+  for pool in list(_POOLS.keys()):
+    pool._reset()
+
+if _HAVE_REGISTER_AT_FORK:
+  os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+class RandomPool(object):
+  """
+  Serves random bytes from a buffer filled in large blocks from the
+  operating system's CSPRNG.
+
+  Most helpers in this module ask for a handful of bytes at a time, and
+  each ``os.urandom`` call is a system call. A pool reads ``block_size``
+  bytes at once and hands out slices of that block. Pass an instance as
+  the ``rand_func`` argument of any function in this module::
+
+      pool = RandomPool()
+      token = generate_random_string(32, rand_func=pool)
+
+  Pools are thread-safe. Bytes are overwritten with zeros as soon as they
+  are handed out. A child process never reuses bytes buffered by its
+  parent: the buffer is discarded after ``fork()`` through
+  ``os.register_at_fork`` where available, and by comparing process IDs
+  otherwise.
+
+  :param block_size:
+      Number of bytes read from ``rand_func`` per refill. Requests larger
+      than this bypass the buffer. Default 4096.
+  :param rand_func:
+      Random bytes generator function used to fill the pool.
+      Default :func:`generate_random_bytes`.
+  """
+
+  def __init__(self, block_size=4096, rand_func=generate_random_bytes):
+    if not is_integer(block_size):
+      raise TypeError("unsupported operand type: %r" %
+                      type(block_size).__name__)
+    if block_size <= 0:
+      raise ValueError("block size must be greater than 0: got %d" %
+                       block_size)
+    self._block_size = block_size
+    self._rand_func = rand_func
+    self._zeros = ZERO_BYTE * block_size
+    self._lock = threading.Lock()
+    self._buffer = bytearray()
+    self._offset = 0
+    self._pid = os.getpid()
+    _POOLS[self] = None
+
+  @property
+  def block_size(self):
+    """
+    Number of bytes read from the underlying generator per refill.
+    """
+    return self._block_size
+
+  def __call__(self, count):
+    """
+    Returns ``count`` random bytes.
+
+    :param count:
+        Number of random bytes.
+    :returns:
+        Random bytes.
+    """
+    if count > self._block_size or count < 0:
+      return self._rand_func(count)
+    self._lock.acquire()
+    try:
+      if not _HAVE_REGISTER_AT_FORK and self._pid != os.getpid():
+        self._discard()
+        self._pid = os.getpid()
+      start = self._offset
+      end = start + count
+      if end > len(self._buffer):
+        self._discard()
+        self._buffer = bytearray(self._rand_func(self._block_size))
+        start, end = 0, count
+      random_bytes = bytes(self._buffer[start:end])
+      self._buffer[start:end] = self._zeros[:count]
+      self._offset = end
+    finally:
+      self._lock.release()
+    return random_bytes
+
+  def clear(self):
+    """
+    Overwrites and discards all buffered bytes.
+    """
+    self._lock.acquire()
+    try:
+      self._discard()
+    finally:
+      self._lock.release()
+
+  def _discard(self):
+    """
+    Zeroes and drops the buffer. The caller must hold the lock.
+    """
+    self._buffer[self._offset:] = self._zeros[:len(self._buffer) -
+                                               self._offset]
+    self._buffer = bytearray()
+    self._offset = 0
+
+  def _reset(self):
+    """
+    Makes the pool safe to use in a freshly forked child. The lock may
+    have been held by another thread of the parent at fork time, so it is
+    replaced rather than acquired.
+    """
+    self._lock = threading.Lock()
+    self._discard()
+    self._pid = os.getpid()
+
 
 def generate_random_bits(n_bits, rand_func=generate_random_bytes):
   """
@@ -174,6 +335,233 @@ def generate_random_uint_exactly(n_bits, rand_func=generate_random_bytes):
   return value
 
 
+def _drbg_input(value, name):
+  """
+  Validates a seed, entropy or personalization byte string.
+  """
+  if value is None:
+    return EMPTY_BYTE
+  if not is_bytes(value):
+    raise TypeError("%s must be bytes: got %r" % (name, type(value).__name__))
+  return value
+
+
+class HmacDRBG(object):
+  """
+  Deterministic random bit generator HMAC_DRBG from NIST SP 800-90A,
+  instantiated with SHA-256.
+
+  The same seed always yields the same byte stream, which makes test and
+  benchmark runs of shuffles, sampling and token minting reproducible.
+  An instance can be passed as the ``rand_func`` argument of any function
+  in this module::
+
+      drbg = HmacDRBG(b("benchmark seed"))
+      tokens = generate_random_strings(1000, 32, rand_func=drbg)
+
+  Requests larger than the 64 KiB SP 800-90A limit are served as a
+  series of consecutive generate calls. Instances are not thread-safe;
+  give every thread or worker its own stream with :meth:`fork`.
+
+  :param seed:
+      Seed bytes (entropy input followed by the nonce in SP 800-90A
+      terms). Default ``None`` seeds from the operating system.
+  :param personalization:
+      Optional personalization string.
+  """
+
+  # Bytes per SP 800-90A generate request.
+  MAX_REQUEST = 1 << 16
+  SEED_SIZE = 48
+
+  def __init__(self, seed=None, personalization=None):
+    if seed is None:
+      seed = generate_random_bytes(self.SEED_SIZE)
+    seed = _drbg_input(seed, "seed")
+    personalization = _drbg_input(personalization, "personalization")
+    self._key = ZERO_BYTE * 32
+    self._value = b("\x01") * 32
+    self._update(seed + personalization)
+
+  def _hmac(self, key, data):
+    """HMAC-SHA-256."""
+    return hmac.new(key, data, hashlib.sha256).digest()
+
+  def _update(self, data=EMPTY_BYTE):
+    """
+    HMAC_DRBG update function.
+    """
+    self._key = self._hmac(self._key, self._value + ZERO_BYTE + data)
+    self._value = self._hmac(self._key, self._value)
+    if data:
+      self._key = self._hmac(self._key, self._value + b("\x01") + data)
+      self._value = self._hmac(self._key, self._value)
+
+  def reseed(self, entropy=None, additional=None):
+    """
+    Mixes fresh entropy into the state.
+
+    :param entropy:
+        Entropy input. Default ``None`` reads from the operating system.
+    :param additional:
+        Optional additional input.
+    """
+    if entropy is None:
+      entropy = generate_random_bytes(self.SEED_SIZE)
+    self._update(_drbg_input(entropy, "entropy") +
+                 _drbg_input(additional, "additional input"))
+
+  def generate(self, count, additional=None):
+    """
+    Generates random bytes.
+
+    :param count:
+        Number of bytes.
+    :param additional:
+        Optional additional input mixed in before and after generation.
+    :returns:
+        ``count`` bytes.
+    """
+    if count < 0:
+      raise ValueError("count must be a non-negative integer: got %d" %
+                       count)
+    additional = _drbg_input(additional, "additional input")
+    output = []
+    while True:
+      size = min(count, self.MAX_REQUEST)
+      if additional:
+        self._update(additional)
+      # The key is fixed while a request is being generated, so the keyed
+      # HMAC state is computed once and copied for every block.
+      keyed = hmac.new(self._key, digestmod=hashlib.sha256)
+      value = self._value
+      blocks = []
+      for _ in range(-(-size // 32)):
+        mac = keyed.copy()
+        mac.update(value)
+        value = mac.digest()
+        blocks.append(value)
+      self._value = value
+      self._update(additional)
+      output.append(EMPTY_BYTE.join(blocks)[:size])
+      count -= size
+      if count <= 0:
+        return EMPTY_BYTE.join(output)
+
+  __call__ = generate
+
+  def fork(self):
+    """
+    Derives an independent generator, e.g. one for every parallel worker.
+    The child is seeded from this generator's output, so forking is as
+    reproducible as the parent stream.
+
+    :returns:
+        A new generator of the same type.
+    """
+    return type(self)(self.generate(self.SEED_SIZE))
+
+
+class ShakeDRBG(object):
+  """
+  Fast deterministic random byte generator built on the SHAKE-256
+  extendable-output function. Requires ``hashlib.shake_256`` (Python 3.6+).
+
+  Every request squeezes the requested bytes plus a new 64-byte state out
+  of SHAKE-256 of the current state, so earlier output cannot be
+  recomputed from a captured state. Megabytes per call cost a single
+  hashlib call. Usable as ``rand_func`` like :class:`HmacDRBG`, and, like
+  it, not thread-safe.
+
+  :param seed:
+      Seed bytes. Default ``None`` seeds from the operating system.
+  :param personalization:
+      Optional personalization string.
+  """
+
+  SEED_SIZE = 64
+
+  def __init__(self, seed=None, personalization=None):
+    if not hasattr(hashlib, "shake_256"):
+      raise NotImplementedError("SHAKE-256 is not available in hashlib.")
+    if seed is None:
+      seed = generate_random_bytes(self.SEED_SIZE)
+    seed = _drbg_input(seed, "seed")
+    personalization = _drbg_input(personalization, "personalization")
+    self._state = self._derive(b("instantiate"), seed, personalization)
+
+  def _derive(self, label, *inputs):
+    """
+    Derives a new state from length-prefixed inputs.
+    """
+    xof = hashlib.shake_256(label)
+    for value in inputs:
+      xof.update(uint_to_bytes(len(value), fill_size=8) + value)
+    return xof.digest(self.SEED_SIZE)
+
+  def reseed(self, entropy=None, additional=None):
+    """
+    Mixes fresh entropy into the state.
+
+    :param entropy:
+        Entropy input. Default ``None`` reads from the operating system.
+    :param additional:
+        Optional additional input.
+    """
+    if entropy is None:
+      entropy = generate_random_bytes(self.SEED_SIZE)
+    self._state = self._derive(b("reseed"), self._state,
+                               _drbg_input(entropy, "entropy"),
+                               _drbg_input(additional, "additional input"))
+
+  def generate(self, count):
+    """
+    Generates random bytes.
+
+    :param count:
+        Number of bytes.
+    :returns:
+        ``count`` bytes.
+    """
+    if count < 0:
+      raise ValueError("count must be a non-negative integer: got %d" %
+                       count)
+    output = hashlib.shake_256(self._state).digest(self.SEED_SIZE + count)
+    self._state = output[:self.SEED_SIZE]
+    return output[self.SEED_SIZE:]
+
+  __call__ = generate
+
+  def fork(self):
+    """
+    Derives an independent generator, e.g. one for every parallel worker.
+
+    :returns:
+        A new generator of the same type.
+    """
+    return type(self)(self.generate(self.SEED_SIZE))
+
+
+# Unsigned 32-bit array type code for batched index generation.
+if array("I").itemsize == 4:
+  _WORD_TYPECODE = "I"
+else:
+  _WORD_TYPECODE = "L"
+_WORD_BITS = 32
+_WORD_SIZE = 1 << _WORD_BITS
+_WORD_MASK = _WORD_SIZE - 1
+# Words drawn from the random bytes generator at a time.
+_WORD_BLOCK = 1024
+
+# Unsigned 64-bit array type code for batches of random integers; ``None``
+# where there is none (array("Q") needs Python 3.3).
+try:
+  _UINT64_TYPECODE = "Q" if array("Q").itemsize == 8 else None
+except ValueError:
+  _UINT64_TYPECODE = "L" if array("L").itemsize == 8 else None
+_UINT64_LIMIT = 1 << 64
+
+
 # Taken from PyCrypto.
 def generate_random_uint_between(low, high, rand_func=generate_random_bytes):
   """
@@ -201,6 +589,86 @@ def generate_random_uint_between(low, high, rand_func=generate_random_bytes):
   return low + value
 
 
+def generate_random_uints_between(low, high, count,
+                                  rand_func=generate_random_bytes):
+  """
+  Generates many uniform random integers between low and high, not
+  including high, e.g. for Monte Carlo simulations and sharding.
+
+  Ranges of at most 2**32 values use Lemire's multiply-shift method on
+  32-bit words: a word ``w`` maps to ``(w * (high - low)) >> 32`` and the
+  few words that would bias the result are rejected. Wider ranges draw
+  the candidate bits for the whole batch at once, mask each candidate to
+  the bit length of the range and reject those out of range. Either way
+  all the randomness for a batch comes from one ``rand_func`` call; only
+  rejected values are drawn again.
+
+  :param low:
+      Low
+  :param high:
+      High
+  :param count:
+      Number of integers to generate.
+  :param rand_func:
+      Random bytes generator function.
+  :returns:
+      An ``array("Q")`` (or an equivalent unsigned 64-bit array) when
+      ``0 <= low`` and ``high <= 2**64``; otherwise a list.
+  """
+  if not (is_integer(low) and is_integer(high) and is_integer(count)):
+    raise TypeError("unsupported argument types(s): %r, %r and %r"\
+    % (type(low).__name__, type(high).__name__, type(count).__name__))
+  if low >= high:
+    raise ValueError("high value must be greater than low value.")
+  if count < 0:
+    raise ValueError("count must be a non-negative integer: got %d" % count)
+  span = high - low
+  if span <= _WORD_SIZE:
+    values = _uniform_words_between(low, span, count, rand_func)
+  else:
+    values = _uniform_blocks_between(low, span, count, rand_func)
+  if _UINT64_TYPECODE and low >= 0 and high <= _UINT64_LIMIT:
+    return array(_UINT64_TYPECODE, values)
+  return values
+
+
+def _uniform_words_between(low, span, count, rand_func):
+  """
+  Lemire's multiply-shift rejection sampling for spans of at most 2**32.
+  """
+  # Products whose low word is below the threshold are rejected.
+  threshold = (_WORD_SIZE - span) % span
+  values = []
+  missing = count
+  while missing:
+    words = array(_WORD_TYPECODE, rand_func(4 * missing))
+    values.extend([low + (product >> _WORD_BITS)
+                   for product in (span * word for word in words)
+                   if product & _WORD_MASK >= threshold])
+    missing = count - len(values)
+  return values
+
+
+def _uniform_blocks_between(low, span, count, rand_func):
+  """
+  Block-then-mask rejection sampling for spans wider than 2**32.
+  """
+  substrate = span - 1
+  bits = integer_bit_size(substrate)
+  mask = (1 << bits) - 1
+  width = 2 * ((bits + 7) // 8)
+  values = []
+  missing = count
+  while missing:
+    digits = hex_encode(rand_func(missing * width // 2))
+    candidates = [int(digits[i:i + width], 16) & mask
+                  for i in range(0, len(digits), width)]
+    values.extend([low + value for value in candidates
+                   if value <= substrate])
+    missing = count - len(values)
+  return values
+
+
 def generate_random_hex_string(length=8, rand_func=generate_random_bytes):
   """
   Generates a random ASCII-encoded hexadecimal string of an even length.
@@ -233,30 +701,359 @@ def random_choice(sequence, rand_func=generate_random_bytes):
   return sequence[generate_random_uint_between(0, len(sequence), rand_func)]
 
 
+def _uniform_below(bounds, rand_func=generate_random_bytes):
+  """
+  Yields a uniform random integer in ``[0, bound)`` for every bound.
+
+  Uses Lemire's multiply-shift method on 32-bit words that are drawn
+  ``_WORD_BLOCK`` at a time, so most draws cost a multiplication and a
+  comparison instead of a call to the random bytes generator. Bounds
+  wider than 32 bits fall back to :func:`generate_random_uint_between`.
+
+  :param bounds:
+      Iterable of positive integers.
+  :param rand_func:
+      Random bytes generator function.
+  """
+  words = ()
+  position = 0
+  for bound in bounds:
+    if bound > _WORD_SIZE:
+      yield generate_random_uint_between(0, bound, rand_func)
+      continue
+    while True:
+      if position == len(words):
+        words = array(_WORD_TYPECODE, rand_func(4 * _WORD_BLOCK))
+        position = 0
+      product = words[position] * bound
+      position += 1
+      remainder = product & _WORD_MASK
+      # Reject the low products that would make some results more likely.
+      if remainder >= bound or remainder >= (_WORD_SIZE - bound) % bound:
+        yield product >> _WORD_BITS
+        break
+
+
 def random_shuffle(sequence, rand_func=generate_random_bytes):
   """
-  Randomly shuffles the sequence in-place.
+  Randomly shuffles the sequence in-place using the Fisher-Yates
+  algorithm in O(n) time.
 
   :param sequence:
       Sequence to shuffle in-place.
   :returns:
       The shuffled sequence itself (for convenience).
   """
-  copy = list(sequence)
-  # Choose a random item (without replacement) until all the items have been
-  # chosen.
-  for i in range(len(sequence)):
-    random_uint = generate_random_uint_between(0, len(copy), rand_func)
-    sequence[i] = copy[random_uint]
-    del copy[random_uint]
+  i = len(sequence) - 1
+  for j in _uniform_below(range(len(sequence), 1, -1), rand_func):
+    sequence[i], sequence[j] = sequence[j], sequence[i]
+    i -= 1
   return sequence
 
 
+def random_sample_range(n, k, rand_func=generate_random_bytes):
+  """
+  Randomly chooses ``k`` distinct integers from ``range(n)``.
+
+  Uses Robert Floyd's algorithm, which needs O(k) time and memory however
+  large ``n`` is, so it works for ranges that do not fit in memory.
+
+  :param n:
+      Size of the range.
+  :param k:
+      Number of integers to choose.
+  :returns:
+      A list of ``k`` distinct integers in random order.
+  """
+  if not (is_integer(n) and is_integer(k)):
+    raise TypeError("unsupported argument types(s): %r and %r"\
+    % (type(n).__name__, type(k).__name__))
+  if not 0 <= k <= n:
+    raise ValueError("sample size must be between 0 and %d: got %d" % (n, k))
+  chosen = set()
+  j = n - k
+  # Bounds n - k + 1 .. n; xrange(n - k + 1, n + 1) overflows on Python 2
+  # for n above sys.maxsize.
+  first = j + 1
+  for t in _uniform_below((first + i for i in range(k)), rand_func):
+    chosen.add(j if t in chosen else t)
+    j += 1
+  # Floyd's algorithm yields a uniformly random subset; shuffle it to make
+  # the order random as well.
+  return random_shuffle(list(chosen), rand_func)
+
+
+def random_sample(population, k, rand_func=generate_random_bytes):
+  """
+  Randomly chooses ``k`` distinct elements from a sequence.
+
+  Small samples of large populations are chosen by index with
+  :func:`random_sample_range` in O(k) memory; otherwise a partial
+  Fisher-Yates shuffle of a copy of the population is used.
+
+  :param population:
+      Sequence to choose from.
+  :param k:
+      Number of elements to choose.
+  :returns:
+      A list of ``k`` elements in random order.
+  """
+  n = len(population)
+  if not is_integer(k):
+    raise TypeError("unsupported argument type: %r" % type(k).__name__)
+  if not 0 <= k <= n:
+    raise ValueError("sample size must be between 0 and %d: got %d" % (n, k))
+  if 4 * k < n:
+    return [population[i] for i in random_sample_range(n, k, rand_func)]
+  pool = list(population)
+  i = 0
+  for j in _uniform_below(range(n, n - k, -1), rand_func):
+    j += i
+    pool[i], pool[j] = pool[j], pool[i]
+    i += 1
+  return pool[:k]
+
+
+class WeightedChooser(object):
+  """
+  Chooses indices (or elements of a population) at random with
+  probabilities proportional to their weights, e.g. to pick a backend by
+  capacity for every request.
+
+  Uses Vose's alias method: the weights are turned into a table of ``n``
+  columns once in O(n) time, after which every draw costs one uniform
+  column index and one comparison, regardless of the number of weights.
+  Integer weights are sampled exactly. Other weights are quantized to
+  multiples of ``2**-32`` of a column.
+
+  Weights can be changed with :meth:`update`; the table is rebuilt lazily
+  on the next draw, so a burst of updates costs a single rebuild.
+
+  :param weights:
+      Non-empty sequence of non-negative, finite weights; at least one
+      weight must be positive.
+  :param population:
+      Optional sequence of the same length; draws return its elements
+      instead of indices.
+  :param rand_func:
+      Random bytes generator function.
+  """
+
+  # Denominator of column probabilities for non-integer weights.
+  _FLOAT_SCALE = _WORD_SIZE
+
+  def __init__(self, weights, population=None,
+               rand_func=generate_random_bytes):
+    weights = list(weights)
+    if not weights:
+      raise ValueError("weights must not be empty.")
+    for weight in weights:
+      self._validate_weight(weight)
+    if population is not None and len(population) != len(weights):
+      raise ValueError("population and weights must have the same length.")
+    self._weights = weights
+    self._population = population
+    self._rand_func = rand_func
+    self._table = None
+
+  @staticmethod
+  def _validate_weight(weight):
+    """
+    Raises an error unless the weight is a non-negative finite number.
+    """
+    if not (is_integer(weight) or isinstance(weight, float)):
+      raise TypeError("weight must be a number: got %r" %
+                      type(weight).__name__)
+    if not 0 <= weight < float("inf"):
+      raise ValueError("weight must be non-negative and finite: got %r" %
+                       weight)
+
+  def __len__(self):
+    return len(self._weights)
+
+  @property
+  def weights(self):
+    """
+    Copy of the current weights.
+    """
+    return list(self._weights)
+
+  def update(self, index, weight):
+    """
+    Changes the weight of one index. The alias table is rebuilt on the
+    next draw.
+
+    :param index:
+        Index of the weight.
+    :param weight:
+        New non-negative, finite weight.
+    """
+    self._validate_weight(weight)
+    self._weights[index] = weight
+    self._table = None
+
+  def _build(self):
+    """
+    Builds the alias table: ``(scale, probabilities, aliases)``. Column
+    ``i`` yields ``i`` when a uniform coin in ``[0, scale)`` is below
+    ``probabilities[i]`` and ``aliases[i]`` otherwise.
+    """
+    weights = self._weights
+    n = len(weights)
+    total = sum(weights)
+    if not total > 0:
+      raise ValueError("at least one weight must be positive.")
+    if all(is_integer(weight) for weight in weights):
+      scale = total
+      scaled = [weight * n for weight in weights]
+    else:
+      scale = self._FLOAT_SCALE
+      factor = n * scale / total
+      scaled = [int(weight * factor + 0.5) for weight in weights]
+
+    probabilities = [scale] * n
+    aliases = list(range(n))
+    small = [i for i, value in enumerate(scaled) if value < scale]
+    large = [i for i, value in enumerate(scaled) if value >= scale]
+    while small and large:
+      less = small.pop()
+      more = large.pop()
+      probabilities[less] = scaled[less]
+      aliases[less] = more
+      scaled[more] -= scale - scaled[less]
+      if scaled[more] < scale:
+        small.append(more)
+      else:
+        large.append(more)
+    # Whatever is left over is full up to rounding of non-integer weights.
+    self._table = (scale, probabilities, aliases)
+    return self._table
+
+  def choose(self):
+    """
+    Draws one weighted random choice.
+
+    :returns:
+        An index, or an element of the population.
+    """
+    scale, probabilities, aliases = self._table or self._build()
+    column, coin = divmod(generate_random_uint_between(
+      0, len(probabilities) * scale, self._rand_func), scale)
+    if coin >= probabilities[column]:
+      column = aliases[column]
+    if self._population is None:
+      return column
+    return self._population[column]
+
+  __call__ = choose
+
+  def choose_many(self, k):
+    """
+    Draws ``k`` independent weighted random choices (with replacement).
+    All column indices and coins come from two batched draws.
+
+    :param k:
+        Number of choices.
+    :returns:
+        List of indices, or of elements of the population.
+    """
+    if not is_integer(k):
+      raise TypeError("k must be an integer: got %r" % type(k).__name__)
+    if k < 0:
+      raise ValueError("k must be a non-negative integer: got %d" % k)
+    scale, probabilities, aliases = self._table or self._build()
+    columns = generate_random_uints_between(0, len(probabilities), k,
+                                            self._rand_func)
+    coins = generate_random_uints_between(0, scale, k, self._rand_func)
+    choices = [column if coin < probabilities[column] else aliases[column]
+               for column, coin in zip(columns, coins)]
+    if self._population is None:
+      return choices
+    population = self._population
+    return [population[i] for i in choices]
+
+
+# Most recently used byte translation tables keyed by pool.
+_SAMPLING_TABLES = LRUCache(64)
+
+
+def _sampling_table(size, symbols=None):
+  """
+  Builds the tables that turn random bytes into uniformly chosen pool
+  entries.
+
+  Bytes at or above the largest multiple of ``size`` not exceeding 256 are
+  rejected; every other byte ``b`` maps to entry ``b % size``.
+
+  :param size:
+      Number of pool entries; at most 256.
+  :param symbols:
+      Bytes to map to; one per pool entry. Default ``None`` maps to the
+      pool indices.
+  :returns:
+      Tuple of (256-byte translation table, bytes to reject).
+  """
+  key = (size, symbols)
+  tables = _SAMPLING_TABLES.get(key)
+  if tables is None:
+    bound = 256 - 256 % size
+    if symbols is None:
+      symbols = EMPTY_BYTE.join([byte(i) for i in range(size)])
+    # Slices are bytes on every Python version; items are not.
+    table = EMPTY_BYTE.join([symbols[i % size:i % size + 1]
+                             for i in range(256)])
+    rejected = EMPTY_BYTE.join([byte(i) for i in range(bound, 256)])
+    tables = table, rejected
+    _SAMPLING_TABLES.set(key, tables)
+  return tables
+
+
+def _sample_bytes(count, table, rejected, rand_func=generate_random_bytes):
+  """
+  Draws ``count`` random bytes at once, drops the rejected ones and maps the
+  rest through the translation table, both in C. Only the rejected
+  positions are drawn again.
+
+  :param count:
+      Number of samples.
+  :param table:
+      Translation table from :func:`_sampling_table`.
+  :param rejected:
+      Bytes to reject from :func:`_sampling_table`.
+  :param rand_func:
+      Random bytes generator function.
+  :returns:
+      ``count`` translated bytes.
+  """
+  chunks = []
+  missing = count
+  while missing:
+    accepted = rand_func(missing).translate(table, rejected)
+    chunks.append(accepted)
+    missing -= len(accepted)
+  return EMPTY_BYTE.join(chunks)
+
+
+def _validate_length(length):
+  """
+  Ensures the length of a random sequence is a positive integer.
+  """
+  if not is_integer(length):
+    raise TypeError("Length must be a positive integer: got `%r`" %\
+                    type(length).__name__)
+  if length <= 0:
+    raise ValueError("length must be a positive integer: got %d" % length)
+
+
 def generate_random_sequence(length, pool, rand_func=generate_random_bytes):
   """
   Generates a random sequence of given length using the sequence
   pool specified.
 
+  For pools of at most 256 elements, one block of random bytes is drawn
+  for the whole sequence and mapped to elements by rejection sampling;
+  larger pools fall back to one :func:`random_choice` per element.
+
   :param length:
       The length of the random sequence.
   :param pool:
@@ -265,12 +1062,12 @@ def generate_random_sequence(length, pool, rand_func=generate_random_bytes):
   :returns:
       A list of elements randomly chosen from the pool.
   """
-  if not is_integer(length):
-    raise TypeError("Length must be a positive integer: got `%r`" %\
-                    type(length).__name__)
-  if length <= 0:
-    raise ValueError("length must be a positive integer: got %d" % length)
-  return [random_choice(pool, rand_func) for _ in range(length)]
+  _validate_length(length)
+  if not 0 < len(pool) <= 256:
+    return [random_choice(pool, rand_func) for _ in range(length)]
+  table, rejected = _sampling_table(len(pool))
+  indices = _sample_bytes(length, table, rejected, rand_func)
+  return [pool[index] for index in bytearray(indices)]
 
 
 HEXADECIMAL_DIGITS = string.DIGITS + "abcdef"
@@ -329,7 +1126,61 @@ def generate_random_string(length, pool=ALPHANUMERIC,
   :returns:
       A string of elements randomly chosen from the pool.
   """
-  return "".join(generate_random_sequence(length, pool, rand_func))
+  _validate_length(length)
+  return _generate_random_strings(1, length, pool, rand_func)[0]
+
+
+def generate_random_strings(count, length, pool=ALPHANUMERIC,
+                            rand_func=generate_random_bytes):
+  """
+  Generates many random strings of the same length, e.g. to mint API keys
+  in bulk. The random bytes for all strings are drawn together. Each
+  string has the same entropy as one from :func:`generate_random_string`.
+
+  :param count:
+      Number of strings.
+  :param length:
+      The length of each string.
+  :param pool:
+      A sequence of characters to be used as the pool from which
+      random characters will be chosen. Default case-sensitive alpha-numeric
+      characters.
+  :returns:
+      A list of ``count`` strings.
+  """
+  if not is_integer(count):
+    raise TypeError("Count must be a non-negative integer: got `%r`" %\
+                    type(count).__name__)
+  if count < 0:
+    raise ValueError("count must be a non-negative integer: got %d" % count)
+  _validate_length(length)
+  return _generate_random_strings(count, length, pool, rand_func)
+
+
+def _generate_random_strings(count, length, pool, rand_func):
+  """
+  Generates ``count`` random strings of ``length`` characters.
+
+  When the pool is a native string of at most 256 ASCII characters the
+  random bytes are translated straight into characters; otherwise the
+  characters are chosen with :func:`generate_random_sequence`.
+  """
+  total = count * length
+  if not total:
+    return [""] * count
+  try:
+    symbols = pool.encode("ascii")
+    ascii_pool = isinstance(pool, str) and 0 < len(pool) <= 256
+  except (AttributeError, UnicodeError):
+    ascii_pool = False
+  if ascii_pool:
+    table, rejected = _sampling_table(len(pool), symbols)
+    characters = _sample_bytes(total, table, rejected, rand_func)
+    if HAVE_PYTHON3:
+      characters = characters.decode("ascii")
+  else:
+    characters = "".join(generate_random_sequence(total, pool, rand_func))
+  return [characters[i:i + length] for i in range(0, total, length)]
 
 
 def calculate_entropy(length, pool=ALPHANUMERIC):
@@ -24,10 +24,16 @@ Encoded key parsing
 -------------------
 .. autofunction:: parse_private_key
 .. autofunction:: parse_public_key
+
+Key generation
+--------------
+.. autofunction:: generate_rsa_key
 """
 
 from __future__ import absolute_import
-from mom.security.codec import private_key_pem_decode, public_key_pem_decode
+from mom.security.codec import private_key_pem_decode,\
+  private_key_pem_encode, public_key_pem_decode
+from mom.security.rsa.keys import generate_rsa_key_info
 
 try:
   from mom.security.rsa.pycrypto import PrivateKey, PublicKey
@@ -37,6 +43,7 @@ except ImportError:
   raise NotImplementedError("RSA implementation not found.")
 
 __all__ = [
+  "generate_rsa_key",
   "parse_private_key",
   "parse_public_key",
   ]
@@ -75,3 +82,31 @@ def parse_public_key(encoded_key, encoding="PEM"):
     raise NotImplementedError("Key encoding not supported.")
   key = PublicKey(key_info, encoded_key, encoding)
   return key
+
+
+def generate_rsa_key(bits, e=65537, pool=None, pkcs8=False):
+  """
+  Generates a new RSA private key without shelling out to OpenSSL.
+
+  The primes ``p`` and ``q`` can be searched for concurrently in a
+  process pool; the private exponent and the CRT parameters are computed
+  with :mod:`mom.math`. See
+  :func:`mom.security.rsa.keys.generate_rsa_key_info`.
+
+  :param bits:
+      Size of the modulus in bits, e.g. 2048.
+  :param e:
+      Public exponent. Default 65537.
+  :param pool:
+      Optional :class:`multiprocessing.Pool`, reused across keys, that
+      searches for ``p`` and ``q`` concurrently. Default ``None`` generates
+      the key in this process.
+  :param pkcs8:
+      ``True`` to encode the key as a PKCS#8 ``PRIVATE KEY``; default
+      ``False`` encodes a PKCS#1 ``RSA PRIVATE KEY``.
+  :returns:
+      A private key whose ``encoded_key`` is the PEM-encoded key.
+  """
+  key_info = generate_rsa_key_info(bits, e, pool)
+  encoded_key = private_key_pem_encode(key_info, pkcs8)
+  return PrivateKey(key_info, encoded_key, "PEM")
@@ -19,12 +19,15 @@
 """
 :module: mom.security.rsa.keys
 :synopsis: Implements abstract classes for keys.
+
+.. autofunction:: generate_rsa_key_info
 """
 
 from __future__ import absolute_import
-from mom._compat import ZERO_BYTE
+from mom._compat import ZERO_BYTE, range
 from mom.builtins import b
 from mom.codec.integer import uint_to_bytes, bytes_to_uint
+from mom.math import gcd, lcm, inverse_mod, generate_random_prime
 
 SHA1_DIGESTINFO =\
 b('\x30\x21\x30\x09\x06\x05\x2b\x0e\x03\x02\x1a\x05\x00\x04\x14')
@@ -52,6 +55,95 @@ def pkcs1_v1_5_encode(key_size, data):
   return ZERO_ONE_BYTES + filler + ZERO_BYTE + SHA1_DIGESTINFO + data
 
 
+def generate_rsa_key_info(bits, public_exponent=65537, pool=None):
+  """
+  Generates the components of a new two-prime RSA private key.
+
+  Both primes have their two most significant bits set so the modulus is
+  exactly ``bits`` long. The private exponent is the inverse of the public
+  exponent modulo ``lcm(p - 1, q - 1)`` as in FIPS 186-4, and ``p > q`` as
+  produced by OpenSSL.
+
+  :param bits:
+      Size of the modulus in bits. Must be even and at least 64.
+  :param public_exponent:
+      Odd public exponent. Default 65537.
+  :param pool:
+      Optional :class:`multiprocessing.Pool` in which ``p`` and ``q`` are
+      searched for concurrently. Starting a pool costs more than a prime
+      search, so create one pool and pass it for every key::
+
+          pool = multiprocessing.Pool(2)
+          keys = [generate_rsa_key_info(2048, pool=pool) for _ in tenants]
+
+      Default ``None`` searches in this process.
+  :returns:
+      A dictionary of key information in the format returned by
+      :func:`mom.security.codec.private_key_pem_decode`.
+  """
+  if bits < 64 or bits % 2:
+    raise ValueError("RSA modulus size must be an even number of bits "
+                     "no less than 64: got %r" % bits)
+  if public_exponent < 3 or not public_exponent & 1:
+    raise ValueError("RSA public exponent must be odd and greater than 2: "
+                     "got %r" % public_exponent)
+  half_bits = bits // 2
+  # FIPS 186-4 requires |p - q| > 2**(bits/2 - 100).
+  min_distance = 1 << max(half_bits - 100, 0)
+  while True:
+    prime1, prime2 = _generate_rsa_primes(half_bits, public_exponent, pool)
+    if abs(prime1 - prime2) > min_distance:
+      break
+  if prime1 < prime2:
+    prime1, prime2 = prime2, prime1
+
+  private_exponent = inverse_mod(public_exponent,
+                                 lcm(prime1 - 1, prime2 - 1))
+  return dict(
+    version=0,
+    modulus=prime1 * prime2,
+    publicExponent=public_exponent,
+    privateExponent=private_exponent,
+    prime1=prime1,
+    prime2=prime2,
+    exponent1=private_exponent % (prime1 - 1),
+    exponent2=private_exponent % (prime2 - 1),
+    coefficient=inverse_mod(prime2, prime1),
+    )
+
+
+def _generate_rsa_primes(bits, public_exponent, pool=None):
+  """
+  Generates two RSA primes, in two tasks of the pool if one is given.
+
+  :param bits:
+      Size of each prime in bits.
+  :param public_exponent:
+      RSA public exponent.
+  :param pool:
+      Optional :class:`multiprocessing.Pool`.
+  :returns:
+      Tuple of two primes.
+  """
+  if pool is None:
+    return (_generate_rsa_prime(bits, public_exponent),
+            _generate_rsa_prime(bits, public_exponent))
+  results = [pool.apply_async(_generate_rsa_prime, (bits, public_exponent))
+             for _ in range(2)]
+  return results[0].get(), results[1].get()
+
+
+def _generate_rsa_prime(bits, public_exponent):
+  """
+  Generates a random prime ``p`` with its two top bits set and
+  ``gcd(p - 1, public_exponent) == 1``.
+  """
+  while True:
+    prime = generate_random_prime(bits)
+    if gcd(prime - 1, public_exponent) == 1:
+      return prime
+
+
 class Key(object):
   """
   Abstract class representing an encryption key.
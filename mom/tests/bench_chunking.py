@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom.tests.bench_chunking
+:synopsis: Content-defined chunking throughput and deduplication benchmarks.
+
+Measures the throughput in MB/s of :mod:`mom.chunking` and of fixed-size
+chunking on a synthetic corpus, and the fraction of chunks that an edited
+copy of the corpus shares with the original. Reports JSON in the format of
+:mod:`mom.tests.bench_math`.
+
+Usage::
+
+    python -m mom.tests.bench_chunking [--size-mb 16] [--edits 10]
+                                       [--output FILE]
+"""
+
+from __future__ import absolute_import, division
+
+import hashlib
+import optparse
+import os
+import sys
+
+from mom.builtins import b
+from mom.chunking import chunk_boundaries, chunk_digests, DEFAULT_AVG_SIZE
+from mom.codec.json import json_encode
+from mom.security.random import HmacDRBG, generate_random_uint_between
+from mom.tests.bench_math import environment, measure, summarize
+
+
+def synthetic_corpus(size, edits, seed=b("mom.tests.bench_chunking")):
+  """
+  Builds a deterministic corpus and an edited copy of it.
+
+  :param size:
+      Corpus size in bytes.
+  :param edits:
+      Number of short insertions at random offsets in the copy.
+  :returns:
+      Tuple of (original, edited).
+  """
+  drbg = HmacDRBG(seed)
+  original = drbg.generate(size)
+  offsets = sorted(generate_random_uint_between(0, size, rand_func=drbg)
+                   for _ in range(edits))
+  pieces = []
+  previous = 0
+  for offset in offsets:
+    pieces.append(original[previous:offset])
+    pieces.append(drbg.generate(16))
+    previous = offset
+  pieces.append(original[previous:])
+  return original, b("").join(pieces)
+
+
+def fixed_digests(data, size=DEFAULT_AVG_SIZE, algorithm="sha1"):
+  """
+  Fixed-size chunking baseline.
+  """
+  view = memoryview(data)
+  return [(offset, len(view[offset:offset + size]),
+           hashlib.new(algorithm, view[offset:offset + size]).digest())
+          for offset in range(0, len(view), size)]
+
+
+def _throughput(name, func, size, repeat):
+  """
+  Measures a function over the corpus and reports MB/s.
+  """
+  _, samples = measure(func, repeat)
+  stats = summarize(samples)
+  return dict(
+    benchmark="throughput",
+    name=name,
+    params=dict(size=size),
+    stats=stats,
+    megabytes_per_second=size / stats["median"] / 1e6,
+    )
+
+
+def _shared_fraction(name, func, original, edited):
+  """
+  Fraction of the edited corpus' chunks that also occur in the original.
+  """
+  known = set(digest for _, _, digest in func(original))
+  chunks = list(func(edited))
+  shared = sum(1 for _, _, digest in chunks if digest in known)
+  return dict(
+    benchmark="deduplication",
+    name=name,
+    chunks=len(chunks),
+    shared_fraction=shared / len(chunks),
+    )
+
+
+def run(size=16 << 20, edits=10, repeat=3, log=None):
+  """
+  Runs the benchmark suite.
+
+  :param size:
+      Corpus size in bytes.
+  :param edits:
+      Number of insertions in the edited copy.
+  :param repeat:
+      Number of samples per throughput case.
+  :param log:
+      File-like object that receives one progress line per case.
+  :returns:
+      Dictionary with ``environment`` metadata and a list of ``results``.
+  """
+  original, edited = synthetic_corpus(size, edits)
+  cases = [
+    ("chunk_boundaries", lambda: list(chunk_boundaries(original))),
+    ("chunk_digests", lambda: list(chunk_digests(original))),
+    ("chunk_digests(workers=None)",
+     lambda: list(chunk_digests(original, workers=None))),
+    ("fixed_digests", lambda: fixed_digests(original)),
+    ]
+  results = []
+  for name, func in cases:
+    results.append(_throughput(name, func, size, repeat))
+  for name, func in (("chunk_digests", chunk_digests),
+                     ("fixed_digests", fixed_digests)):
+    results.append(_shared_fraction(name, func, original, edited))
+  if log is not None:
+    for result in results:
+      if "megabytes_per_second" in result:
+        log.write("%-28s %8.1f MB/s\n" % (result["name"],
+                                          result["megabytes_per_second"]))
+      else:
+        log.write("%-28s %8.3f shared after edits\n" % (
+          result["name"], result["shared_fraction"]))
+  return dict(environment=environment(), results=results)
+
+
+def main(argv=None):
+  """
+  Command-line entry point.
+  """
+  parser = optparse.OptionParser(
+    usage="python -m mom.tests.bench_chunking [options]")
+  parser.add_option("-o", "--output", default=None,
+                    help="write JSON to this file instead of stdout")
+  parser.add_option("--size-mb", type="int", default=16,
+                    help="corpus size in MiB")
+  parser.add_option("--edits", type="int", default=10,
+                    help="insertions in the edited corpus")
+  parser.add_option("--repeat", type="int", default=3,
+                    help="samples per throughput case")
+  options, _ = parser.parse_args(argv)
+
+  report = run(options.size_mb << 20, options.edits, options.repeat,
+               log=sys.stderr)
+  encoded = json_encode(report)
+  if options.output:
+    output = open(options.output, "w")
+    try:
+      output.write(encoded + os.linesep)
+    finally:
+      output.close()
+  else:
+    sys.stdout.write(encoded + os.linesep)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:module: mom.tests.bench_math
+:synopsis: Number-theory and randomness benchmarks with JSON output.
+
+Unlike ``run_speed_tests.py``, which prints the best of a few timeit runs,
+this suite records the distribution of per-call latencies (min, median,
+p90, p99, mean, standard deviation) together with the interpreter, host and
+:func:`mom.math.backend` so that results from different machines can be
+compared.
+
+Usage::
+
+    python -m mom.tests.bench_math [--quick] [--output FILE]
+                                   [--only is_prime,pow_mod,...]
+                                   [--sieve-limits 1000000,10000000]
+
+Sieve limits of ``10**8`` and ``10**9`` are supported but not run by
+default: :func:`mom.math.make_spf_table` needs 4 bytes per number and
+:func:`mom._prime_sieve.make_prime_sieve` keeps every prime in a set.
+"""
+
+from __future__ import absolute_import, division
+
+import multiprocessing
+import optparse
+import os
+import platform
+import sys
+import time
+from timeit import default_timer
+
+from mom.codec.json import json_encode
+from mom.math import backend, pow_mod, _pure_pow_mod, is_prime,\
+  _pure_is_prime, inverse_mod, _pure_inverse_mod, generate_random_prime,\
+  generate_random_safe_prime, make_spf_table
+from mom.security.random import generate_random_uint_between
+from mom._prime_sieve import make_prime_sieve
+
+
+DEFAULT_SIEVE_LIMITS = (10 ** 6, 10 ** 7)
+DEFAULT_BIT_SIZES = (64, 256, 1024, 2048)
+DEFAULT_PRIME_BIT_SIZES = (256, 512, 1024)
+DEFAULT_SAFE_PRIME_BIT_SIZES = (128, 256, 512)
+
+# Minimum duration of one sample. Fast calls are repeated within a sample
+# so that timer resolution does not dominate.
+_MIN_SAMPLE_TIME = 0.001
+
+
+def environment():
+  """
+  Describes the interpreter and host the benchmarks run on.
+
+  :returns:
+      Dictionary of environment metadata.
+  """
+  return dict(
+    python_version=platform.python_version(),
+    python_implementation=platform.python_implementation(),
+    python_build=" ".join(platform.python_build()),
+    platform=platform.platform(),
+    machine=platform.machine(),
+    processor=platform.processor(),
+    cpu_count=multiprocessing.cpu_count(),
+    math_backend=backend(),
+    timestamp=time.time(),
+    )
+
+
+def _percentile(sorted_samples, fraction):
+  """
+  Nearest-rank percentile of already sorted samples.
+  """
+  index = int(round(fraction * (len(sorted_samples) - 1)))
+  return sorted_samples[index]
+
+
+def summarize(samples):
+  """
+  Summarizes a list of latencies.
+
+  :param samples:
+      Per-call durations in seconds.
+  :returns:
+      Dictionary with ``min``, ``median``, ``p90``, ``p99``, ``max``,
+      ``mean`` and ``stdev``, all in seconds, and the sample count.
+  """
+  ordered = sorted(samples)
+  count = len(ordered)
+  mean = sum(ordered) / count
+  variance = sum((x - mean) ** 2 for x in ordered) / max(count - 1, 1)
+  return dict(
+    samples=count,
+    min=ordered[0],
+    median=_percentile(ordered, 0.5),
+    p90=_percentile(ordered, 0.9),
+    p99=_percentile(ordered, 0.99),
+    max=ordered[-1],
+    mean=mean,
+    stdev=variance ** 0.5,
+    )
+
+
+def measure(func, repeat=20, timer=default_timer):
+  """
+  Measures per-call latency of a function.
+
+  Calls shorter than a millisecond are batched so that each sample lasts
+  at least that long; the reported latency is the batch average.
+
+  :param func:
+      Callable taking no arguments.
+  :param repeat:
+      Number of samples.
+  :returns:
+      Tuple of (calls per sample, list of per-call durations in seconds).
+  """
+  number = 1
+  while True:
+    start = timer()
+    for _ in range(number):
+      func()
+    elapsed = timer() - start
+    if elapsed >= _MIN_SAMPLE_TIME or number >= 1 << 20:
+      break
+    number *= 10
+  samples = []
+  for _ in range(repeat):
+    start = timer()
+    for _ in range(number):
+      func()
+    samples.append((timer() - start) / number)
+  return number, samples
+
+
+def _case(benchmark, name, func, repeat, **params):
+  """
+  Runs one benchmark case and returns its result record.
+  """
+  number, samples = measure(func, repeat)
+  return dict(
+    benchmark=benchmark,
+    name=name,
+    params=params,
+    number=number,
+    stats=summarize(samples),
+    )
+
+
+def bench_sieves(limits=DEFAULT_SIEVE_LIMITS, repeat=3):
+  """
+  Prime sieve and smallest-prime-factor table construction.
+  """
+  for limit in limits:
+    yield _case("sieves", "make_prime_sieve",
+                lambda: make_prime_sieve(limit), repeat, limit=limit)
+    yield _case("sieves", "make_spf_table",
+                lambda: make_spf_table(limit), repeat, limit=limit)
+
+
+def bench_is_prime(bit_sizes=DEFAULT_BIT_SIZES, repeat=20):
+  """
+  Primality testing of primes, the slowest inputs, and of odd composites.
+  """
+  for bits in bit_sizes:
+    prime = generate_random_prime(bits)
+    composite = prime * generate_random_prime(max(bits // 2, 8))
+    for kind, num in (("prime", prime), ("composite", composite)):
+      yield _case("is_prime", "is_prime",
+                  lambda: is_prime(num), repeat, bits=bits, input=kind)
+      yield _case("is_prime", "_pure_is_prime",
+                  lambda: _pure_is_prime(num), repeat, bits=bits, input=kind)
+
+
+def _random_odd(bits):
+  """
+  Random odd number with exactly ``bits`` bits.
+  """
+  return generate_random_uint_between(1 << (bits - 1), 1 << bits) | 1
+
+
+def bench_pow_mod(bit_sizes=DEFAULT_BIT_SIZES, repeat=20):
+  """
+  Modular exponentiation with full-size base, exponent and modulus.
+  """
+  for bits in bit_sizes:
+    base, power, modulus = _random_odd(bits), _random_odd(bits), \
+                           _random_odd(bits)
+    for name, func in (("pow_mod", pow_mod),
+                       ("_pure_pow_mod", _pure_pow_mod),
+                       ("pow", pow)):
+      yield _case("pow_mod", name, lambda: func(base, power, modulus),
+                  repeat, bits=bits)
+
+
+def bench_inverse_mod(bit_sizes=DEFAULT_BIT_SIZES, repeat=20):
+  """
+  Modular inversion with a prime modulus.
+  """
+  for bits in bit_sizes:
+    modulus = generate_random_prime(bits)
+    value = generate_random_uint_between(2, modulus)
+    for name, func in (("inverse_mod", inverse_mod),
+                       ("_pure_inverse_mod", _pure_inverse_mod)):
+      yield _case("inverse_mod", name, lambda: func(value, modulus),
+                  repeat, bits=bits)
+
+
+def bench_prime_generation(bit_sizes=DEFAULT_PRIME_BIT_SIZES,
+                           safe_bit_sizes=DEFAULT_SAFE_PRIME_BIT_SIZES,
+                           repeat=10):
+  """
+  Random and safe prime generation. The search time varies a lot from
+  call to call, so look at the tail percentiles as well as the median.
+  """
+  for bits in bit_sizes:
+    yield _case("prime_generation", "generate_random_prime",
+                lambda: generate_random_prime(bits), repeat, bits=bits)
+  for bits in safe_bit_sizes:
+    yield _case("prime_generation", "generate_random_safe_prime",
+                lambda: generate_random_safe_prime(bits), repeat, bits=bits)
+
+
+def bench_random_uint_between(bit_sizes=DEFAULT_BIT_SIZES, repeat=20):
+  """
+  Uniform random integers in ranges just above a power of two, the worst
+  case for rejection sampling.
+  """
+  for bits in bit_sizes:
+    high = (1 << (bits - 1)) + 1
+    yield _case("random_uint_between", "generate_random_uint_between",
+                lambda: generate_random_uint_between(0, high), repeat,
+                bits=bits)
+
+
+BENCHMARKS = (
+  ("sieves", bench_sieves),
+  ("is_prime", bench_is_prime),
+  ("pow_mod", bench_pow_mod),
+  ("inverse_mod", bench_inverse_mod),
+  ("prime_generation", bench_prime_generation),
+  ("random_uint_between", bench_random_uint_between),
+  )
+
+
+def run(only=None, quick=False, sieve_limits=None, log=None):
+  """
+  Runs the benchmark suite.
+
+  :param only:
+      Names of benchmarks to run. Default ``None`` runs all of them.
+  :param quick:
+      ``True`` to use small inputs and few samples; useful as a smoke test.
+  :param sieve_limits:
+      Sieve limits to benchmark. Default ``None`` uses
+      :data:`DEFAULT_SIEVE_LIMITS`.
+  :param log:
+      File-like object that receives one progress line per case.
+  :returns:
+      Dictionary with ``environment`` metadata and a list of ``results``.
+  """
+  unknown = set(only or ()) - set(name for name, _ in BENCHMARKS)
+  if unknown:
+    raise ValueError("unknown benchmarks: %r" % sorted(unknown))
+  options = dict(
+    sieves=dict(limits=sieve_limits or DEFAULT_SIEVE_LIMITS),
+    )
+  if quick:
+    options = dict(
+      sieves=dict(limits=sieve_limits or (10 ** 4,), repeat=2),
+      is_prime=dict(bit_sizes=(64, 256), repeat=3),
+      pow_mod=dict(bit_sizes=(64, 256), repeat=3),
+      inverse_mod=dict(bit_sizes=(64, 256), repeat=3),
+      prime_generation=dict(bit_sizes=(64,), safe_bit_sizes=(32,),
+                            repeat=3),
+      random_uint_between=dict(bit_sizes=(64, 256), repeat=3),
+      )
+  results = []
+  for name, bench in BENCHMARKS:
+    if only and name not in only:
+      continue
+    for result in bench(**options.get(name, {})):
+      results.append(result)
+      if log is not None:
+        log.write("%-20s %-28s %-28s median %.3g s\n" % (
+          result["benchmark"], result["name"],
+          ",".join("%s=%s" % item for item in sorted(result["params"].items())),
+          result["stats"]["median"]))
+  return dict(environment=environment(), results=results)
+
+
+def main(argv=None):
+  """
+  Command-line entry point.
+  """
+  parser = optparse.OptionParser(
+    usage="python -m mom.tests.bench_math [options]")
+  parser.add_option("-o", "--output", default=None,
+                    help="write JSON to this file instead of stdout")
+  parser.add_option("--only", default=None,
+                    help="comma-separated benchmark names: %s"
+                    % ", ".join(name for name, _ in BENCHMARKS))
+  parser.add_option("--quick", action="store_true", default=False,
+                    help="small inputs and few samples")
+  parser.add_option("--sieve-limits", default=None,
+                    help="comma-separated sieve limits, e.g. 1e6,1e8")
+  options, _ = parser.parse_args(argv)
+
+  only = options.only and options.only.split(",")
+  sieve_limits = options.sieve_limits and tuple(
+    int(float(limit)) for limit in options.sieve_limits.split(","))
+  report = run(only, options.quick, sieve_limits, log=sys.stderr)
+  encoded = json_encode(report)
+  if options.output:
+    output = open(options.output, "w")
+    try:
+      output.write(encoded + os.linesep)
+    finally:
+      output.close()
+  else:
+    sys.stdout.write(encoded + os.linesep)
+
+
+if __name__ == "__main__":
+  main()
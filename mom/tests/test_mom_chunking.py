@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import unittest2
+
+from mom.builtins import b
+from mom.chunking import chunk_boundaries, chunk_digests, chunk_file
+from mom.security.random import HmacDRBG
+
+
+# Deterministic corpus so that chunk boundaries are reproducible.
+corpus = HmacDRBG(b("mom.chunking")).generate(300000)
+sizes = dict(min_size=256, avg_size=1024, max_size=4096)
+
+
+class Test_chunk_boundaries(unittest2.TestCase):
+  def test_covers_input(self):
+    chunks = list(chunk_boundaries(corpus, **sizes))
+    offset = 0
+    for start, length in chunks:
+      self.assertEqual(start, offset)
+      self.assertTrue(length <= 4096)
+      offset += length
+    self.assertEqual(offset, len(corpus))
+    self.assertTrue(all(length >= 256 for _, length in chunks[:-1]))
+    average = len(corpus) / float(len(chunks))
+    self.assertTrue(700 < average < 2000, average)
+
+  def test_stream_matches_buffer(self):
+    expected = list(chunk_boundaries(corpus, **sizes))
+    for block_size in (1, 5000, 1 << 20):
+      self.assertEqual(list(chunk_boundaries(io.BytesIO(corpus),
+                                             block_size=block_size,
+                                             **sizes)),
+                       expected)
+
+  def test_insertion_preserves_later_chunks(self):
+    def chunk_set(data):
+      return set(bytes(data[offset:offset + length])
+                 for offset, length in chunk_boundaries(data, **sizes))
+    original = chunk_set(corpus)
+    edited = chunk_set(corpus[:150000] + b("inserted") + corpus[150000:])
+    # Only the chunks around the insertion point change.
+    self.assertTrue(len(edited - original) <= 3, len(edited - original))
+
+  def test_small_and_uniform_input(self):
+    self.assertEqual(list(chunk_boundaries(b(""))), [])
+    self.assertEqual(list(chunk_boundaries(b("abc"))), [(0, 3)])
+    # Constant data has no content-defined cut points.
+    self.assertEqual(list(chunk_boundaries(b("\x00") * 10000, **sizes)),
+                     [(0, 4096), (4096, 4096), (8192, 1808)])
+
+  def test_errors(self):
+    for min_size, avg_size, max_size in ((0, 1024, 4096), (2048, 1024, 4096),
+                                         (256, 8192, 4096), (16, 32, 64)):
+      self.assertRaises(ValueError, list,
+                        chunk_boundaries(corpus, min_size, avg_size,
+                                         max_size))
+
+
+class Test_chunk_digests(unittest2.TestCase):
+  def test_digests(self):
+    expected = [(offset, length,
+                 hashlib.sha256(corpus[offset:offset + length]).digest())
+                for offset, length in chunk_boundaries(corpus, **sizes)]
+    self.assertEqual(list(chunk_digests(corpus, algorithm="sha256",
+                                        **sizes)), expected)
+    self.assertEqual(list(chunk_digests(io.BytesIO(corpus),
+                                        algorithm="sha256", workers=3,
+                                        block_size=7000, **sizes)),
+                     expected)
+
+  def test_ValueError_when_unknown_algorithm(self):
+    self.assertRaises(ValueError, list, chunk_digests(corpus,
+                                                      algorithm="nope"))
+
+
+class Test_chunk_file(unittest2.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.path = os.path.join(self.root, "corpus")
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def write(self, data):
+    file_obj = open(self.path, "wb")
+    try:
+      file_obj.write(data)
+    finally:
+      file_obj.close()
+
+  def test_matches_chunk_digests(self):
+    self.write(corpus)
+    self.assertEqual(chunk_file(self.path, workers=2, **sizes),
+                     list(chunk_digests(corpus, **sizes)))
+
+  def test_mmap_is_chunked_from_start(self):
+    self.write(corpus)
+    file_obj = open(self.path, "rb")
+    try:
+      mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+      try:
+        mapped.seek(1000)
+        self.assertEqual(list(chunk_digests(mapped, **sizes)),
+                         list(chunk_digests(corpus, **sizes)))
+        self.assertEqual(mapped.tell(), 1000)
+      finally:
+        mapped.close()
+    finally:
+      file_obj.close()
+
+  def test_empty_file(self):
+    self.write(b(""))
+    self.assertEqual(chunk_file(self.path), [])
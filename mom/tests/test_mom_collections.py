@@ -26,7 +26,10 @@ except ImportError:
   from Queue import Empty as QueueEmpty
 
 from threading import Thread
-from mom.collections import SetQueue, AttributeDict, attrdict
+from mom.builtins import b
+from mom.collections import SetQueue, AttributeDict, attrdict, \
+  BloomFilter, CountingBloomFilter
+from mom.itertools import unique
 
 class Test_AttributeDict(unittest2.TestCase):
   def test_behavior(self):
@@ -195,3 +198,98 @@ class TestSetQueue(unittest2.TestCase):
     consumer_thread = Thread(target=event_consumer, args=(event_queue, ))
     consumer_thread.start()
     consumer_thread.join()
+
+
+class Test_BloomFilter(unittest2.TestCase):
+  filter_class = BloomFilter
+
+  def setUp(self):
+    self.bloom_filter = self.filter_class(1000, 0.01)
+    self.items = [b("item-%d" % i) for i in range(1000)]
+    self.bloom_filter.add_many(self.items)
+
+  def test_no_false_negatives(self):
+    for item in self.items:
+      self.assertTrue(item in self.bloom_filter)
+
+  def test_false_positive_rate(self):
+    false_positives = sum(1 for i in range(10000)
+                          if b("other-%d" % i) in self.bloom_filter)
+    self.assertTrue(false_positives < 200, false_positives)
+
+  def test_add_reports_new_items(self):
+    self.assertFalse(self.bloom_filter.add(self.items[0]))
+    self.assertTrue(self.bloom_filter.add(b("something else")))
+
+  def test_unicode_is_utf8_encoded(self):
+    self.bloom_filter.add(u"\u00e9t\u00e9")
+    self.assertTrue(u"\u00e9t\u00e9".encode("utf-8") in self.bloom_filter)
+
+  def test_TypeError_when_not_string(self):
+    self.assertRaises(TypeError, self.bloom_filter.add, 42)
+
+  def test_sizing(self):
+    self.assertEqual(self.bloom_filter.num_bits, 9586)
+    self.assertEqual(self.bloom_filter.num_hashes, 7)
+
+  def test_ValueError_when_bad_parameters(self):
+    self.assertRaises(ValueError, self.filter_class, 0)
+    self.assertRaises(ValueError, self.filter_class, 10, 0)
+    self.assertRaises(ValueError, self.filter_class, 10, 1)
+
+  def test_union(self):
+    other = self.filter_class(1000, 0.01)
+    other.add(b("extra"))
+    union = self.bloom_filter.union(other)
+    self.assertTrue(b("extra") in union)
+    self.assertTrue(self.items[0] in union)
+    self.assertFalse(b("extra") in self.bloom_filter)
+    self.assertRaises(ValueError, self.bloom_filter.union,
+                      self.filter_class(10, 0.01))
+
+  def test_serialization(self):
+    data = self.bloom_filter.to_bytes()
+    restored = self.filter_class.from_bytes(data)
+    self.assertEqual(restored.to_bytes(), data)
+    for item in self.items:
+      self.assertTrue(item in restored)
+    self.assertRaises(ValueError, self.filter_class.from_bytes, data[:-1])
+    self.assertRaises(ValueError, self.filter_class.from_bytes, data[:5])
+
+  def test_positions_are_distinct(self):
+    for num_bits in (1, 2, 7, 12, 30, 9586):
+      bloom_filter = self.filter_class(10)
+      bloom_filter._init(num_bits, 7, bytearray(
+        self.filter_class._storage_size(num_bits)))
+      for item in self.items[:200]:
+        positions = bloom_filter._positions(item)
+        self.assertEqual(len(set(positions)), min(num_bits, 7))
+        self.assertTrue(all(0 <= position < num_bits
+                            for position in positions))
+
+  def test_unique(self):
+    seen = self.filter_class(100, 0.001)
+    self.assertEqual(list(unique([b("a"), b("b"), b("a"), b("c"), b("b")],
+                                 seen)),
+                     [b("a"), b("b"), b("c")])
+    self.assertTrue(b("c") in seen)
+    self.assertRaises(TypeError, list, unique([b("a"), 42], seen))
+
+
+class Test_CountingBloomFilter(Test_BloomFilter):
+  filter_class = CountingBloomFilter
+
+  def test_remove(self):
+    self.bloom_filter.add(b("twice"))
+    self.bloom_filter.add(b("twice"))
+    self.bloom_filter.remove(b("twice"))
+    self.assertTrue(b("twice") in self.bloom_filter)
+    self.bloom_filter.remove(b("twice"))
+    self.assertFalse(b("twice") in self.bloom_filter)
+    self.assertRaises(ValueError, self.bloom_filter.remove, b("twice"))
+    for item in self.items:
+      self.assertTrue(item in self.bloom_filter)
+
+  def test_kinds_are_not_interchangeable(self):
+    self.assertRaises(ValueError, BloomFilter.from_bytes,
+                      self.bloom_filter.to_bytes())
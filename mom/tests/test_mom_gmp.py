@@ -498,6 +498,38 @@ class Test_IntegerAdditionals(unittest2.TestCase):
     self.assertEqual(abs(gmp.Integer()), gmp.Integer())
 
 
+class Test_IntegerNumberTheory(unittest2.TestCase):
+  def setUp(self):
+    self.modulus = (1 << 521) - 1
+    self.base = 0x1234567890abcdef1234567890abcdef
+
+  def test_int(self):
+    self.assertEqual(int(gmp.Integer(self.modulus)), self.modulus)
+    self.assertEqual(int(gmp.Integer(-self.modulus)), -self.modulus)
+    self.assertEqual(int(gmp.Integer()), 0)
+
+  def test_powm(self):
+    self.assertEqual(
+      int(gmp.Integer(self.base).powm(self.modulus - 2, self.modulus)),
+      pow(self.base, self.modulus - 2, self.modulus))
+    self.assertRaises(ZeroDivisionError, gmp.Integer(2).powm, 3, 0)
+    self.assertRaises(ValueError, gmp.Integer(2).powm, -1, 7)
+
+  def test_invert(self):
+    inverse = int(gmp.Integer(self.base).invert(self.modulus))
+    self.assertEqual(inverse * self.base % self.modulus, 1)
+    self.assertRaises(ZeroDivisionError, gmp.Integer(6).invert, 9)
+
+  def test_gcd(self):
+    self.assertEqual(int(gmp.Integer(12 << 600).gcd(18 << 500)), 6 << 500)
+    self.assertEqual(int(gmp.Integer(0).gcd(-5)), 5)
+
+  def test_probab_prime_p(self):
+    self.assertTrue(gmp.Integer(self.modulus).probab_prime_p())
+    self.assertFalse(gmp.Integer(self.modulus + 2).probab_prime_p())
+    self.assertFalse(gmp.Integer(1).probab_prime_p())
+
+
 class Test_IntegerErrorCases(unittest2.TestCase):
   def test_DivisionBy0(self):
     self.assertRaises(ZeroDivisionError,
@@ -21,7 +21,15 @@ from __future__ import absolute_import
 import unittest2
 
 from mom.math import gcd, lcm, is_prime, _pure_is_prime,\
-  generate_random_prime, generate_random_safe_prime, exact_log2
+  generate_random_prime, generate_random_safe_prime, exact_log2,\
+  is_prime_many, _miller_rabin, _strong_lucas_probable_prime,\
+  FixedBasePowMod, _pure_pow_mod, inverse_mod, inverse_mod_many, crt,\
+  make_spf_table, factorize, factorize_many, gcd_many, lcm_many, batch_gcd,\
+  backend, pow_mod, _pure_inverse_mod, _select_backend
+from mom import _gmp_math
+from mom import math as mom_math
+from mom._alt_math import pow_mod_fixed_window,\
+  pow_mod_sliding_window_montgomery
 from mom._prime_sieve import make_prime_sieve
 
 class Test__pure_is_prime(unittest2.TestCase):
@@ -38,6 +46,60 @@ class Test__pure_is_prime(unittest2.TestCase):
     self.assertFalse(_pure_is_prime(100))
 
 
+class Test_is_prime(unittest2.TestCase):
+  def test_small_numbers(self):
+    sieve = set(make_prime_sieve(20000))
+    for x in range(-5, 20000):
+      self.assertEqual(_pure_is_prime(x), x in sieve)
+
+  def test_strong_pseudoprimes_are_composite(self):
+    # Strong pseudoprimes to base 2 and to several small bases.
+    for x in [2047, 3215031751, 341550071728321, 3825123056546413051]:
+      self.assertFalse(_pure_is_prime(x))
+
+  def test_lucas_pseudoprimes_are_composite(self):
+    # Strong Lucas pseudoprimes are caught by the base-2 round of BPSW.
+    for x in [5459, 5777, 10877, 16109, 18971]:
+      self.assertTrue(_strong_lucas_probable_prime(x))
+      self.assertFalse(_miller_rabin(x, (2,)))
+
+  def test_large_numbers(self):
+    for exponent in [61, 89, 107, 127, 521, 607]:
+      self.assertTrue(_pure_is_prime((1 << exponent) - 1))
+    self.assertFalse(_pure_is_prime(((1 << 89) - 1) * ((1 << 61) - 1)))
+    self.assertFalse(_pure_is_prime(((1 << 127) - 1) ** 2))
+    self.assertFalse(_pure_is_prime((1 << 128) + 1))
+
+  def test_iterations(self):
+    self.assertTrue(_pure_is_prime((1 << 127) - 1, 3))
+    self.assertFalse(_pure_is_prime(((1 << 89) - 1) * ((1 << 61) - 1), 3))
+    # Zero iterations only performs trial division.
+    self.assertTrue(_pure_is_prime(10007 * 10009, 0))
+    self.assertFalse(_pure_is_prime(10007 * 10009))
+
+
+class Test_is_prime_many(unittest2.TestCase):
+  def test_matches_is_prime_for_small_numbers(self):
+    numbers = list(range(-10, 20000))
+    self.assertEqual(is_prime_many(numbers),
+                     [is_prime(x) if x > 1 else False for x in numbers])
+
+  def test_large_numbers(self):
+    # 2**127 - 1 and 2**521 - 1 are Mersenne primes.
+    numbers = [(1 << 127) - 1, (1 << 127) + 1, (1 << 521) - 1,
+               ((1 << 127) - 1) * ((1 << 61) - 1), 10007 * 10009]
+    self.assertEqual(is_prime_many(numbers),
+                     [True, False, True, False, False])
+
+  def test_accepts_iterators(self):
+    self.assertEqual(is_prime_many(iter([2, 4, 7])), [True, False, True])
+
+  def test_processes(self):
+    numbers = list(range(9900, 10100))
+    self.assertEqual(is_prime_many(numbers, processes=2),
+                     is_prime_many(numbers))
+
+
 class Test_generate_random_prime(unittest2.TestCase):
   def test_generate_random_prime(self):
     for _ in range(100):
@@ -49,6 +111,176 @@ class Test_generate_random_safe_prime(unittest2.TestCase):
     for _ in range(20):
       self.assertTrue(is_prime(generate_random_safe_prime(32)))
 
+  def test_sophie_germain_prime_and_size(self):
+    for bits in [10, 12, 16, 64, 128]:
+      for _ in range(5):
+        safe_prime = generate_random_safe_prime(bits)
+        self.assertTrue(is_prime((safe_prime - 1) // 2))
+        self.assertEqual(len(bin(safe_prime)) - 2, bits)
+
+  def test_processes(self):
+    safe_prime = generate_random_safe_prime(64, processes=2)
+    self.assertTrue(is_prime(safe_prime))
+    self.assertTrue(is_prime((safe_prime - 1) // 2))
+
+
+class Test_pow_mod(unittest2.TestCase):
+  def test_matches_pow(self):
+    moduli = [1, 2, 97, 1 << 64, (1 << 127) - 1, ((1 << 521) - 1) * 6]
+    exponents = [1, 2, 3, 31, 32, 33, 1 << 40, (1 << 300) - 1,
+                 0x1234567890abcdef1234567890abcdef]
+    for func in [_pure_pow_mod, pow_mod_fixed_window,
+                 pow_mod_sliding_window_montgomery]:
+      for modulus in moduli:
+        for exponent in exponents:
+          self.assertEqual(func(0x1f3a5b7c9d, exponent, modulus),
+                           pow(0x1f3a5b7c9d, exponent, modulus))
+
+  def test_negative_exponent(self):
+    for func in [_pure_pow_mod, pow_mod_fixed_window,
+                 pow_mod_sliding_window_montgomery]:
+      self.assertEqual((func(3, -77, 1000003) * pow(3, 77, 1000003))
+                       % 1000003, 1)
+
+  def test_ValueError_when_not_invertible(self):
+    self.assertRaises(ValueError, _pure_pow_mod, 6, -1, 9)
+    self.assertRaises(ValueError, pow_mod_sliding_window_montgomery, 6, -1, 9)
+
+
+class Test_FixedBasePowMod(unittest2.TestCase):
+  def test_matches_pow(self):
+    modulus = (1 << 521) - 1
+    for window in [1, 3, 5, 8]:
+      ctx = FixedBasePowMod(3, modulus, 128, window=window)
+      self.assertEqual(ctx.window, window)
+      for exponent in [0, 1, 2, 255, 256, (1 << 128) - 1, 0x1234567890abcdef]:
+        self.assertEqual(ctx.pow(exponent), pow(3, exponent, modulus))
+
+  def test_default_window(self):
+    ctx = FixedBasePowMod(5, (1 << 127) - 1)
+    self.assertEqual(ctx.max_bits, 127)
+    self.assertTrue(1 <= ctx.window <= FixedBasePowMod.MAX_WINDOW)
+    self.assertEqual(ctx(1 << 100), pow(5, 1 << 100, (1 << 127) - 1))
+
+  def test_large_exponent_falls_back(self):
+    ctx = FixedBasePowMod(3, 1000003, 16)
+    self.assertEqual(ctx.pow(1 << 40), pow(3, 1 << 40, 1000003))
+
+  def test_negative_exponent(self):
+    ctx = FixedBasePowMod(3, 1000003)
+    self.assertEqual((ctx.pow(-10) * pow(3, 10, 1000003)) % 1000003, 1)
+    self.assertRaises(ValueError, FixedBasePowMod(6, 9).pow, -1)
+    self.assertRaises(ValueError, _pure_pow_mod, 6, -1, 9)
+    self.assertEqual(FixedBasePowMod(6, 1).pow(-1), 0)
+
+  def test_ValueError_when_invalid_arguments(self):
+    self.assertRaises(ValueError, FixedBasePowMod, 3, 0)
+    self.assertRaises(ValueError, FixedBasePowMod, 3, 7, window=0)
+    self.assertRaises(ValueError, FixedBasePowMod, 3, 7, window=9)
+
+
+class Test_inverse_mod_many(unittest2.TestCase):
+  def test_matches_inverse_mod(self):
+    modulus = (1 << 127) - 1
+    values = [1, 2, 3, modulus - 1, 0x1234567890abcdef, (1 << 126) + 5]
+    self.assertEqual(inverse_mod_many(values, modulus),
+                     [inverse_mod(x, modulus) for x in values])
+
+  def test_non_invertible_values(self):
+    self.assertEqual(inverse_mod_many([2, 3, 4, 5], 8), [0, 3, 0, 5])
+    self.assertEqual(inverse_mod_many([0, 3], 7), [0, 5])
+
+  def test_negative_values(self):
+    # The result of a value must not depend on the rest of the batch.
+    self.assertEqual(inverse_mod_many([-3, 2], 7), [2, 4])
+    self.assertEqual(inverse_mod_many([-3, 7], 7), [2, 0])
+
+  def test_empty(self):
+    self.assertEqual(inverse_mod_many([], 7), [])
+
+
+class Test_crt(unittest2.TestCase):
+  def test_crt(self):
+    self.assertEqual(crt([2, 3, 2], [3, 5, 7]), 23)
+    self.assertEqual(crt([0], [1]), 0)
+
+  def test_large_moduli(self):
+    moduli = [(1 << 61) - 1, (1 << 89) - 1, (1 << 107) - 1]
+    x = 0x1234567890abcdef1234567890abcdef1234567890abcdef
+    for _ in range(2):
+      self.assertEqual(crt([x % m for m in moduli], moduli), x)
+
+  def test_ValueError_when_not_coprime(self):
+    self.assertRaises(ValueError, crt, [1, 2], [4, 6])
+
+  def test_ValueError_when_lengths_differ(self):
+    self.assertRaises(ValueError, crt, [1, 2], [3])
+    self.assertRaises(ValueError, crt, [], [])
+
+
+def _product(numbers):
+  result = 1
+  for number in numbers:
+    result *= number
+  return result
+
+
+class Test_make_spf_table(unittest2.TestCase):
+  def test_table(self):
+    table = make_spf_table(10000)
+    self.assertEqual(len(table), 10000)
+    for x in range(2, 10000):
+      smallest = min(p for p in range(2, x + 1) if not x % p)
+      self.assertEqual(table[x], smallest)
+
+  def test_shared(self):
+    self.assertEqual(list(make_spf_table(5000, shared=True)),
+                     list(make_spf_table(5000)))
+
+  def test_blocks(self):
+    expected = list(make_spf_table(5000))
+    block = mom_math._SPF_BLOCK
+    try:
+      for size in (1, 7, 64):
+        mom_math._SPF_BLOCK = size
+        self.assertEqual(list(make_spf_table(5000)), expected)
+        self.assertEqual(list(make_spf_table(5000, shared=True)), expected)
+    finally:
+      mom_math._SPF_BLOCK = block
+
+  def test_ValueError_when_invalid_bound(self):
+    self.assertRaises(ValueError, make_spf_table, 1)
+    self.assertRaises(ValueError, make_spf_table, (1 << 32) + 1)
+
+
+class Test_factorize(unittest2.TestCase):
+  def test_small_numbers(self):
+    table = make_spf_table(5000)
+    for x in range(1, 20000):
+      factors = factorize(x)
+      self.assertEqual(factors, factorize(x, table))
+      self.assertEqual(_product(factors), x)
+      self.assertEqual(factors, sorted(factors))
+      self.assertTrue(all(is_prime(p) for p in factors))
+
+  def test_large_numbers(self):
+    self.assertEqual(factorize(10007 * 10007 * 10009), [10007, 10007, 10009])
+    self.assertEqual(
+      factorize(((1 << 61) - 1) * ((1 << 31) - 1) * 1000003 * 1000003),
+      [1000003, 1000003, (1 << 31) - 1, (1 << 61) - 1])
+    self.assertEqual(factorize((1 << 89) - 1), [(1 << 89) - 1])
+
+  def test_ValueError_when_not_positive(self):
+    self.assertRaises(ValueError, factorize, 0)
+    self.assertRaises(ValueError, factorize, -12)
+
+
+class Test_factorize_many(unittest2.TestCase):
+  def test_stream(self):
+    table = make_spf_table(1000)
+    self.assertEqual(list(factorize_many([12, 13, 999, 1 << 40], table)),
+                     [[2, 2, 3], [13], [3, 3, 3, 37], [2] * 40])
+
 
 class Test_gcd(unittest2.TestCase):
   def test_gcd(self):
@@ -57,6 +289,24 @@ class Test_gcd(unittest2.TestCase):
   def test_gcd_swap(self):
     self.assertEqual(gcd(24, 54), 6)
 
+  def test_variadic(self):
+    self.assertEqual(gcd(), 0)
+    self.assertEqual(gcd(-5), 5)
+    self.assertEqual(gcd(12, 18, 27), 3)
+    self.assertEqual(gcd(0, 0), 0)
+    self.assertEqual(gcd(-4, 6), 2)
+
+  def test_large(self):
+    a = ((1 << 127) - 1) * ((1 << 61) - 1)
+    b = ((1 << 127) - 1) * ((1 << 89) - 1)
+    self.assertEqual(gcd(a, b), (1 << 127) - 1)
+
+
+class Test_gcd_many(unittest2.TestCase):
+  def test_iterable(self):
+    self.assertEqual(gcd_many(iter([60, 90, 150])), 30)
+    self.assertEqual(gcd_many([]), 0)
+
 
 class Test_lcm(unittest2.TestCase):
   def test_lcm(self):
@@ -64,6 +314,88 @@ class Test_lcm(unittest2.TestCase):
     self.assertEqual(lcm(6, 4), 12)
     self.assertEqual(lcm(21, 6), 42)
 
+  def test_variadic(self):
+    self.assertEqual(lcm(), 1)
+    self.assertEqual(lcm(2, 3, 4, 5), 60)
+    self.assertEqual(lcm(0, 5), 0)
+    self.assertEqual(lcm(-4, 6), 12)
+
+
+class Test_lcm_many(unittest2.TestCase):
+  def test_iterable(self):
+    self.assertEqual(lcm_many(iter([4, 6, 10])), 60)
+    self.assertEqual(lcm_many(range(1, 21)), 232792560)
+    self.assertEqual(lcm_many([]), 1)
+
+
+class Test_batch_gcd(unittest2.TestCase):
+  def test_shared_factors(self):
+    p1, p2, p3, p4, p5 = [(1 << e) - 1 for e in (61, 89, 107, 127, 521)]
+    moduli = [p1 * p2, p3 * p4, p1 * p5, 1000003 * 1000033, p3 * p4]
+    self.assertEqual(batch_gcd(moduli),
+                     [p1, p3 * p4, p1, 1, p3 * p4])
+
+  def test_matches_pairwise(self):
+    moduli = list(range(2, 200, 7))
+    for i, result in enumerate(batch_gcd(moduli)):
+      others = _product(moduli[:i] + moduli[i + 1:])
+      self.assertEqual(result, gcd(moduli[i], others))
+
+  def test_edge_cases(self):
+    self.assertEqual(batch_gcd([]), [])
+    self.assertEqual(batch_gcd([15]), [1])
+    self.assertRaises(ValueError, batch_gcd, [15, 0])
+
+
+class Test_backend(unittest2.TestCase):
+  def test_backend_name(self):
+    self.assertTrue(backend() in ("gmpy", "gmp", "python"))
+
+  def test_select_backend(self):
+    self.assertEqual(_select_backend("python"), "python")
+    self.assertEqual(_select_backend(" PYTHON "), "python")
+    self.assertEqual(_select_backend("unknown"), _select_backend())
+    if not _gmp_math.HAVE_GMP:
+      self.assertNotEqual(_select_backend("gmp"), "gmp")
+
+  def test_backend_agrees_with_pure_python(self):
+    modulus = (1 << 607) - 1
+    for bits in (16, 64, 127, 128, 256, 600):
+      value = (1 << bits) - 3
+      self.assertEqual(pow_mod(value, value, modulus),
+                       _pure_pow_mod(value, value, modulus))
+      self.assertEqual(pow_mod(value, -1, modulus),
+                       _pure_pow_mod(value, -1, modulus))
+      self.assertEqual(inverse_mod(value, modulus),
+                       _pure_inverse_mod(value, modulus))
+    self.assertEqual(inverse_mod(6, 9), 0)
+
+  def test_negative_inverse_mod_agrees_on_every_backend(self):
+    implementations = [inverse_mod, _pure_inverse_mod]
+    if _gmp_math.HAVE_GMP:
+      implementations.append(_gmp_math.inverse_mod)
+    for modulus in (7, (1 << 130) + 3):
+      expected = _pure_inverse_mod(modulus - 3, modulus)
+      for implementation in implementations:
+        self.assertEqual(implementation(-3, modulus), expected)
+      self.assertEqual((expected * -3) % modulus, 1)
+    self.assertEqual(inverse_mod(6 << 200, 9 << 200), 0)
+    self.assertEqual(gcd(12 << 9000, 18 << 9000), 6 << 9000)
+    for num in (1, 2, 3, 341, 561, (1 << 61) - 1, modulus, modulus + 2):
+      self.assertEqual(is_prime(num), _pure_is_prime(num))
+
+
+if _gmp_math.HAVE_GMP:
+  class Test__gmp_math(unittest2.TestCase):
+    def test_functions(self):
+      modulus = (1 << 521) - 1
+      self.assertEqual(_gmp_math.pow_mod(3, modulus - 1, modulus), 1)
+      self.assertEqual(_gmp_math.inverse_mod(2, modulus), (modulus + 1) // 2)
+      self.assertEqual(_gmp_math.inverse_mod(6, 9), 0)
+      self.assertEqual(_gmp_math.gcd(12, 18), 6)
+      self.assertTrue(_gmp_math.is_prime(modulus))
+      self.assertFalse(_gmp_math.is_prime(561))
+
 
 class Test_exact_log2(unittest2.TestCase):
   def test_ValueError_when_not_found(self):
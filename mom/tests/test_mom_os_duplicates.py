@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest2
+
+from mom._compat import next
+from mom.builtins import b
+from mom.os import duplicates
+from mom.os.duplicates import find_duplicates
+
+
+class Test_find_duplicates(unittest2.TestCase):
+  def setUp(self):
+    self.root = os.path.realpath(tempfile.mkdtemp())
+    self.big = os.urandom(100000)
+    self.write("a/big.bin", self.big)
+    self.write("b/big_copy.bin", self.big)
+    self.write("b/big.txt", self.big)
+    # Differs from the big file only in the middle, which probes miss.
+    self.write("a/big_edited.bin",
+               self.big[:50000] + b("x") + self.big[50001:])
+    self.write("a/small", b("hello"))
+    self.write("b/small_copy", b("hello"))
+    self.write("b/small_other", b("hellp"))
+    self.write("empty", b(""))
+    self.write("empty_copy", b(""))
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def path(self, name):
+    return os.path.join(self.root, *name.split("/"))
+
+  def write(self, name, data):
+    path = self.path(name)
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    file_obj = open(path, "wb")
+    try:
+      file_obj.write(data)
+    finally:
+      file_obj.close()
+
+  def find(self, *args, **kwargs):
+    # Largest first, as groups are yielded in no particular order.
+    return sorted([(size, digest,
+                    [path[len(self.root) + 1:].replace(os.sep, "/")
+                     for path in paths])
+                   for size, digest, paths in find_duplicates(*args,
+                                                              **kwargs)],
+                  reverse=True)
+
+  def test_groups(self):
+    for workers in (1, 4):
+      self.assertEqual(self.find([self.root], workers=workers), [
+        (100000, hashlib.sha1(self.big).digest(),
+         ["a/big.bin", "b/big.txt", "b/big_copy.bin"]),
+        (5, hashlib.sha1(b("hello")).digest(), ["a/small", "b/small_copy"]),
+        ])
+
+  def test_min_size_and_algorithm(self):
+    self.assertEqual(self.find([self.root], min_size=0, algorithm="md5")[-1],
+                     (0, hashlib.md5().digest(), ["empty", "empty_copy"]))
+    self.assertEqual(len(self.find([self.root], min_size=6)), 1)
+
+  def test_small_probes(self):
+    # With tiny probes the edited file collides on its probe and is only
+    # told apart by the full hash.
+    self.assertEqual(self.find([self.root], probe_size=16)[0][2],
+                     ["a/big.bin", "b/big.txt", "b/big_copy.bin"])
+
+  def test_patterns(self):
+    self.assertEqual(self.find([self.root], ["*.bin"])[0][2],
+                     ["a/big.bin", "b/big_copy.bin"])
+    self.assertEqual(self.find([self.root], None, ["*.txt", "*small*"]),
+                     [(100000, hashlib.sha1(self.big).digest(),
+                       ["a/big.bin", "b/big_copy.bin"])])
+    self.assertEqual(self.find([self.path("a"), self.path("b")], ["*small*"]),
+                     [(5, hashlib.sha1(b("hello")).digest(),
+                       ["a/small", "b/small_copy"])])
+
+  if hasattr(os, "link"):
+    def test_hard_links_count_once(self):
+      os.link(self.path("a/small"), self.path("a/small_link"))
+      groups = self.find([self.root], ["*small*"])
+      self.assertEqual(len(groups), 1)
+      self.assertEqual(len(groups[0][2]), 2)
+
+  if hasattr(os, "symlink"):
+    def test_symbolic_links_ignored(self):
+      os.symlink(self.path("a/small"), self.path("a/small_symlink"))
+      self.assertEqual(self.find([self.root], ["*small*"])[0][2],
+                       ["a/small", "b/small_copy"])
+
+    def test_directory_symlink_counts_once(self):
+      os.symlink(self.path("a"), self.path("link"))
+      groups = self.find([self.root], ["*small*"], followlinks=True)
+      self.assertEqual(len(groups), 1)
+      self.assertEqual(len(groups[0][2]), 2)
+
+  def test_overlapping_roots_count_once(self):
+    self.assertEqual(self.find([self.root, self.path("a")], ["*small*"]),
+                     [(5, hashlib.sha1(b("hello")).digest(),
+                       ["a/small", "b/small_copy"])])
+    self.assertEqual(self.find([self.root, self.path("a")], ["*/a/*"]), [])
+
+  def test_errors(self):
+    self.assertRaises(ValueError, find_duplicates, [self.root], algorithm="x")
+    self.assertRaises(ValueError, find_duplicates, [self.root], probe_size=0)
+
+
+class FakeStat(object):
+  def __init__(self, size, inode):
+    self.st_size = size
+    self.st_dev = 1
+    self.st_ino = inode
+
+
+class Test__size_groups(unittest2.TestCase):
+  def setUp(self):
+    self.walks = []
+    self.files = [("a", FakeStat(5, 1)), ("b", FakeStat(5, 2)),
+                  ("a_link", FakeStat(7, 3)), ("c", FakeStat(9, 4)),
+                  ("d", FakeStat(7, 3)), ("e", FakeStat(5, 5))]
+    self.changed_files = None
+
+  def walk(self):
+    walked = []
+    self.walks.append(walked)
+    files = self.files
+    if len(self.walks) > 1 and self.changed_files is not None:
+      files = self.changed_files
+    for path, stat_result in files:
+      walked.append(path)
+      yield path, stat_result
+
+  def test_hard_links_count_once(self):
+    # Both files of size 7 are the same file.
+    self.assertEqual(list(duplicates._size_groups(self.walk, 1)),
+                     [(5, ["a", "b", "e"])])
+
+  def test_groups_yielded_before_walk_ends(self):
+    self.files[4] = ("d", FakeStat(7, 6))
+    groups = duplicates._size_groups(self.walk, 1)
+    self.assertEqual(next(groups), (7, ["a_link", "d"]))
+    self.assertEqual(self.walks[1], ["a", "b", "a_link", "c", "d"])
+    self.assertEqual(next(groups), (5, ["a", "b", "e"]))
+    self.assertRaises(StopIteration, next, groups)
+
+  def test_files_changed_between_walks(self):
+    self.changed_files = self.files[:-1] + [("f", FakeStat(9, 7))]
+    # The size 5 group never sees its third file and is yielded at the
+    # end of the walk.
+    self.assertEqual(list(duplicates._size_groups(self.walk, 1)),
+                     [(5, ["a", "b"])])
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import unittest2
+
+from mom.builtins import b
+from mom.os import manifest
+from mom.os.manifest import read_manifest, update_manifest
+
+
+class Test_update_manifest(unittest2.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.tree = os.path.join(self.root, "tree")
+    self.manifest_path = os.path.join(self.root, "manifest.db")
+    self.write("a.txt", b("alpha"))
+    self.write("sub/b.txt", b("beta"))
+    self.write("sub/deeper/c.bin", b("gamma"))
+    self.hashed = []
+    self.unreadable = set()
+    self.hash_file = manifest.hash_file
+    self.lstat = os.lstat
+
+    def _counting_hash_file(path, algorithm):
+      if path in self.unreadable:
+        raise IOError("unreadable: %r" % path)
+      self.hashed.append(path)
+      return self.hash_file(path, algorithm)
+
+    def _lstat(path):
+      if path in self.unreadable:
+        raise OSError("unreadable: %r" % path)
+      return self.lstat(path)
+    manifest.hash_file = _counting_hash_file
+    os.lstat = _lstat
+
+  def tearDown(self):
+    manifest.hash_file = self.hash_file
+    os.lstat = self.lstat
+    shutil.rmtree(self.root)
+
+  def write(self, name, data, age=3600):
+    path = os.path.join(self.tree, *name.split("/"))
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    file_obj = open(path, "wb")
+    try:
+      file_obj.write(data)
+    finally:
+      file_obj.close()
+    # Old enough not to be treated as possibly still changing.
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+  def update(self, **kwargs):
+    del self.hashed[:]
+    return update_manifest(self.tree, self.manifest_path, workers=1,
+                           **kwargs)
+
+  def test_initial_update_adds_everything(self):
+    changes = self.update()
+    self.assertEqual(changes.added,
+                     set(["a.txt", "sub/b.txt", "sub/deeper/c.bin"]))
+    self.assertEqual(changes.removed, set())
+    self.assertEqual(changes.modified, set())
+    entries = read_manifest(self.manifest_path)
+    self.assertEqual(entries["sub/b.txt"].digest,
+                     hashlib.sha1(b("beta")).digest())
+    self.assertEqual(entries["sub/b.txt"].size, 4)
+
+  def test_unchanged_files_are_not_rehashed(self):
+    self.update()
+    changes = self.update()
+    self.assertEqual(changes, (set(), set(), set()))
+    self.assertEqual(self.hashed, [])
+
+  def test_detects_added_removed_and_modified(self):
+    self.update()
+    self.write("a.txt", b("ALPHA"), age=1800)
+    self.write("new.txt", b("new"))
+    os.remove(os.path.join(self.tree, "sub", "b.txt"))
+    changes = self.update()
+    self.assertEqual(changes.added, set(["new.txt"]))
+    self.assertEqual(changes.removed, set(["sub/b.txt"]))
+    self.assertEqual(changes.modified, set(["a.txt"]))
+    self.assertEqual(len(self.hashed), 2)
+    self.assertEqual(sorted(read_manifest(self.manifest_path)),
+                     ["a.txt", "new.txt", "sub/deeper/c.bin"])
+
+  def test_touched_file_is_not_modified(self):
+    self.update()
+    self.write("a.txt", b("alpha"), age=1800)
+    changes = self.update()
+    self.assertEqual(changes, (set(), set(), set()))
+    self.assertEqual(len(self.hashed), 1)
+    # The new signature is stored, so the next update hashes nothing.
+    self.update()
+    self.assertEqual(self.hashed, [])
+
+  def test_recent_files_are_rehashed(self):
+    self.write("a.txt", b("alpha"), age=0)
+    self.update()
+    self.assertEqual(read_manifest(self.manifest_path)["a.txt"].mtime_ns, -1)
+    self.update()
+    self.assertEqual(len(self.hashed), 1)
+
+  def test_save_false_does_not_store(self):
+    self.update()
+    self.write("new.txt", b("new"))
+    self.assertEqual(self.update(save=False).added, set(["new.txt"]))
+    self.assertEqual(self.update().added, set(["new.txt"]))
+
+  def test_patterns(self):
+    changes = self.update(excluded_patterns=["*.bin"])
+    self.assertEqual(changes.added, set(["a.txt", "sub/b.txt"]))
+
+  def test_algorithm_change_rehashes(self):
+    self.update()
+    changes = self.update(algorithm="sha256")
+    self.assertEqual(changes, (set(), set(), set()))
+    self.assertEqual(len(self.hashed), 3)
+    self.assertEqual(read_manifest(self.manifest_path)["a.txt"].digest,
+                     hashlib.sha256(b("alpha")).digest())
+
+  def test_unreadable_files_keep_their_entry(self):
+    self.update()
+    before = read_manifest(self.manifest_path)["a.txt"]
+    self.write("a.txt", b("ALPHA"), age=1800)
+    self.unreadable.add(os.path.join(self.tree, "a.txt"))
+    errors = []
+    self.assertEqual(self.update(onerror=errors.append), (set(), set(), set()))
+    self.assertEqual(len(errors), 1)
+    entry = read_manifest(self.manifest_path)["a.txt"]
+    self.assertEqual(entry.digest, before.digest)
+    self.assertEqual(entry.mtime_ns, -1)
+    self.unreadable.clear()
+    self.assertEqual(self.update().modified, set(["a.txt"]))
+
+  def test_stat_errors_are_not_removals(self):
+    self.update()
+    self.unreadable.add(os.path.join(self.tree, "sub", "b.txt"))
+    errors = []
+    self.assertEqual(self.update(onerror=errors.append), (set(), set(), set()))
+    self.assertEqual(len(errors), 1)
+    self.assertTrue("sub/b.txt" in read_manifest(self.manifest_path))
+    self.assertRaises(OSError, self.update)
+
+  def test_algorithm_change_with_unreadable_file(self):
+    self.update()
+    self.unreadable.add(os.path.join(self.tree, "a.txt"))
+    self.update(algorithm="sha256", onerror=lambda error: None)
+    # The SHA-1 digest is not kept under the new algorithm.
+    self.assertEqual(read_manifest(self.manifest_path)["a.txt"].digest, b(""))
+    self.unreadable.clear()
+    self.assertEqual(self.update(algorithm="sha256"), (set(), set(), set()))
+    self.assertEqual(read_manifest(self.manifest_path)["a.txt"].digest,
+                     hashlib.sha256(b("alpha")).digest())
+
+  def test_parallel(self):
+    self.assertEqual(
+      update_manifest(self.tree, self.manifest_path, workers=4).added,
+      set(["a.txt", "sub/b.txt", "sub/deeper/c.bin"]))
+
+  def test_ValueError_when_algorithm_unknown(self):
+    self.assertRaises(ValueError, update_manifest, self.tree,
+                      self.manifest_path, "no-such-algorithm")
@@ -23,7 +23,10 @@ from mom._compat import HAVE_PYTHON3
 if not HAVE_PYTHON3:
   import unittest2
   from pyasn1.error import SubstrateUnderrunError
-  from mom.security.codec import public_key_pem_decode, private_key_pem_decode
+  from mom.security.codec import public_key_pem_decode, private_key_pem_decode,\
+    private_key_pem_encode
+  from mom.security.codec.pem import RSA_PRIVATE_KEY_PEM_HEADER,\
+    PRIVATE_KEY_PEM_HEADER
 
   from mom.tests.test_mom_security_codec_pem import private_key,\
     public_key, certificate
@@ -123,3 +126,21 @@ bZI="""
     def test_fails_on_junk(self):
       self.assertRaises(SubstrateUnderrunError,
                         private_key_pem_decode, junk_private_key)
+
+  class Test_private_key_pem_encode(unittest2.TestCase):
+    def test_pkcs1_round_trip(self):
+      encoded = private_key_pem_encode(private_key_decoded)
+      self.assertTrue(encoded.startswith(RSA_PRIVATE_KEY_PEM_HEADER))
+      self.assertDictEqual(private_key_pem_decode(encoded),
+                           private_key_decoded)
+
+    def test_pkcs8_round_trip(self):
+      encoded = private_key_pem_encode(private_key_decoded, pkcs8=True)
+      self.assertTrue(encoded.startswith(PRIVATE_KEY_PEM_HEADER))
+      self.assertDictEqual(private_key_pem_decode(encoded),
+                           private_key_decoded)
+
+    def test_pkcs8_matches_openssl(self):
+      self.assertEqual(
+        private_key_pem_encode(private_key_decoded, pkcs8=True).strip(),
+        private_key.strip())
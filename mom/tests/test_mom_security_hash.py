@@ -18,13 +18,22 @@
 
 from __future__ import absolute_import
 
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 import unittest2
 
 from mom.builtins import b
 from mom.codec import base64_encode, hex_encode
 from mom.security.hash import sha1_hex_digest, md5_digest,\
   sha1_digest, sha1_base64_digest, md5_hex_digest, md5_base64_digest,\
-  hmac_sha1_digest, hmac_sha1_base64_digest
+  hmac_sha1_digest, hmac_sha1_base64_digest, hash_file, hash_files,\
+  HmacSigner, multi_digest, tree_hash, tree_hash_file, tree_hash_leaf,\
+  tree_hash_root
+from mom.os.path import list_files
+from mom.security import hash as hash_module
 from mom.tests.constants import unicode_string, unicode_string2
 
 input_md5_digest = b('\xe8\x0bP\x17\t\x89P\xfcX\xaa\xd8<\x8c\x14\x97\x8e')
@@ -111,3 +120,235 @@ class Test_hmac_sha1_base64_digest(unittest2.TestCase):
 
   def test_raises_TypeError_when_not_bytes(self):
     self.assertRaises(TypeError, hmac_sha1_base64_digest, *unicode_inputs)
+
+
+class Test_HmacSigner(unittest2.TestCase):
+  def test_value(self):
+    signer = HmacSigner(key)
+    self.assertEqual(signer.sign(base_string), expected_hmac_sha1_digest)
+    self.assertEqual(signer.sign_base64(base_string),
+                     expected_hmac_sha1_base64_digest)
+    self.assertEqual(signer.digest_size, 20)
+
+  def test_rfc4231_sha256(self):
+    expected = b("[\xdc\xc1F\xbf`uNj\x04$&\x08\x95u\xc7Z\x00?\x08"
+                 "\x9d'9\x83\x9d\xecX\xb9d\xec8C")
+    for digestmod in (hashlib.sha256, "sha256"):
+      signer = HmacSigner(b("Jefe"), digestmod)
+      self.assertEqual(signer.sign(b("what do ya want for nothing?")),
+                       expected)
+
+  def test_matches_hmac_module(self):
+    import hmac
+
+    for key_size in (0, 1, 63, 64, 65, 200):
+      signer_key = os.urandom(key_size)
+      for digestmod in (hashlib.md5, hashlib.sha1, hashlib.sha512):
+        signer = HmacSigner(signer_key, digestmod)
+        messages = [b(""), b("abc"), os.urandom(1000)]
+        self.assertEqual(
+          signer.sign_many(messages),
+          [hmac.new(signer_key, message, digestmod).digest()
+           for message in messages])
+
+  def test_verify(self):
+    signer = HmacSigner(key)
+    self.assertTrue(signer.verify(base_string, expected_hmac_sha1_digest))
+    self.assertFalse(signer.verify(base_string, b("\x00") * 20))
+    self.assertFalse(signer.verify(base_string, expected_hmac_sha1_digest[:-1]))
+    self.assertFalse(signer.verify(b("other"), expected_hmac_sha1_digest))
+
+  def test_raises_TypeError_when_not_bytes(self):
+    self.assertRaises(TypeError, HmacSigner, unicode_string)
+    signer = HmacSigner(key)
+    self.assertRaises(TypeError, signer.sign, unicode_string)
+    self.assertRaises(TypeError, signer.verify, base_string, unicode_string)
+
+  def test_ValueError_when_unknown_algorithm(self):
+    self.assertRaises(ValueError, HmacSigner, key, "nope")
+
+  def test_signer_cache_does_not_keep_keys(self):
+    hash_module._SIGNERS.clear()
+    self.assertEqual(hmac_sha1_digest(key, base_string),
+                     expected_hmac_sha1_digest)
+    self.assertEqual(len(hash_module._SIGNERS), 1)
+    for cache_key in hash_module._SIGNERS._values:
+      self.assertFalse(key in cache_key)
+
+class _FileTree(unittest2.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.contents = {}
+    for index, size in enumerate((0, 1, 4095, 4096, 100000, 300000)):
+      path = os.path.join(self.root, "file%d" % index)
+      data = os.urandom(size)
+      self.contents[path] = data
+      file_obj = open(path, "wb")
+      try:
+        file_obj.write(data)
+      finally:
+        file_obj.close()
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def expected(self, algorithm="sha1"):
+    return dict((path, hashlib.new(algorithm, data).digest())
+                for path, data in self.contents.items())
+
+
+class Test_hash_file(_FileTree):
+  def test_value(self):
+    expected = self.expected()
+    for path in self.contents:
+      self.assertEqual(hash_file(path), expected[path])
+      self.assertEqual(hash_file(path, chunk_size=1000), expected[path])
+
+  def test_mmap(self):
+    expected = self.expected("sha256")
+    for path in self.contents:
+      self.assertEqual(hash_file(path, "sha256", mmap_threshold=1),
+                       expected[path])
+      self.assertEqual(hash_file(path, "sha256", mmap_threshold=None),
+                       expected[path])
+
+  def test_errors(self):
+    self.assertRaises(ValueError, hash_file, list(self.contents)[0], "nope")
+    self.assertRaises(IOError, hash_file, os.path.join(self.root, "nope"))
+
+
+class Test_hash_files(_FileTree):
+  def test_ordered(self):
+    paths = sorted(self.contents) * 3
+    expected = self.expected()
+    for workers in (1, 4):
+      results = list(hash_files(paths, workers=workers, chunk_size=4096))
+      self.assertEqual([path for path, _ in results], paths)
+      self.assertEqual([digest for _, digest in results],
+                       [expected[path] for path in paths])
+
+  def test_unordered_with_list_files(self):
+    results = list(hash_files(list_files(self.root), "md5", workers=3,
+                              ordered=False))
+    self.assertEqual(len(results), len(self.contents))
+    self.assertEqual(dict(results), self.expected("md5"))
+
+  def test_consumes_paths_lazily(self):
+    consumed = []
+
+    def paths():
+      for _ in range(1000):
+        for path in self.contents:
+          consumed.append(path)
+          yield path
+    results = hash_files(paths(), workers=2)
+    next(results)
+    self.assertTrue(len(consumed) < 100)
+    results.close()
+
+  def test_errors(self):
+    self.assertRaises(ValueError, hash_files, [], "nope")
+    self.assertRaises(ValueError, hash_files, [], chunk_size=0)
+    missing = os.path.join(self.root, "nope")
+    for workers in (1, 2):
+      self.assertRaises(IOError, list,
+                        hash_files(list(self.contents) + [missing],
+                                   workers=workers))
+
+
+class Test_multi_digest(unittest2.TestCase):
+  def setUp(self):
+    self.data = os.urandom(300000)
+    self.expected = dict((algorithm, hashlib.new(algorithm, self.data).digest())
+                         for algorithm in ("md5", "sha1", "sha256"))
+
+  def test_bytes(self):
+    self.assertEqual(multi_digest(self.data), self.expected)
+    self.assertEqual(multi_digest(self.data, parallel=True), self.expected)
+    self.assertEqual(multi_digest(b(""), ["sha1"]),
+                     {"sha1": sha1_digest()})
+
+  def test_stream(self):
+    for chunk_size in (1, 4096, 1 << 20):
+      self.assertEqual(multi_digest(io.BytesIO(self.data[:5000]),
+                                    chunk_size=chunk_size),
+                       multi_digest(self.data[:5000]))
+    self.assertEqual(multi_digest(io.BytesIO(self.data), chunk_size=100000,
+                                  parallel=True), self.expected)
+
+  def test_stream_without_readinto(self):
+    class Reader(object):
+      def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+      def read(self, size):
+        return self.stream.read(size)
+    self.assertEqual(multi_digest(Reader(self.data), chunk_size=70000),
+                     self.expected)
+
+  def test_encodings(self):
+    self.assertEqual(multi_digest(b("abcdef"), ["md5", "sha1"], encoding="hex"),
+                     {"md5": md5_hex_digest(*inputs),
+                      "sha1": sha1_hex_digest(*inputs)})
+    self.assertEqual(multi_digest(b("abcdef"), ["md5"], encoding="base64"),
+                     {"md5": md5_base64_digest(*inputs)})
+
+  def test_errors(self):
+    self.assertRaises(ValueError, multi_digest, self.data, ["nope"])
+    self.assertRaises(ValueError, multi_digest, self.data, encoding="nope")
+    self.assertRaises(ValueError, multi_digest, self.data, chunk_size=0)
+
+
+class Test_tree_hash(unittest2.TestCase):
+  def leaf(self, data):
+    return hashlib.sha256(b("\x00") + data).digest()
+
+  def node(self, *children):
+    return hashlib.sha256(b("\x01") + b("").join(children)).digest()
+
+  def test_structure(self):
+    data = os.urandom(4500)
+    leaves = [self.leaf(data[i:i + 1000]) for i in range(0, 4500, 1000)]
+    # The fifth leaf has no sibling and is promoted.
+    binary = self.node(self.node(self.node(leaves[0], leaves[1]),
+                                 self.node(leaves[2], leaves[3])),
+                       leaves[4])
+    self.assertEqual(tree_hash(data, leaf_size=1000), binary)
+    self.assertEqual(tree_hash(data, leaf_size=1000, fanout=3),
+                     self.node(self.node(*leaves[:3]),
+                               self.node(*leaves[3:])))
+    self.assertEqual(tree_hash_root(leaves), binary)
+
+  def test_single_leaf(self):
+    self.assertEqual(tree_hash(b("")), self.leaf(b("")))
+    self.assertEqual(tree_hash(b("abc")), self.leaf(b("abc")))
+    self.assertEqual(tree_hash(b("abc"), "md5"),
+                     tree_hash_leaf(b("abc"), "md5"))
+
+  def test_workers_and_leaves(self):
+    data = os.urandom(100000)
+    root, leaves = tree_hash(data, "sha1", leaf_size=4096,
+                             return_leaves=True, workers=4)
+    self.assertEqual(len(leaves), 25)
+    self.assertEqual(tree_hash(data, "sha1", leaf_size=4096, workers=1),
+                     root)
+    self.assertEqual(leaves[7], tree_hash_leaf(data[7 * 4096:8 * 4096],
+                                               "sha1"))
+    self.assertEqual(tree_hash_root(leaves, "sha1"), root)
+    self.assertNotEqual(tree_hash(data, "sha1", leaf_size=8192), root)
+
+  def test_errors(self):
+    self.assertRaises(ValueError, tree_hash, b("abc"), "nope")
+    self.assertRaises(ValueError, tree_hash, b("abc"), leaf_size=0)
+    self.assertRaises(ValueError, tree_hash, b("abc"), fanout=1)
+    self.assertRaises(ValueError, tree_hash_root, [])
+
+
+class Test_tree_hash_file(_FileTree):
+  def test_matches_tree_hash(self):
+    for path, data in self.contents.items():
+      for workers in (1, 3):
+        self.assertEqual(
+          tree_hash_file(path, leaf_size=4096, fanout=4, workers=workers,
+                         return_leaves=True),
+          tree_hash(data, leaf_size=4096, fanout=4, return_leaves=True))
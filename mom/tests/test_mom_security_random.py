@@ -18,9 +18,13 @@
 
 from __future__ import absolute_import
 
+import os
+import threading
 import unittest2
-from mom.builtins import is_bytes, is_bytes_or_unicode
+from mom.builtins import b, is_bytes, is_bytes_or_unicode
+from mom.codec import hex_decode
 from mom.codec.integer import bytes_to_uint
+from mom.tests.constants import unicode_string2
 from mom.security.random import\
   generate_random_hex_string, generate_random_uint_between,\
   generate_random_bits, generate_random_uint_atmost,\
@@ -28,7 +32,9 @@ from mom.security.random import\
   ASCII_PRINTABLE, ALPHA, LOWERCASE_ALPHANUMERIC,\
   LOWERCASE_ALPHA, DIGITS, generate_random_password,\
   generate_random_sequence, calculate_entropy, generate_random_string,\
-  random_shuffle
+  random_shuffle, RandomPool, generate_random_bytes, generate_random_strings,\
+  random_sample, random_sample_range, generate_random_uints_between,\
+  HmacDRBG, ShakeDRBG, WeightedChooser
 
 
 class Test_generate_random_bits(unittest2.TestCase):
@@ -153,6 +159,49 @@ class Test_generate_random_uint_between(unittest2.TestCase):
     self.assertRaises(TypeError, generate_random_uint_between, "", "")
 
 
+class Test_generate_random_uints_between(unittest2.TestCase):
+  def assert_uniform(self, values, low, high, buckets=10):
+    # Chi-square test over equally wide buckets (9 degrees of freedom);
+    # 33.7 is the 0.9999 quantile, so a correct generator fails about once
+    # in 10000 runs while a bias of a few percent fails every time.
+    counts = [0] * buckets
+    for value in values:
+      counts[(value - low) * buckets // (high - low)] += 1
+    expected = len(values) / float(buckets)
+    chi_square = sum((count - expected) ** 2 / expected for count in counts)
+    self.assertTrue(chi_square < 33.7, chi_square)
+
+  def test_word_sized_range(self):
+    values = generate_random_uints_between(10, 20, 20000)
+    self.assertEqual(len(values), 20000)
+    self.assertEqual(set(values), set(range(10, 20)))
+    self.assert_uniform(values, 10, 20)
+
+  def test_range_near_word_size(self):
+    # 3 * 2**30 does not divide 2**32: a plain multiply-shift without
+    # rejection would be biased.
+    high = 3 << 30
+    values = generate_random_uints_between(0, high, 20000)
+    self.assertTrue(all(0 <= value < high for value in values))
+    self.assert_uniform(values, 0, high)
+
+  def test_wide_range(self):
+    low, high = -(1 << 70), 3 << 70
+    values = generate_random_uints_between(low, high, 20000)
+    self.assertTrue(isinstance(values, list))
+    self.assertTrue(all(low <= value < high for value in values))
+    self.assert_uniform(values, low, high)
+
+  def test_single_value_and_empty(self):
+    self.assertEqual(list(generate_random_uints_between(5, 6, 3)), [5, 5, 5])
+    self.assertEqual(list(generate_random_uints_between(0, 10, 0)), [])
+
+  def test_errors(self):
+    self.assertRaises(ValueError, generate_random_uints_between, 1, 1, 1)
+    self.assertRaises(ValueError, generate_random_uints_between, 0, 1, -1)
+    self.assertRaises(TypeError, generate_random_uints_between, 0, None, 1)
+
+
 class Test_generate_random_string(unittest2.TestCase):
   def test_random_string_length(self):
     for _ in range(10):
@@ -169,6 +218,49 @@ class Test_generate_random_string(unittest2.TestCase):
       self.assertNotEqual(generate_random_string(64),
                           generate_random_string(64))
 
+  def test_pool_membership(self):
+    for pool in (DIGITS, ALPHANUMERIC, ASCII_PRINTABLE, "a", unicode_string2):
+      self.assertTrue(set(generate_random_string(200, pool)) <= set(pool))
+
+  def test_uniformity(self):
+    # Chi-square test over 10 symbols (9 degrees of freedom); 33.7 is the
+    # 0.9999 quantile.
+    sample = generate_random_string(100000, DIGITS)
+    expected = len(sample) / 10.0
+    chi_square = sum((sample.count(digit) - expected) ** 2 / expected
+                     for digit in DIGITS)
+    self.assertTrue(chi_square < 33.7)
+
+  def test_rejected_bytes_are_redrawn(self):
+    requests = []
+
+    def rand_func(count):
+      requests.append(count)
+      if len(requests) == 1:
+        # 250..255 are rejected for a pool of 10 symbols.
+        return b("\xfa\x00\xff\x0b") + b("\x01") * (count - 4)
+      return b("\x02") * count
+    self.assertEqual(generate_random_string(6, DIGITS, rand_func), "011122")
+    self.assertEqual(requests, [6, 2])
+
+
+class Test_generate_random_strings(unittest2.TestCase):
+  def test_count_and_length(self):
+    strings = generate_random_strings(100, 16)
+    self.assertEqual(len(strings), 100)
+    self.assertTrue(all(len(string) == 16 for string in strings))
+    self.assertEqual(len(set(strings)), 100)
+    self.assertEqual(generate_random_strings(0, 16), [])
+
+  def test_pool(self):
+    strings = generate_random_strings(10, 20, LOWERCASE_ALPHA)
+    self.assertTrue(set("".join(strings)) <= set(LOWERCASE_ALPHA))
+
+  def test_errors(self):
+    self.assertRaises(TypeError, generate_random_strings, None, 16)
+    self.assertRaises(ValueError, generate_random_strings, -1, 16)
+    self.assertRaises(ValueError, generate_random_strings, 1, 0)
+
 
 class Test_generate_random_password(unittest2.TestCase):
   def test_random_password_length(self):
@@ -223,6 +315,12 @@ class Test_generate_random_sequence(unittest2.TestCase):
     self.assertRaises(ValueError, generate_random_sequence, 0, ALPHA)
     self.assertRaises(ValueError, generate_random_sequence, -1, ALPHA)
 
+  def test_pool_membership(self):
+    for pool in ([None, 1, "a"], list(range(256)), list(range(1000))):
+      sequence = generate_random_sequence(300, pool)
+      self.assertEqual(len(sequence), 300)
+      self.assertTrue(all(element in pool for element in sequence))
+
 
 class Test_calculate_entropy(unittest2.TestCase):
   def test_entropy(self):
@@ -283,3 +381,300 @@ class Test_random_shuffle(unittest2.TestCase):
     self.assertNotEqual(random_shuffle(list(ALPHANUMERIC)),
                         list(ALPHANUMERIC))
     self.assertEqual(random_shuffle(["a"]), ["a"])
+    self.assertEqual(random_shuffle([]), [])
+
+  def test_large_sequence(self):
+    sequence = list(range(100000))
+    self.assertEqual(sorted(random_shuffle(sequence)), list(range(100000)))
+
+  def test_uniform_permutations(self):
+    # Chi-square test over the 6 permutations of 3 elements (5 degrees of
+    # freedom); 25.7 is the 0.9999 quantile.
+    counts = {}
+    for _ in range(6000):
+      permutation = tuple(random_shuffle([0, 1, 2]))
+      counts[permutation] = counts.get(permutation, 0) + 1
+    self.assertEqual(len(counts), 6)
+    chi_square = sum((count - 1000) ** 2 / 1000.0
+                     for count in counts.values())
+    self.assertTrue(chi_square < 25.7)
+
+  def test_rand_func(self):
+    requests = []
+
+    def rand_func(count):
+      requests.append(count)
+      return generate_random_bytes(count)
+    random_shuffle(list(range(3000)), rand_func)
+    # Draws are batched rather than made once per element.
+    self.assertTrue(len(requests) < 10)
+
+
+class Test_random_sample(unittest2.TestCase):
+  def test_sample(self):
+    population = list(ALPHANUMERIC)
+    for k in (0, 1, 5, 30, 62):
+      sample = random_sample(population, k)
+      self.assertEqual(len(sample), k)
+      self.assertEqual(len(set(sample)), k)
+      self.assertTrue(set(sample) <= set(population))
+
+  def test_uniform_pairs(self):
+    # Every ordered pair of distinct elements is equally likely: chi-square
+    # over 12 outcomes (11 degrees of freedom); 35.6 is the 0.9999 quantile.
+    counts = {}
+    for _ in range(6000):
+      pair = tuple(random_sample("abcd", 2))
+      counts[pair] = counts.get(pair, 0) + 1
+    self.assertEqual(len(counts), 12)
+    chi_square = sum((count - 500) ** 2 / 500.0 for count in counts.values())
+    self.assertTrue(chi_square < 35.6)
+
+  def test_errors(self):
+    self.assertRaises(ValueError, random_sample, "abc", 4)
+    self.assertRaises(ValueError, random_sample, "abc", -1)
+    self.assertRaises(TypeError, random_sample, "abc", None)
+
+
+class Test_random_sample_range(unittest2.TestCase):
+  def test_sample(self):
+    for n, k in ((10, 10), (1000, 10), (1 << 40, 100), (1 << 80, 3)):
+      sample = random_sample_range(n, k)
+      self.assertEqual(len(set(sample)), k)
+      self.assertTrue(all(0 <= value < n for value in sample))
+    self.assertEqual(random_sample_range(0, 0), [])
+    self.assertEqual(sorted(random_sample_range(5, 5)), [0, 1, 2, 3, 4])
+
+  def test_errors(self):
+    self.assertRaises(ValueError, random_sample_range, 3, 4)
+    self.assertRaises(TypeError, random_sample_range, None, 4)
+
+
+class Test_WeightedChooser(unittest2.TestCase):
+  def assert_proportional(self, choices, weights):
+    # Chi-square test over the positively weighted outcomes; 21.1 is the
+    # 0.9999 quantile for 3 degrees of freedom.
+    counts = [0] * len(weights)
+    for choice in choices:
+      counts[choice] += 1
+    total = float(sum(weights))
+    chi_square = 0
+    for count, weight in zip(counts, weights):
+      if not weight:
+        self.assertEqual(count, 0)
+        continue
+      expected = len(choices) * weight / total
+      chi_square += (count - expected) ** 2 / expected
+    self.assertTrue(chi_square < 21.1, (chi_square, counts))
+
+  def test_integer_weights(self):
+    weights = [1, 2, 3, 0, 4]
+    chooser = WeightedChooser(weights)
+    self.assertEqual(len(chooser), 5)
+    self.assert_proportional(chooser.choose_many(50000), weights)
+    self.assert_proportional([chooser.choose() for _ in range(20000)],
+                             weights)
+
+  def test_float_weights(self):
+    weights = [0.5, 0.0, 0.25, 1.5, 0.75]
+    self.assert_proportional(WeightedChooser(weights).choose_many(50000),
+                             weights)
+
+  def test_update(self):
+    chooser = WeightedChooser([1, 1, 1, 1])
+    chooser.choose()
+    chooser.update(0, 0)
+    chooser.update(3, 5)
+    self.assertEqual(chooser.weights, [0, 1, 1, 5])
+    self.assert_proportional(chooser.choose_many(50000), [0, 1, 1, 5])
+
+  def test_many_weights(self):
+    weights = [i % 10 for i in range(1000)]
+    choices = WeightedChooser(weights).choose_many(20000)
+    self.assertTrue(all(weights[choice] for choice in choices))
+
+  def test_population(self):
+    chooser = WeightedChooser([0, 3, 1], population="abc")
+    self.assertTrue(chooser() in ("b", "c"))
+    self.assertEqual(set(chooser.choose_many(1000)), set("bc"))
+    self.assertEqual(chooser.choose_many(0), [])
+
+  def test_rand_func(self):
+    draws = [WeightedChooser([1, 2, 3], rand_func=HmacDRBG(b("seed")))
+             .choose_many(100) for _ in range(2)]
+    self.assertEqual(draws[0], draws[1])
+
+  def test_errors(self):
+    self.assertRaises(ValueError, WeightedChooser, [])
+    self.assertRaises(ValueError, WeightedChooser, [1, -1])
+    self.assertRaises(ValueError, WeightedChooser, [1, float("inf")])
+    self.assertRaises(ValueError, WeightedChooser, [1, float("nan")])
+    self.assertRaises(ValueError, WeightedChooser, [1, 2], "abc")
+    self.assertRaises(TypeError, WeightedChooser, [1, "2"])
+    self.assertRaises(TypeError, WeightedChooser, [True])
+    self.assertRaises(ValueError, WeightedChooser([0, 0]).choose)
+    chooser = WeightedChooser([1])
+    self.assertRaises(ValueError, chooser.update, 0, -1)
+    self.assertRaises(TypeError, chooser.choose_many, None)
+    self.assertRaises(ValueError, chooser.choose_many, -1)
+    self.assertRaises(IndexError, chooser.update, 1, 1)
+
+
+class Test_RandomPool(unittest2.TestCase):
+  def setUp(self):
+    self.requests = []
+
+    def rand_func(count):
+      self.requests.append(count)
+      return generate_random_bytes(count)
+    self.rand_func = rand_func
+
+  def test_serves_small_requests_from_blocks(self):
+    pool = RandomPool(64, self.rand_func)
+    values = [pool(8) for _ in range(16)]
+    self.assertEqual(self.requests, [64, 64])
+    self.assertTrue(all(is_bytes(value) and len(value) == 8
+                        for value in values))
+    self.assertEqual(len(set(values)), 16)
+    self.assertEqual(pool(0), pool(0)[:0])
+
+  def test_large_requests_bypass_buffer(self):
+    pool = RandomPool(64, self.rand_func)
+    self.assertEqual(len(pool(65)), 65)
+    self.assertEqual(self.requests, [65])
+
+  def test_consumed_bytes_are_zeroed(self):
+    pool = RandomPool(64, lambda count: b("\xff") * count)
+    self.assertEqual(pool(10), b("\xff") * 10)
+    self.assertEqual(pool._buffer[:10], bytearray(10))
+    self.assertEqual(pool._buffer[10:], bytearray(b("\xff") * 54))
+    pool.clear()
+    self.assertEqual(len(pool._buffer), 0)
+
+  def test_usable_as_rand_func(self):
+    pool = RandomPool()
+    self.assertEqual(len(generate_random_string(32, rand_func=pool)), 32)
+    value = generate_random_uint_between(10, 20, rand_func=pool)
+    self.assertTrue(10 <= value < 20)
+
+  def test_thread_safety(self):
+    pool = RandomPool(256)
+    results = []
+
+    def worker():
+      results.extend(pool(4) for _ in range(500))
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(results), 2000)
+    # Overlapping slices would repeat values; 32-bit collisions among 2000
+    # samples are possible but extremely unlikely.
+    self.assertTrue(len(set(results)) > 1990)
+
+  def test_ValueError_when_invalid_block_size(self):
+    self.assertRaises(ValueError, RandomPool, 0)
+    self.assertRaises(TypeError, RandomPool, None)
+
+  if hasattr(os, "fork"):
+    def test_child_does_not_reuse_parent_bytes(self):
+      pool = RandomPool(1024)
+      pool(1)
+      read_fd, write_fd = os.pipe()
+      pid = os.fork()
+      if not pid:
+        try:
+          os.write(write_fd, pool(16))
+        finally:
+          os._exit(0)
+      os.close(write_fd)
+      child_bytes = os.read(read_fd, 16)
+      os.close(read_fd)
+      os.waitpid(pid, 0)
+      self.assertNotEqual(child_bytes, pool(16))
+
+
+class _DRBGTests(object):
+  drbg_class = None
+
+  def test_deterministic(self):
+    self.assertEqual(self.drbg_class(b("seed"))(100),
+                     self.drbg_class(b("seed"))(100))
+    self.assertNotEqual(self.drbg_class(b("seed"))(100),
+                        self.drbg_class(b("other seed"))(100))
+    self.assertNotEqual(self.drbg_class(b("seed"))(100),
+                        self.drbg_class(b("seed"), b("personal"))(100))
+    self.assertNotEqual(self.drbg_class()(32), self.drbg_class()(32))
+
+  def test_split_requests_continue_stream(self):
+    drbg = self.drbg_class(b("seed"))
+    self.assertEqual(len(drbg(0)), 0)
+    for count in (1, 33, 1 << 16, (1 << 16) + 1, 3 << 17):
+      self.assertEqual(len(drbg(count)), count)
+    first, second = self.drbg_class(b("seed")), self.drbg_class(b("seed"))
+    self.assertEqual(first(10) + first(10), second(10) + second(10))
+    self.assertNotEqual(first(10), first(10))
+
+  def test_reseed(self):
+    first, second = self.drbg_class(b("seed")), self.drbg_class(b("seed"))
+    first.reseed(b("entropy"))
+    second.reseed(b("entropy"))
+    self.assertEqual(first(64), second(64))
+    second.reseed()
+    self.assertNotEqual(first(64), second(64))
+
+  def test_fork(self):
+    parent = self.drbg_class(b("seed"))
+    children = [parent.fork() for _ in range(4)]
+    outputs = set(child(32) for child in children)
+    outputs.add(parent(32))
+    self.assertEqual(len(outputs), 5)
+    self.assertEqual(self.drbg_class(b("seed")).fork()(32),
+                     self.drbg_class(b("seed")).fork()(32))
+
+  def test_usable_as_rand_func(self):
+    for _ in range(2):
+      drbg = self.drbg_class(b("seed"))
+      values = list(range(100))
+      random_shuffle(values, rand_func=drbg)
+      result = (generate_random_string(32, rand_func=drbg),
+                generate_random_uint_between(0, 1 << 200, rand_func=drbg),
+                values)
+      if not _:
+        expected = result
+    self.assertEqual(result, expected)
+    self.assertEqual(sorted(values), list(range(100)))
+
+  def test_errors(self):
+    self.assertRaises(TypeError, self.drbg_class, 5)
+    self.assertRaises(TypeError, self.drbg_class, b("seed"), 5)
+    self.assertRaises(TypeError, self.drbg_class(b("seed")).reseed, 5)
+    self.assertRaises(ValueError, self.drbg_class(b("seed")), -1)
+
+
+class Test_HmacDRBG(_DRBGTests, unittest2.TestCase):
+  drbg_class = HmacDRBG
+
+  def test_nist_vector(self):
+    # NIST CAVP HMAC_DRBG SHA-256, no reseed, no personalization or
+    # additional input, COUNT = 0.
+    drbg = HmacDRBG(hex_decode(b(
+      "ca851911349384bffe89de1cbdc46e6831e44d34a4fb935ee285dd14b71a7488"
+      "659ba96c601dc69fc902940805ec0ca8")))
+    drbg.generate(128)
+    self.assertEqual(drbg.generate(128), hex_decode(b(
+      "e528e9abf2dece54d47c7e75e5fe302149f817ea9fb4bee6f4199697d04d5b89"
+      "d54fbb978a15b5c443c9ec21036d2460b6f73ebad0dc2aba6e624abf07745bc1"
+      "07694bb7547bb0995f70de25d6b29e2d3011bb19d27676c07162c8b5ccde0668"
+      "961df86803482cb37ed6d5c0bb8d50cf1f50d476aa0458bdaba806f48be9dcb8")))
+
+
+try:
+  import hashlib
+  hashlib.shake_256
+except AttributeError:
+  pass
+else:
+  class Test_ShakeDRBG(_DRBGTests, unittest2.TestCase):
+    drbg_class = ShakeDRBG
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2012 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+from mom._compat import HAVE_PYTHON3
+
+
+if not HAVE_PYTHON3:
+  import unittest2
+  from mom.security.codec import private_key_pem_decode
+  from mom.security.rsa import generate_rsa_key, parse_private_key
+  from mom.security.rsa.keys import generate_rsa_key_info
+
+  class Test_generate_rsa_key_info(unittest2.TestCase):
+    def assert_valid_key_info(self, key_info, bits, public_exponent=65537):
+      modulus = key_info["modulus"]
+      prime1, prime2 = key_info["prime1"], key_info["prime2"]
+      private_exponent = key_info["privateExponent"]
+      self.assertEqual(key_info["version"], 0)
+      self.assertEqual(key_info["publicExponent"], public_exponent)
+      self.assertEqual(modulus, prime1 * prime2)
+      self.assertEqual(len(bin(modulus)) - 2, bits)
+      self.assertTrue(prime1 > prime2)
+      self.assertEqual(key_info["exponent1"],
+                       private_exponent % (prime1 - 1))
+      self.assertEqual(key_info["exponent2"],
+                       private_exponent % (prime2 - 1))
+      self.assertEqual(key_info["coefficient"] * prime2 % prime1, 1)
+      message = 0x1234567890
+      cipher = pow(message, public_exponent, modulus)
+      self.assertEqual(pow(cipher, private_exponent, modulus), message)
+
+    def test_serial(self):
+      self.assert_valid_key_info(generate_rsa_key_info(512), 512)
+
+    def test_pool(self):
+      import multiprocessing
+      pool = multiprocessing.Pool(2)
+      try:
+        for _ in range(2):
+          self.assert_valid_key_info(generate_rsa_key_info(512, 3, pool=pool),
+                                     512, 3)
+      finally:
+        pool.terminate()
+        pool.join()
+
+    def test_ValueError_when_invalid_arguments(self):
+      self.assertRaises(ValueError, generate_rsa_key_info, 511)
+      self.assertRaises(ValueError, generate_rsa_key_info, 32)
+      self.assertRaises(ValueError, generate_rsa_key_info, 512, 65536)
+      self.assertRaises(ValueError, generate_rsa_key_info, 512, 1)
+
+  class Test_generate_rsa_key(unittest2.TestCase):
+    def test_pem_round_trip(self):
+      for pkcs8 in (False, True):
+        key = generate_rsa_key(512, pkcs8=pkcs8)
+        self.assertEqual(key.encoding, "PEM")
+        self.assertDictEqual(private_key_pem_decode(key.encoded_key),
+                             key.key_info)
+        self.assertDictEqual(parse_private_key(key.encoded_key).key_info,
+                             key.key_info)
@@ -75,6 +75,116 @@ setups = [
   "import os; from mom.codec.integer import bytes_to_uint; b = os.urandom(4003)",
   "import os; from mom.codec._alt_integer import bytes_to_uint_naive; b = os.urandom(4003)",
   "import os; from mom.codec._alt_integer import bytes_to_uint_simple; b = os.urandom(4003)",
+  None,
+  "from mom.math import _pure_is_prime; n = (1 << 31) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 31) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 61) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 61) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 127) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 127) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 521) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 521) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 1279) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 1279) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 2203) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 2203) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 4253) - 1",
+  "from mom.math import _rabin_miller; n = (1 << 4253) - 1",
+  None,
+  "from mom.math import FixedBasePowMod; import os; from mom.codec.integer import bytes_to_uint; m = (1 << 2203) - 1; e = bytes_to_uint(os.urandom(256)); ctx = FixedBasePowMod(3, m, 2048)",
+  "from mom.math import pow_mod; import os; from mom.codec.integer import bytes_to_uint; m = (1 << 2203) - 1; e = bytes_to_uint(os.urandom(256))",
+  "import os; from mom.codec.integer import bytes_to_uint; m = (1 << 2203) - 1; e = bytes_to_uint(os.urandom(256))",
+  None,
+  "import os; from mom.codec.integer import bytes_to_uint; m = bytes_to_uint(os.urandom(32)) | 1; b = bytes_to_uint(os.urandom(32)); e = bytes_to_uint(os.urandom(32))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import pow_mod; m = bytes_to_uint(os.urandom(32)) | 1; b = bytes_to_uint(os.urandom(32)); e = bytes_to_uint(os.urandom(32))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import _pure_pow_mod; m = bytes_to_uint(os.urandom(32)) | 1; b = bytes_to_uint(os.urandom(32)); e = bytes_to_uint(os.urandom(32))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_fixed_window; m = bytes_to_uint(os.urandom(32)) | 1; b = bytes_to_uint(os.urandom(32)); e = bytes_to_uint(os.urandom(32))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_sliding_window_montgomery; m = bytes_to_uint(os.urandom(32)) | 1; b = bytes_to_uint(os.urandom(32)); e = bytes_to_uint(os.urandom(32))",
+  None,
+  "import os; from mom.codec.integer import bytes_to_uint; m = bytes_to_uint(os.urandom(128)) | 1; b = bytes_to_uint(os.urandom(128)); e = bytes_to_uint(os.urandom(128))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import pow_mod; m = bytes_to_uint(os.urandom(128)) | 1; b = bytes_to_uint(os.urandom(128)); e = bytes_to_uint(os.urandom(128))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import _pure_pow_mod; m = bytes_to_uint(os.urandom(128)) | 1; b = bytes_to_uint(os.urandom(128)); e = bytes_to_uint(os.urandom(128))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_fixed_window; m = bytes_to_uint(os.urandom(128)) | 1; b = bytes_to_uint(os.urandom(128)); e = bytes_to_uint(os.urandom(128))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_sliding_window_montgomery; m = bytes_to_uint(os.urandom(128)) | 1; b = bytes_to_uint(os.urandom(128)); e = bytes_to_uint(os.urandom(128))",
+  None,
+  "import os; from mom.codec.integer import bytes_to_uint; m = bytes_to_uint(os.urandom(256)) | 1; b = bytes_to_uint(os.urandom(256)); e = bytes_to_uint(os.urandom(256))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import pow_mod; m = bytes_to_uint(os.urandom(256)) | 1; b = bytes_to_uint(os.urandom(256)); e = bytes_to_uint(os.urandom(256))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import _pure_pow_mod; m = bytes_to_uint(os.urandom(256)) | 1; b = bytes_to_uint(os.urandom(256)); e = bytes_to_uint(os.urandom(256))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_fixed_window; m = bytes_to_uint(os.urandom(256)) | 1; b = bytes_to_uint(os.urandom(256)); e = bytes_to_uint(os.urandom(256))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_sliding_window_montgomery; m = bytes_to_uint(os.urandom(256)) | 1; b = bytes_to_uint(os.urandom(256)); e = bytes_to_uint(os.urandom(256))",
+  None,
+  "import os; from mom.codec.integer import bytes_to_uint; m = bytes_to_uint(os.urandom(512)) | 1; b = bytes_to_uint(os.urandom(512)); e = bytes_to_uint(os.urandom(512))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import pow_mod; m = bytes_to_uint(os.urandom(512)) | 1; b = bytes_to_uint(os.urandom(512)); e = bytes_to_uint(os.urandom(512))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom.math import _pure_pow_mod; m = bytes_to_uint(os.urandom(512)) | 1; b = bytes_to_uint(os.urandom(512)); e = bytes_to_uint(os.urandom(512))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_fixed_window; m = bytes_to_uint(os.urandom(512)) | 1; b = bytes_to_uint(os.urandom(512)); e = bytes_to_uint(os.urandom(512))",
+  "import os; from mom.codec.integer import bytes_to_uint; from mom._alt_math import pow_mod_sliding_window_montgomery; m = bytes_to_uint(os.urandom(512)) | 1; b = bytes_to_uint(os.urandom(512)); e = bytes_to_uint(os.urandom(512))",
+  None,
+  "import os; from mom.math import inverse_mod_many; from mom.codec.integer import bytes_to_uint; m = (1 << 521) - 1; v = [bytes_to_uint(os.urandom(64)) for _ in range(1000)]",
+  "import os; from mom.math import inverse_mod; from mom.codec.integer import bytes_to_uint; m = (1 << 521) - 1; v = [bytes_to_uint(os.urandom(64)) for _ in range(1000)]",
+  "from mom.math import crt; m = [(1 << 521) - 1, (1 << 607) - 1, (1 << 1279) - 1]; r = [3, 5, 7]",
+  None,
+  "from mom.math import generate_random_prime",
+  "from mom.math import generate_random_safe_prime",
+  None,
+  "from mom.math import gcd; a = ((1 << 4253) - 1) * ((1 << 2203) - 1); b = ((1 << 4253) - 1) * ((1 << 3217) - 1)",
+  "from mom.math import _pure_gcd; a = ((1 << 4253) - 1) * ((1 << 2203) - 1); b = ((1 << 4253) - 1) * ((1 << 3217) - 1)",
+  "from mom.math import lcm_many; n = list(range(1, 5000))",
+  "from mom.math import _lcm2; from mom._compat import reduce; n = list(range(1, 5000))",
+  "import os; from mom.math import batch_gcd; from mom.codec.integer import bytes_to_uint; n = [bytes_to_uint(os.urandom(128)) for _ in range(1000)]",
+  None,
+  "from mom.math import pow_mod; b = 3; e = m = (1 << 1279) - 1",
+  "from mom.math import _pure_pow_mod; b = 3; e = m = (1 << 1279) - 1",
+  "from mom.math import is_prime; n = (1 << 1279) - 1",
+  "from mom.math import _pure_is_prime; n = (1 << 1279) - 1",
+  "from mom.math import inverse_mod; a = 3; m = (1 << 1279) - 1",
+  "from mom.math import _pure_inverse_mod; a = 3; m = (1 << 1279) - 1",
+  None,
+  "from mom.security.random import generate_random_bytes",
+  "from mom.security.random import RandomPool; pool = RandomPool()",
+  "from mom.security.random import generate_random_hex_string",
+  "from mom.security.random import generate_random_hex_string, RandomPool; pool = RandomPool()",
+  "from mom.security.random import generate_random_string",
+  "from mom.security.random import generate_random_string, RandomPool; pool = RandomPool()",
+  "from mom.security.random import random_choice, ALPHANUMERIC",
+  "from mom.security.random import generate_random_strings",
+  None,
+  "from mom.security.random import random_shuffle; l = list(range(10000))",
+  "import random; l = list(range(10000))",
+  "from mom.security.random import random_sample; l = list(range(10000))",
+  "from mom.security.random import random_sample_range",
+  None,
+  "from mom.security.random import WeightedChooser; c = WeightedChooser([i % 7 + 1.0 for i in range(10)])",
+  "from mom.security.random import WeightedChooser; c = WeightedChooser([i % 7 + 1.0 for i in range(100000)])",
+  "from mom.security.random import WeightedChooser; c = WeightedChooser([i % 7 + 1.0 for i in range(10)])",
+  "from mom.security.random import WeightedChooser; c = WeightedChooser([i % 7 + 1.0 for i in range(100000)])",
+  "from mom.security.random import WeightedChooser; w = [i % 7 + 1.0 for i in range(100000)]",
+  "import bisect, random\ns = []\nfor i in range(100000): s.append((s[-1] if s else 0.0) + i % 7 + 1.0)",
+  None,
+  "from mom.security.random import generate_random_uint_between",
+  "from mom.security.random import generate_random_uints_between",
+  "from mom.security.random import generate_random_uints_between",
+  None,
+  "from mom.security.random import generate_random_bytes",
+  "from mom.security.random import HmacDRBG; drbg = HmacDRBG(b'seed')",
+  "from mom.security.random import ShakeDRBG; drbg = ShakeDRBG(b'seed')",
+  "from mom.security.random import generate_random_strings, ShakeDRBG; drbg = ShakeDRBG(b'seed')",
+  None,
+  "import hmac, hashlib; key = b'kd94hf93k423kf44&pfkkdhi9sl3r4s00'; data = b'x' * 200",
+  "from mom.security.hash import hmac_sha1_digest; key = b'kd94hf93k423kf44&pfkkdhi9sl3r4s00'; data = b'x' * 200",
+  "from mom.security.hash import HmacSigner; signer = HmacSigner(b'kd94hf93k423kf44&pfkkdhi9sl3r4s00'); data = b'x' * 200",
+  None,
+  "import hashlib, os; data = os.urandom(1 << 24)",
+  "from mom.security.hash import multi_digest; import os; data = os.urandom(1 << 24)",
+  "from mom.security.hash import multi_digest; import os; data = os.urandom(1 << 24)",
+  None,
+  "import hashlib, os; data = os.urandom(1 << 26)",
+  "from mom.security.hash import tree_hash; import os; data = os.urandom(1 << 26)",
+  "from mom.security.hash import tree_hash; import os; data = os.urandom(1 << 26)",
+  None,
+  "items = [('event-%d' % i).encode('ascii') for i in range(10000)]",
+  "from mom.collections import BloomFilter; items = [('event-%d' % i).encode('ascii') for i in range(10000)]",
+  "from mom.collections import BloomFilter; items = [('event-%d' % i).encode('ascii') for i in range(10000)]; f = BloomFilter(10000, 0.001); f.add_many(items)",
+  "from mom.collections import CountingBloomFilter; items = [('event-%d' % i).encode('ascii') for i in range(10000)]",
 ]
 statements = [
   "b36encode(b)",
@@ -132,6 +242,116 @@ statements = [
   "bytes_to_uint(b)",
   "bytes_to_uint_naive(b)",
   "bytes_to_uint_simple(b)",
+  None,
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  "_pure_is_prime(n)",
+  "_rabin_miller(n, 5)",
+  None,
+  "ctx.pow(e)",
+  "pow_mod(3, e, m)",
+  "pow(3, e, m)",
+  None,
+  "pow(b, e, m)",
+  "pow_mod(b, e, m)",
+  "_pure_pow_mod(b, e, m)",
+  "pow_mod_fixed_window(b, e, m)",
+  "pow_mod_sliding_window_montgomery(b, e, m)",
+  None,
+  "pow(b, e, m)",
+  "pow_mod(b, e, m)",
+  "_pure_pow_mod(b, e, m)",
+  "pow_mod_fixed_window(b, e, m)",
+  "pow_mod_sliding_window_montgomery(b, e, m)",
+  None,
+  "pow(b, e, m)",
+  "pow_mod(b, e, m)",
+  "_pure_pow_mod(b, e, m)",
+  "pow_mod_fixed_window(b, e, m)",
+  "pow_mod_sliding_window_montgomery(b, e, m)",
+  None,
+  "pow(b, e, m)",
+  "pow_mod(b, e, m)",
+  "_pure_pow_mod(b, e, m)",
+  "pow_mod_fixed_window(b, e, m)",
+  "pow_mod_sliding_window_montgomery(b, e, m)",
+  None,
+  "inverse_mod_many(v, m)",
+  "[inverse_mod(x, m) for x in v]",
+  "crt(r, m)",
+  None,
+  "generate_random_prime(1024)",
+  "generate_random_safe_prime(512)",
+  None,
+  "gcd(a, b)",
+  "_pure_gcd(a, b)",
+  "lcm_many(n)",
+  "reduce(_lcm2, n)",
+  "batch_gcd(n)",
+  None,
+  "pow_mod(b, e, m)",
+  "_pure_pow_mod(b, e, m)",
+  "is_prime(n)",
+  "_pure_is_prime(n)",
+  "inverse_mod(a, m)",
+  "_pure_inverse_mod(a, m)",
+  None,
+  "generate_random_bytes(16)",
+  "pool(16)",
+  "generate_random_hex_string(32)",
+  "generate_random_hex_string(32, rand_func=pool)",
+  "generate_random_string(32)",
+  "generate_random_string(32, rand_func=pool)",
+  "''.join(random_choice(ALPHANUMERIC) for _ in range(32))",
+  "generate_random_strings(1000, 32)",
+  None,
+  "random_shuffle(l)",
+  "random.shuffle(l)",
+  "random_sample(l, 100)",
+  "random_sample_range(10 ** 12, 1000)",
+  None,
+  "c.choose()",
+  "c.choose()",
+  "c.choose_many(10000)",
+  "c.choose_many(10000)",
+  "WeightedChooser(w).choose()",
+  "bisect.bisect(s, random.random() * s[-1])",
+  None,
+  "[generate_random_uint_between(0, 1000) for _ in range(10000)]",
+  "generate_random_uints_between(0, 1000, 10000)",
+  "generate_random_uints_between(0, 1 << 48, 10000)",
+  None,
+  "generate_random_bytes(1 << 20)",
+  "drbg(1 << 20)",
+  "drbg(1 << 20)",
+  "generate_random_strings(1000, 32, rand_func=drbg)",
+  None,
+  "hmac.new(key, data, hashlib.sha1).digest()",
+  "hmac_sha1_digest(key, data)",
+  "signer.sign(data)",
+  None,
+  "[hashlib.new(name, data).digest() for name in ('md5', 'sha1', 'sha256')]",
+  "multi_digest(data)",
+  "multi_digest(data, parallel=True)",
+  None,
+  "hashlib.sha256(data).digest()",
+  "tree_hash(data, workers=1)",
+  "tree_hash(data)",
+  None,
+  "set(items)",
+  "BloomFilter(10000, 0.001).add_many(items)",
+  "[item in f for item in items]",
+  "CountingBloomFilter(10000, 0.001).add_many(items)",
 ]
 
 